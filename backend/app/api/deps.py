@@ -1,17 +1,21 @@
 # app/api/deps.py
-from typing import Generator, Optional
+from typing import Callable, Generator, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.security import decode_access_token
-from app.db.database import SessionLocal
+from app.db.async_database import get_async_db
+from app.db.database import ReplicaSessionLocal, SessionLocal
 from app.db.models import User
+from app.db.replica import get_replica_router
 from app.schemas.user import TokenPayload
+from app.services.user_cache import get_user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
@@ -25,12 +29,26 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> User:
+def get_read_db() -> Generator:
     """
-    Dependencia para obtener el usuario actual a partir del token JWT.
+    Dependencia para obtener una sesión de solo lectura.
+    
+    Usa la réplica (DATABASE_REPLICA_URL) mientras responda y su retraso no
+    supere DB_REPLICA_MAX_LAG_SECONDS; si no, el primario. Si una consulta
+    falla en la réplica se repite en el primario (ver ReplicaSession). Solo
+    para lecturas que toleran datos algo atrasados: lo que se acaba de
+    escribir puede no aparecer todavía.
+    """
+    use_replica = get_replica_router().use_replica()
+    db = ReplicaSessionLocal() if use_replica else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _decode_token(token: str) -> TokenPayload:
+    """
+    Obtener el contenido de un token JWT válido.
     """
     try:
         payload = decode_access_token(token)
@@ -46,9 +64,13 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="No se pudo validar las credenciales",
         )
-        
-    user = db.query(User).filter(User.user_id == token_data.sub).first()
     
+    return token_data
+
+def _check_user(user: Optional[User]) -> User:
+    """
+    Verificar que el usuario del token exista y esté activo.
+    """
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,6 +85,69 @@ def get_current_user(
         
     return user
 
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> User:
+    """
+    Dependencia para obtener el usuario actual a partir del token JWT.
+    
+    El usuario de cada token se guarda unos segundos en caché (ver
+    UserCache), por lo que la mayoría de las peticiones no consultan la base
+    de datos. El usuario devuelto está desvinculado de la sesión.
+    """
+    cache = get_user_cache()
+    user = cache.get(token)
+    if user is not None:
+        return user
+    
+    token_data = _decode_token(token)
+    user = _check_user(db.query(User).filter(User.user_id == token_data.sub).first())
+    db.expunge(user)
+    cache.put(token, user, token_data.exp)
+    return user
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(oauth2_scheme)
+) -> User:
+    """
+    Dependencia para obtener el usuario actual con la sesión asíncrona.
+    """
+    cache = get_user_cache()
+    user = cache.get(token)
+    if user is not None:
+        return user
+    
+    token_data = _decode_token(token)
+    user = _check_user(await db.get(User, token_data.sub))
+    db.expunge(user)
+    cache.put(token, user, token_data.exp)
+    return user
+
+def async_read(async_endpoint: Callable) -> Callable[[Callable], Callable]:
+    """
+    Registrar la versión asíncrona de un endpoint de lectura si DB_ASYNC_READS
+    está activo.
+    
+    Con la sesión síncrona cada petición ocupa un hilo del threadpool de
+    Starlette mientras espera a la base de datos; la versión asíncrona espera
+    en el bucle de eventos. Se aplica debajo del decorador de la ruta:
+    
+        @router.get("/")
+        @async_read(get_posts_async)
+        def get_posts(...): ...
+    
+    Args:
+        async_endpoint: Versión asíncrona, con los mismos parámetros y respuesta
+    
+    Returns:
+        Decorador que devuelve la versión a registrar
+    """
+    def choose(sync_endpoint: Callable) -> Callable:
+        return async_endpoint if settings.DB_ASYNC_READS else sync_endpoint
+    return choose
+
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -1,36 +1,87 @@
 # app/api/endpoints/auth.py
-from datetime import timedelta
-from typing import Any
+from datetime import datetime, timedelta
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.security import create_access_token
 from app.api.deps import get_db
 from app.db.models import User
 from app.schemas.user import UserCreate, UserInDB, Token, UserLogin
+from app.services.login_limiter import get_login_limiter
+from app.services.password_hasher import PasswordHasherBusy, get_password_hasher
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-@router.post("/login", response_model=Token)
-def login(
-    db: Session = Depends(get_db),
-    form_data: OAuth2PasswordRequestForm = Depends()
-) -> Any:
+def _get_user(db: Session, username: str) -> Optional[User]:
+    """Buscar un usuario por username."""
+    return db.query(User).filter(User.username == username).first()
+
+def _save_login(db: Session, user: User, new_hash: Optional[str]) -> None:
+    """Actualizar el último login y, si cambió el costo de bcrypt, el hash."""
+    user.last_login = datetime.utcnow()
+    if new_hash:
+        user.hashed_password = new_hash
+    db.commit()
+
+async def authenticate(
+    request: Request,
+    db: Session,
+    username: str,
+    password: str,
+    headers: Optional[dict] = None
+) -> str:
     """
-    Login para obtener token de acceso.
+    Verificar las credenciales y emitir un token de acceso.
+    
+    Los intentos que superan los límites por usuario o por IP se rechazan
+    antes de ejecutar bcrypt (429), y bcrypt corre en su propio pool (503 si
+    está lleno), no en el threadpool que atiende al resto de endpoints.
+    
+    Args:
+        request: Petición, para la IP del cliente
+        db: Sesión de base de datos
+        username: Usuario
+        password: Contraseña en texto plano
+        headers: Cabeceras de las respuestas 401
+        
+    Returns:
+        Token JWT
     """
+    limiter = get_login_limiter()
+    retry_after = limiter.acquire(username, request.client.host if request.client else None)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos de inicio de sesión",
+            headers={"Retry-After": str(retry_after)},
+        )
+    
     # Buscar usuario por username
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await run_in_threadpool(_get_user, db, username)
     
     # Verificar credenciales
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await get_password_hasher().verify(password, user.hashed_password)
+        except PasswordHasherBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Demasiados inicios de sesión simultáneos, reintentar en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+    
+    if not valid:
+        limiter.record_failure(username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario o contraseña incorrectos",
-            headers={"WWW-Authenticate": "Bearer"},
+            headers=headers,
         )
     
     # Verificar si el usuario está activo
@@ -38,9 +89,11 @@ def login(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario inactivo",
-            headers={"WWW-Authenticate": "Bearer"},
+            headers=headers,
         )
     
+    limiter.record_success(username)
+    
     # Generar token de acceso
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     token = create_access_token(
@@ -48,10 +101,24 @@ def login(
         expires_delta=access_token_expires
     )
     
-    # Actualizar último login
-    from datetime import datetime
-    user.last_login = datetime.utcnow()
-    db.commit()
+    # Actualizar último login (y el hash si se cambió BCRYPT_ROUNDS)
+    await run_in_threadpool(_save_login, db, user, new_hash)
+    
+    return token
+
+@router.post("/login", response_model=Token)
+async def login(
+    request: Request,
+    db: Session = Depends(get_db),
+    form_data: OAuth2PasswordRequestForm = Depends()
+) -> Any:
+    """
+    Login para obtener token de acceso.
+    """
+    token = await authenticate(
+        request, db, form_data.username, form_data.password,
+        headers={"WWW-Authenticate": "Bearer"}
+    )
     
     return {
         "access_token": token,
@@ -59,57 +126,23 @@ def login(
     }
 
 @router.post("/login/api", response_model=Token)
-def login_api(
+async def login_api(
+    request: Request,
     login_data: UserLogin,
     db: Session = Depends(get_db)
 ) -> Any:
     """
     Login para obtener token de acceso (versión API).
     """
-    # Buscar usuario por username
-    user = db.query(User).filter(User.username == login_data.username).first()
-    
-    # Verificar credenciales
-    if not user or not verify_password(login_data.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Usuario o contraseña incorrectos",
-        )
-    
-    # Verificar si el usuario está activo
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Usuario inactivo",
-        )
-    
-    # Generar token de acceso
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    token = create_access_token(
-        subject=user.user_id,
-        expires_delta=access_token_expires
-    )
-    
-    # Actualizar último login
-    from datetime import datetime
-    user.last_login = datetime.utcnow()
-    db.commit()
+    token = await authenticate(request, db, login_data.username, login_data.password)
     
     return {
         "access_token": token,
         "token_type": "bearer"
     }
 
-@router.post("/register", response_model=UserInDB)
-def register(
-    user_data: UserCreate,
-    db: Session = Depends(get_db)
-) -> Any:
-    """
-    Registrar un nuevo usuario.
-    
-    Esta ruta puede restringirse a solo administradores en un entorno de producción.
-    """
+def _create_user(db: Session, user_data: UserCreate, hashed_password: str) -> User:
+    """Crear el usuario si el username y el email están libres."""
     # Verificar si el usuario ya existe
     existing_user = db.query(User).filter(
         (User.username == user_data.username) | (User.email == user_data.email)
@@ -126,7 +159,7 @@ def register(
         username=user_data.username,
         email=user_data.email,
         full_name=user_data.full_name,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=hashed_password,
         is_active=user_data.is_active
     )
     
@@ -134,4 +167,25 @@ def register(
     db.commit()
     db.refresh(new_user)
     
-    return new_user
\ No newline at end of file
+    return new_user
+
+@router.post("/register", response_model=UserInDB)
+async def register(
+    user_data: UserCreate,
+    db: Session = Depends(get_db)
+) -> Any:
+    """
+    Registrar un nuevo usuario.
+    
+    Esta ruta puede restringirse a solo administradores en un entorno de producción.
+    """
+    try:
+        hashed_password = await get_password_hasher().hash(user_data.password)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiadas operaciones con contraseñas, reintentar en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+    
+    return await run_in_threadpool(_create_user, db, user_data, hashed_password)
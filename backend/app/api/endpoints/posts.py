@@ -1,30 +1,105 @@
 # app/api/endpoints/posts.py
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Form, File, UploadFile, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Form, File, UploadFile, Query, Response
+from fastapi import status as status_codes
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import async_read, get_db, get_read_db, get_current_user, get_current_user_async
+from app.core.config import settings
+from app.db.async_database import get_async_db, get_async_read_db
 from app.db.models import Post, User
+from app.db.repositories import AsyncPostRepository, PostRepository
 from app.schemas.post import (
     PostCreate, PostUpdate, PostResponse, PostInDB, 
-    PostSchedule, PostPublishNow
+    PostSchedule, PostScheduleBatch, PostPublishNow, PostPublishBatch, PostPublishCarousel,
+    PublishJobResponse
 )
+from app.services.batch_publisher import BatchPublisher
+from app.services.capacity_planner import get_capacity_planner
 from app.services.image_generator import ImageGenerator
 from app.services.instagram_publisher import InstagramPublisher
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.schedule_client import build_trigger, get_first_run_time, get_schedule_client
+from app.utils.image_utils import attach_image_urls
+from app.utils.pagination import (
+    NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, keyset_paginate, keyset_statement, split_page
+)
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
+def raise_rate_limited(error: RateLimitExceeded) -> None:
+    """
+    Responder 429 cuando el limitador de Instagram no dio lugar a tiempo.
+    """
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Se alcanzó el límite de subidas a Instagram, reintentar más tarde",
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+async def get_posts_async(
+    response: Response,
+    skip: int = 0, 
+    limit: int = Query(100, ge=1, le=1000),
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
+) -> Any:
+    """
+    Obtener las publicaciones, de la más reciente a la más antigua.
+    
+    Misma paginación que la versión síncrona (X-Next-Cursor, X-Total-Count).
+    """
+    statement = select(Post)
+    if status:
+        statement = statement.where(Post.status == status)
+    
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(statement.subquery()))
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+    
+    try:
+        page = keyset_statement(statement, Post.created_at, Post.post_id, limit, cursor, skip)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status_codes.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    posts, next_cursor = split_page(list(await db.scalars(page)), limit, Post.created_at, Post.post_id)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    attach_image_urls(posts)
+    return posts
+
 @router.get("/", response_model=List[PostResponse])
+@async_read(get_posts_async)
 def get_posts(
+    response: Response,
     skip: int = 0, 
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Obtener todas las publicaciones.
+    Obtener las publicaciones, de la más reciente a la más antigua.
+    
+    La paginación es por cursor: si hay más resultados, la respuesta incluye
+    la cabecera X-Next-Cursor con el valor a enviar como `cursor` para pedir
+    la página siguiente. Con `include_total` se agrega X-Total-Count. `skip`
+    se mantiene por compatibilidad, pero una página profunda es más rápida con
+    el cursor.
+    
+    Lee de la réplica si hay una al día (ver get_read_db).
     """
     # Construir query base
     query = db.query(Post)
@@ -33,18 +108,23 @@ def get_posts(
     if status:
         query = query.filter(Post.status == status)
     
+    if include_total:
+        response.headers[TOTAL_COUNT_HEADER] = str(query.count())
+    
     # Obtener posts con paginación
-    posts = query.offset(skip).limit(limit).all()
+    try:
+        posts, next_cursor = keyset_paginate(query, Post.created_at, Post.post_id, limit, cursor, skip)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status_codes.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     # Agregar URL de imagen para la respuesta
-    for post in posts:
-        # Buscar la imagen generada (si existe)
-        import glob, os
-        from app.utils.image_utils import get_image_url
-        
-        image_files = glob.glob(f"media/generated/post_{post.post_id}_*.png")
-        if image_files:
-            post.image_url = get_image_url(image_files[0])
+    attach_image_urls(posts)
     
     return posts
 
@@ -74,7 +154,9 @@ def create_post(
     
     db.add(db_post)
     db.commit()
-    db.refresh(db_post)
+    
+    # Recargar el post con su plantilla (y la imagen base) para generar la imagen
+    db_post = PostRepository(db).get(db_post.post_id, with_image=True)
     
     # Generar imagen para la publicación
     image_generator = ImageGenerator()
@@ -135,7 +217,157 @@ def preview_post(
             detail=f"Error al generar vista previa: {str(e)}"
         )
 
+@router.post("/publish-batch", response_model=PublishJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def publish_batch(
+    batch_data: PostPublishBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Publicar varios posts en un lote que se ejecuta en segundo plano.
+    
+    El progreso de cada post se consulta en GET /posts/publish-batch/{job_id}.
+    """
+    batch_publisher = BatchPublisher()
+    job = batch_publisher.create_job(
+        db,
+        post_ids=batch_data.post_ids,
+        include_story=batch_data.include_story,
+        user_id=current_user.user_id,
+        as_carousel=batch_data.as_carousel
+    )
+    batch_publisher.submit(job.job_id, batch_data.max_concurrency)
+    
+    return batch_publisher.get_job_status(db, job.job_id)
+
+@router.get("/publish-batch/{job_id}", response_model=PublishJobResponse)
+def get_publish_batch(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Obtener el progreso de un lote de publicación.
+    """
+    job_status = BatchPublisher().get_job_status(db, job_id)
+    
+    if not job_status:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Lote de publicación no encontrado"
+        )
+    
+    return job_status
+
+@router.post("/publish-carousel", response_model=dict)
+def publish_carousel(
+    carousel_data: PostPublishCarousel,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Publicar varios posts como un único carrusel de Instagram.
+    """
+    # En el orden solicitado para las diapositivas
+    posts = PostRepository(db).get_many(carousel_data.post_ids, with_image=True)
+    
+    found_ids = {post.post_id for post in posts}
+    missing_ids = [post_id for post_id in carousel_data.post_ids if post_id not in found_ids]
+    if missing_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Publicaciones no encontradas: {missing_ids}"
+        )
+    
+    publisher = InstagramPublisher(rate_limit_timeout=settings.INSTAGRAM_REQUEST_RATE_LIMIT_WAIT_SECONDS)
+    try:
+        success, media_id, error = publisher.publish_carousel(posts, db)
+    except RateLimitExceeded as e:
+        raise_rate_limited(e)
+    
+    if success:
+        return {
+            "success": True,
+            "message": "Carrusel publicado con éxito",
+            "instagram_post_id": media_id,
+            "post_ids": [post.post_id for post in posts]
+        }
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al publicar carrusel: {error}"
+        )
+
+@router.post("/schedule-batch", response_model=dict)
+def schedule_posts_batch(
+    batch_data: PostScheduleBatch,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Programar varios posts (p. ej. reprogramar una campaña) en una sola transacción.
+    
+    Los elementos con una programación no válida o un post inexistente se
+    informan en `errors` y no impiden programar los demás.
+    """
+    planner = get_capacity_planner()
+    items = []
+    assigned = set()
+    for item in batch_data.items:
+        scheduled_for = item.scheduled_for
+        if item.auto_slot:
+            scheduled_for = planner.assign(item.post_id, scheduled_for)
+            assigned.add(item.post_id)
+        
+        items.append({
+            "post_id": item.post_id,
+            "scheduled_time": scheduled_for,
+            "frequency": item.frequency,
+            "recurrence_pattern": item.recurrence_pattern,
+            "end_date": item.end_date,
+            "timezone_name": item.timezone,
+            "blackout_windows": item.blackout_windows
+        })
+    
+    scheduled, errors = get_schedule_client().schedule_posts(items)
+    # Liberar los horarios reservados de los posts que no se programaron
+    for post_id in assigned.difference(scheduled):
+        planner.cancel(post_id)
+    scheduled_times = {item["post_id"]: item["scheduled_time"] for item in items}
+    
+    return {
+        "success": not errors,
+        "message": f"{len(scheduled)} publicaciones programadas",
+        "scheduled": [
+            {"post_id": post_id, "scheduled_for": scheduled_times[post_id]}
+            for post_id in scheduled
+        ],
+        "errors": [
+            {"post_id": post_id, "detail": detail}
+            for post_id, detail in errors.items()
+        ]
+    }
+
+async def get_post_async(
+    post_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+) -> Any:
+    """
+    Obtener una publicación por ID.
+    """
+    post = await AsyncPostRepository(db).get(post_id)
+    
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Publicación no encontrada"
+        )
+    
+    attach_image_urls([post])
+    return post
+
 @router.get("/{post_id}", response_model=PostResponse)
+@async_read(get_post_async)
 def get_post(
     post_id: int,
     db: Session = Depends(get_db),
@@ -153,14 +385,7 @@ def get_post(
         )
     
     # Agregar URL de imagen para la respuesta
-    import glob
-    from app.utils.image_utils import get_image_url
-    
-    image_files = glob.glob(f"media/generated/post_{post.post_id}_*.png")
-    if image_files:
-        post.image_url = get_image_url(image_files[0])
-    else:
-        post.image_url = None
+    attach_image_urls([post])
     
     return post
 
@@ -187,9 +412,6 @@ def update_post(
     for key, value in update_data.items():
         setattr(post, key, value)
     
-    db.commit()
-    db.refresh(post)
-    
     # Volver a generar la imagen si se modificaron datos relevantes
     relevant_fields = [
         "job_title", "location", "email", "requirements", 
@@ -197,7 +419,15 @@ def update_post(
         "requirements_priority", "template_id"
     ]
     
+    # La imagen anterior deja de estar lista para publicar
     if any(field in update_data for field in relevant_fields):
+        post.image_ready_at = None
+        post.render_error = None
+    
+    db.commit()
+    
+    if any(field in update_data for field in relevant_fields):
+        post = PostRepository(db).get(post_id, with_image=True)
         image_generator = ImageGenerator()
         try:
             _, image_url = image_generator.generate_post_image(post)
@@ -206,15 +436,8 @@ def update_post(
             # Si hay error al generar la imagen, continuamos
             post.image_url = None
     else:
-        # Mantener la imagen existente
-        import glob
-        from app.utils.image_utils import get_image_url
-        
-        image_files = glob.glob(f"media/generated/post_{post.post_id}_*.png")
-        if image_files:
-            post.image_url = get_image_url(image_files[0])
-        else:
-            post.image_url = None
+        # Mantener la imagen existente (la más reciente)
+        attach_image_urls([post])
     
     return post
 
@@ -237,9 +460,7 @@ def delete_post(
     
     # Cancelar programación si está programada
     if post.status == "scheduled":
-        from app.services.scheduler import PostScheduler
-        scheduler = PostScheduler()
-        scheduler.cancel_scheduled_post(post_id)
+        get_schedule_client().cancel_scheduled_post(post_id)
     
     # Eliminar post
     db.delete(post)
@@ -264,7 +485,7 @@ def publish_post(
     """
     Publicar inmediatamente un post en Instagram.
     """
-    post = db.query(Post).filter(Post.post_id == post_id).first()
+    post = PostRepository(db).get(post_id, with_image=True)
     
     if not post:
         raise HTTPException(
@@ -272,14 +493,16 @@ def publish_post(
             detail="Publicación no encontrada"
         )
     
-    # Publicar en Instagram
-    publisher = InstagramPublisher()
-    success, instagram_post_id, error = publisher.publish_post(post, db)
-    
+    # Publicar en el feed y en stories con una única preparación de la imagen
+    publisher = InstagramPublisher(rate_limit_timeout=settings.INSTAGRAM_REQUEST_RATE_LIMIT_WAIT_SECONDS)
+    try:
+        results = publisher.publish_post_with_story(post, db)
+    except RateLimitExceeded as e:
+        raise_rate_limited(e)
+    success, instagram_post_id, error = results["post"]
+    story_success, story_id, story_error = results["story"]
+
     if success:
-        # Publicar también en stories
-        story_success, story_id, story_error = publisher.publish_story(post, db)
-        
         return {
             "success": True,
             "message": "Publicación realizada con éxito",
@@ -311,27 +534,57 @@ def schedule_post(
             detail="Publicación no encontrada"
         )
     
-    # Programar publicación
-    from app.services.scheduler import PostScheduler
-    scheduler = PostScheduler()
-    
-    success = scheduler.schedule_post(
-        post_id=post_id,
-        scheduled_time=schedule_data.scheduled_for,
-        frequency=schedule_data.frequency
-    )
+    # Mover la publicación al primer horario libre de la cuenta; en las
+    # recurrentes solo se ajusta la primera ocurrencia
+    scheduled_for = schedule_data.scheduled_for
+    if schedule_data.auto_slot:
+        scheduled_for = get_capacity_planner().assign(post_id, scheduled_for)
     
-    if success:
-        return {
-            "success": True,
-            "message": "Publicación programada con éxito",
-            "scheduled_for": schedule_data.scheduled_for
-        }
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error al programar la publicación"
+    try:
+        # Validar la recurrencia antes de guardar nada
+        try:
+            get_first_run_time(build_trigger(
+                schedule_data.frequency,
+                scheduled_for,
+                schedule_data.recurrence_pattern,
+                schedule_data.end_date,
+                schedule_data.timezone,
+                schedule_data.blackout_windows
+            ))
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
+        # Programar publicación
+        success = get_schedule_client().schedule_post(
+            post_id=post_id,
+            scheduled_time=scheduled_for,
+            frequency=schedule_data.frequency,
+            recurrence_pattern=schedule_data.recurrence_pattern,
+            end_date=schedule_data.end_date,
+            timezone_name=schedule_data.timezone,
+            blackout_windows=schedule_data.blackout_windows
         )
+        if not success:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error al programar la publicación"
+            )
+    except Exception:
+        # Liberar el horario reservado si la programación no se guardó
+        if schedule_data.auto_slot:
+            get_capacity_planner().cancel(post_id)
+        raise
+    
+    return {
+        "success": True,
+        "message": "Publicación programada con éxito",
+        "scheduled_for": scheduled_for,
+        "requested_for": schedule_data.scheduled_for,
+        "adjusted": scheduled_for != schedule_data.scheduled_for
+    }
 
 @router.post("/{post_id}/cancel-schedule", response_model=dict)
 def cancel_schedule(
@@ -351,10 +604,7 @@ def cancel_schedule(
         )
     
     # Cancelar programación
-    from app.services.scheduler import PostScheduler
-    scheduler = PostScheduler()
-    
-    success = scheduler.cancel_scheduled_post(post_id)
+    success = get_schedule_client().cancel_scheduled_post(post_id)
     
     if success:
         return {
@@ -1,64 +1,123 @@
 # app/api/endpoints/scheduler.py
+import json
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import async_read, get_db, get_read_db, get_current_user, get_current_user_async
+from app.db.async_database import get_async_read_db
+from app.core.config import settings
 from app.db.models import User, Post, ScheduleSettings
-from app.services.scheduler import PostScheduler
-from app.utils.image_utils import get_image_url
+from app.db.repositories import AsyncPostRepository, PostRepository
+from app.services.capacity_planner import get_capacity_planner
+from app.services.leader_election import get_lease_status
+from app.services.recurrence import compile_recurrence, describe_next_runs
+from app.services.schedule_client import (
+    build_trigger,
+    get_first_run_time,
+    get_schedule_client,
+    serialize_blackout_windows
+)
+from app.utils.image_utils import attach_image_urls
 
 router = APIRouter(prefix="/scheduler", tags=["scheduler"])
 
-@router.get("/upcoming")
-def get_upcoming_posts(
-    hours: int = 24,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-) -> Any:
+def format_upcoming_posts(posts: List[Post]) -> List[dict]:
     """
-    Obtener posts programados para las próximas X horas.
+    Formatear los posts próximos, con la URL de su imagen.
     """
-    # Usar el servicio de programación
-    scheduler = PostScheduler()
-    posts = scheduler.get_pending_posts(hours)
-    
-    # Agregar URL de imagen para la respuesta
-    for post in posts:
-        # Buscar la imagen generada (si existe)
-        import glob, os
-        
-        image_files = glob.glob(f"media/generated/post_{post.post_id}_*.png")
-        if image_files:
-            post.image_url = get_image_url(image_files[0])
-        else:
-            post.image_url = None
+    attach_image_urls(posts)
     
-    # Formatear la respuesta
-    result = []
-    for post in posts:
-        result.append({
+    return [
+        {
             "post_id": post.post_id,
             "job_title": post.job_title,
             "location": post.location,
             "email": post.email,
             "status": post.status,
             "scheduled_for": post.scheduled_for,
-            "image_url": getattr(post, "image_url", None)
-        })
+            "image_url": post.image_url
+        }
+        for post in posts
+    ]
+
+async def get_upcoming_posts_async(
+    hours: int = 24,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
+) -> Any:
+    """
+    Obtener posts programados para las próximas X horas.
+    """
+    now = datetime.utcnow()
+    posts = await AsyncPostRepository(db).get_scheduled_between(now, now + timedelta(hours=hours))
+    return format_upcoming_posts(posts)
+
+@router.get("/upcoming")
+@async_read(get_upcoming_posts_async)
+def get_upcoming_posts(
+    hours: int = 24,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Obtener posts programados para las próximas X horas.
+    """
+    now = datetime.utcnow()
+    posts = PostRepository(db).get_scheduled_between(now, now + timedelta(hours=hours))
     
-    return result
+    # Formatear la respuesta
+    return format_upcoming_posts(posts)
 
-@router.get("/calendar")
-def get_calendar(
-    start_date: datetime,
-    end_date: datetime,
+@router.get("/status")
+def get_scheduler_status(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Obtener posts programados en un rango de fechas.
+    Obtener el proceso que ejecuta los jobs programados.
+    """
+    lease = get_lease_status(db, "scheduler")
+    
+    return {
+        "has_leader": bool(lease and not lease["is_expired"]),
+        "lease": lease
+    }
+
+@router.get("/slots")
+def get_free_slots(
+    desired: datetime,
+    count: int = 5,
+    post_id: int = None,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Sugerir los próximos horarios libres a partir de una hora deseada.
+    
+    Los horarios respetan la separación mínima y el máximo de publicaciones
+    por hora de la cuenta. Con `post_id` no se tienen en cuenta las horas
+    actuales de ese post (al reprogramarlo).
+    """
+    if count < 1 or count > 50:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Se pueden sugerir entre 1 y 50 horarios"
+        )
+    
+    slots = get_capacity_planner().suggest_slots(desired, count, exclude_post_id=post_id)
+    
+    return {
+        "desired": desired,
+        "slots": slots,
+        "min_spacing_minutes": settings.SCHEDULER_PLANNER_MIN_SPACING_MINUTES,
+        "max_posts_per_hour": settings.SCHEDULER_PLANNER_MAX_POSTS_PER_HOUR
+    }
+
+def validate_calendar_range(start_date: datetime, end_date: datetime) -> None:
+    """
+    Verificar el rango de fechas del calendario.
     """
     # Verificar que el rango sea válido
     if end_date < start_date:
@@ -73,27 +132,54 @@ def get_calendar(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El rango máximo permitido es de 90 días"
         )
-    
-    # Obtener posts programados en el rango
-    posts = db.query(Post).filter(
-        Post.status == "scheduled",
-        Post.scheduled_for >= start_date,
-        Post.scheduled_for <= end_date
-    ).all()
-    
-    # Formatear la respuesta para calendario
-    calendar_events = []
-    for post in posts:
-        calendar_events.append({
+
+def format_calendar_events(posts: List[Post]) -> List[dict]:
+    """
+    Formatear los posts programados como eventos de calendario.
+    """
+    return [
+        {
             "id": post.post_id,
             "title": post.job_title,
             "start": post.scheduled_for.isoformat(),
             "end": (post.scheduled_for + timedelta(minutes=30)).isoformat(),
             "location": post.location,
             "status": post.status
-        })
+        }
+        for post in posts
+    ]
+
+async def get_calendar_async(
+    start_date: datetime,
+    end_date: datetime,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
+) -> Any:
+    """
+    Obtener posts programados en un rango de fechas.
+    """
+    validate_calendar_range(start_date, end_date)
+    posts = await AsyncPostRepository(db).get_scheduled_between(start_date, end_date)
+    return format_calendar_events(posts)
+
+@router.get("/calendar")
+@async_read(get_calendar_async)
+def get_calendar(
+    start_date: datetime,
+    end_date: datetime,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Obtener posts programados en un rango de fechas.
+    """
+    validate_calendar_range(start_date, end_date)
     
-    return calendar_events
+    # Obtener posts programados en el rango
+    posts = PostRepository(db).get_scheduled_between(start_date, end_date)
+    
+    # Formatear la respuesta para calendario
+    return format_calendar_events(posts)
 
 @router.get("/settings/{post_id}")
 def get_schedule_settings(
@@ -126,6 +212,22 @@ def get_schedule_settings(
             "is_active": False
         }
     
+    # Vista previa de las próximas publicaciones
+    next_runs = []
+    if schedule.is_active:
+        try:
+            recurrence = compile_recurrence(
+                schedule.frequency or "once",
+                schedule.scheduled_time,
+                schedule.recurrence_pattern,
+                schedule.end_date,
+                schedule.timezone,
+                schedule.blackout_windows
+            )
+            next_runs = describe_next_runs(recurrence, datetime.utcnow())
+        except ValueError:
+            next_runs = []
+    
     return {
         "post_id": post_id,
         "has_schedule": True,
@@ -133,7 +235,10 @@ def get_schedule_settings(
         "frequency": schedule.frequency,
         "recurrence_pattern": schedule.recurrence_pattern,
         "end_date": schedule.end_date,
-        "is_active": schedule.is_active
+        "timezone": schedule.timezone,
+        "blackout_windows": json.loads(schedule.blackout_windows) if schedule.blackout_windows else None,
+        "is_active": schedule.is_active,
+        "next_runs": next_runs
     }
 
 @router.put("/settings/{post_id}")
@@ -143,12 +248,17 @@ def update_schedule_settings(
     frequency: str = "once",
     recurrence_pattern: str = None,
     end_date: datetime = None,
+    timezone: str = None,
+    blackout_windows: str = None,
     is_active: bool = True,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
     Actualizar configuración de programación para un post.
+    
+    `blackout_windows` es una lista JSON de ventanas sin publicación, por ejemplo
+    [{"start": "22:00", "end": "07:00"}].
     """
     # Verificar que el post existe
     post = db.query(Post).filter(Post.post_id == post_id).first()
@@ -158,6 +268,18 @@ def update_schedule_settings(
             detail="Publicación no encontrada"
         )
     
+    # Validar la recurrencia antes de guardar nada
+    if is_active:
+        try:
+            get_first_run_time(
+                build_trigger(frequency, scheduled_time, recurrence_pattern, end_date, timezone, blackout_windows)
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    
     # Obtener o crear configuración de programación
     schedule = db.query(ScheduleSettings).filter(
         ScheduleSettings.post_id == post_id
@@ -170,6 +292,8 @@ def update_schedule_settings(
             frequency=frequency,
             recurrence_pattern=recurrence_pattern,
             end_date=end_date,
+            timezone=timezone,
+            blackout_windows=serialize_blackout_windows(blackout_windows),
             is_active=is_active
         )
         db.add(schedule)
@@ -178,6 +302,8 @@ def update_schedule_settings(
         schedule.frequency = frequency
         schedule.recurrence_pattern = recurrence_pattern
         schedule.end_date = end_date
+        schedule.timezone = timezone
+        schedule.blackout_windows = serialize_blackout_windows(blackout_windows)
         schedule.is_active = is_active
     
     # Actualizar estado del post
@@ -191,11 +317,22 @@ def update_schedule_settings(
     db.commit()
     
     # Actualizar programación
-    scheduler = PostScheduler()
+    client = get_schedule_client()
     if is_active:
-        scheduler.schedule_post(post_id, scheduled_time, frequency)
+        success = client.schedule_post(
+            post_id, scheduled_time, frequency,
+            recurrence_pattern=recurrence_pattern,
+            end_date=end_date,
+            timezone_name=timezone,
+            blackout_windows=blackout_windows
+        )
+        if not success:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error al programar la publicación"
+            )
     else:
-        scheduler.cancel_scheduled_post(post_id)
+        client.cancel_scheduled_post(post_id)
     
     return {
         "success": True,
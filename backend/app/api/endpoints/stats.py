@@ -0,0 +1,33 @@
+# app/api/endpoints/stats.py
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db, get_current_user
+from app.db.models import User
+from app.schemas.stats import PostStats
+from app.services.post_stats import StatsNotReady, get_post_stats
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+@router.get("/", response_model=PostStats)
+def get_stats(
+    days: int = Query(30, ge=1, le=366),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Obtener las estadísticas del panel: posts por estado, publicaciones y
+    fallos por día y tasa de fallo de cada acción en los últimos X días.
+
+    Se leen de contadores actualizados con cada cambio, sin recorrer posts ni
+    post_logs. Responde 503 hasta que los contadores se calculen con
+    `python -m scripts.rebuild_post_stats`.
+    """
+    try:
+        return get_post_stats(db, days)
+    except StatsNotReady as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{str(e)}: ejecutar python -m scripts.rebuild_post_stats"
+        )
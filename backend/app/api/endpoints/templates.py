@@ -1,49 +1,125 @@
 # app/api/endpoints/templates.py
 import os
 import shutil
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Query, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import async_read, get_db, get_read_db, get_current_user, get_current_user_async
+from app.db.async_database import get_async_read_db
 from app.db.models import Template, User
+from app.db.repositories import AsyncTemplateRepository, TemplateRepository
 from app.schemas.template import TemplateCreate, TemplateUpdate, TemplateResponse
 from app.core.config import settings
+from app.services.caption_engine import compile_caption_format
 from app.utils.image_utils import get_image_url
+from app.utils.pagination import (
+    NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, keyset_paginate, keyset_statement, split_page
+)
 
 router = APIRouter(prefix="/templates", tags=["templates"])
 
+def validate_caption_format(caption_format: str) -> None:
+    """
+    Verificar que un formato de leyenda sea válido antes de guardarlo.
+    """
+    if caption_format:
+        try:
+            compile_caption_format(caption_format)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
+def attach_template_image_urls(templates: List[Template]) -> None:
+    """
+    Agregar a cada plantilla la URL de su imagen (o None si no tiene).
+    """
+    for template in templates:
+        template_path = os.path.join(settings.TEMPLATES_DIR, f"template_{template.template_id}.png")
+        template.image_url = get_image_url(template_path) if os.path.exists(template_path) else None
+
+async def get_templates_async(
+    response: Response,
+    skip: int = 0, 
+    limit: int = Query(100, ge=1, le=1000),
+    active_only: bool = True,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
+) -> Any:
+    """
+    Obtener las plantillas, de la más reciente a la más antigua.
+    
+    Misma paginación que la versión síncrona (X-Next-Cursor, X-Total-Count).
+    """
+    statement = AsyncTemplateRepository(db).statement(active_only)
+    
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(statement.subquery()))
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+    
+    try:
+        page = keyset_statement(statement, Template.created_at, Template.template_id, limit, cursor, skip)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    templates, next_cursor = split_page(
+        list(await db.scalars(page)), limit, Template.created_at, Template.template_id
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    attach_template_image_urls(templates)
+    return templates
+
 @router.get("/", response_model=List[TemplateResponse])
+@async_read(get_templates_async)
 def get_templates(
+    response: Response,
     skip: int = 0, 
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
     active_only: bool = True,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Obtener todas las plantillas.
+    Obtener las plantillas, de la más reciente a la más antigua.
+    
+    Paginación por cursor con las cabeceras X-Next-Cursor y, con
+    `include_total`, X-Total-Count (ver GET /posts).
     """
-    # Construir query base
-    query = db.query(Template)
+    # Construir query base (sin las imágenes de las plantillas)
+    query = TemplateRepository(db).query(active_only)
     
-    # Filtrar por activas si se especifica
-    if active_only:
-        query = query.filter(Template.is_active == True)
+    if include_total:
+        response.headers[TOTAL_COUNT_HEADER] = str(query.count())
     
     # Obtener plantillas con paginación
-    templates = query.offset(skip).limit(limit).all()
+    try:
+        templates, next_cursor = keyset_paginate(
+            query, Template.created_at, Template.template_id, limit, cursor, skip
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     # Agregar URL de imagen para la respuesta
-    for template in templates:
-        # Buscar la imagen de plantilla (si existe)
-        import glob
-        
-        template_path = os.path.join(settings.TEMPLATES_DIR, f"template_{template.template_id}.png")
-        if os.path.exists(template_path):
-            template.image_url = get_image_url(template_path)
-        else:
-            template.image_url = None
+    attach_template_image_urls(templates)
     
     return templates
 
@@ -54,6 +130,7 @@ def create_template(
     background_color: str = Form("#FFFFFF"),
     text_color: str = Form("#000000"),
     footer_text: str = Form(None),
+    caption_format: str = Form(None),
     image: UploadFile = File(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -61,6 +138,8 @@ def create_template(
     """
     Crear una nueva plantilla.
     """
+    validate_caption_format(caption_format)
+    
     # Crear plantilla en la base de datos
     db_template = Template(
         name=name,
@@ -68,6 +147,7 @@ def create_template(
         background_color=background_color,
         text_color=text_color,
         footer_text=footer_text,
+        caption_format=caption_format,
         is_active=True
     )
     
@@ -146,6 +226,7 @@ def update_template(
     
     # Actualizar solo los campos proporcionados
     update_data = template_data.dict(exclude_unset=True)
+    validate_caption_format(update_data.get("caption_format"))
     for key, value in update_data.items():
         setattr(template, key, value)
     
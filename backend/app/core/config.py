@@ -51,12 +51,113 @@ class Settings(BaseSettings):
     DB_PASSWORD: str
     DB_DRIVER: str = "ODBC Driver 17 for SQL Server"
 
+    # Pool de conexiones (por proceso; ver get_pool_stats)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1200  # Segundos; menor que el corte por inactividad del servidor
+    DB_POOL_PING: str = "recycle"  # pre_ping, recycle, none
+    DB_POOL_USE_LIFO: bool = True
+    DB_FAST_EXECUTEMANY: bool = True
+
+    # Acceso asíncrono (SQLAlchemy asyncio) en los endpoints de lectura, con
+    # su propio pool (el resto de DB_POOL_* se comparte). Sin el límite de
+    # hilos de Starlette, las lecturas simultáneas quedan acotadas por este
+    # pool. ASYNC_DATABASE_URL se deriva de la URL síncrona si no se indica
+    # (mssql+aioodbc, sqlite+aiosqlite)
+    DB_ASYNC_READS: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None
+    DB_ASYNC_POOL_SIZE: int = 40
+    DB_ASYNC_MAX_OVERFLOW: int = 20
+
+    # Réplica de lectura (DATABASE_REPLICA_URL): los listados y el calendario
+    # la usan mientras su retraso no supere DB_REPLICA_MAX_LAG_SECONDS; si no,
+    # o si no responde, leen del primario. El retraso se mide cada
+    # DB_REPLICA_CHECK_INTERVAL_SECONDS y puede incluir hasta ese intervalo
+    DB_REPLICA_MAX_LAG_SECONDS: float = 30
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = 5
+    # Espera máxima (segundos) al conectar con la réplica y al medir su retraso
+    DB_REPLICA_CONNECT_TIMEOUT_SECONDS: int = 3
+
+    # Registros de acciones (PostLog): se insertan en lote al acumular
+    # AUDIT_LOG_BATCH_SIZE o cada AUDIT_LOG_FLUSH_SECONDS, con un respaldo en
+    # disco hasta insertarlos (ver app/services/audit_log.py)
+    AUDIT_LOG_BUFFERED: bool = True
+    AUDIT_LOG_BATCH_SIZE: int = 200
+    AUDIT_LOG_FLUSH_SECONDS: float = 2.0
+    AUDIT_LOG_SPILL_DIR: str = "audit_spill"
+
     # Instagram API
     INSTAGRAM_USERNAME: str
     INSTAGRAM_PASSWORD: str
     INSTAGRAM_BUSINESS_ACCOUNT_ID: Optional[str] = None
     INSTAGRAM_ACCESS_TOKEN: Optional[str] = None
-    
+    # Límite de subidas por proceso (cada worker y el programador tienen el suyo)
+    INSTAGRAM_UPLOADS_PER_HOUR: int = 25
+    INSTAGRAM_MAX_CONCURRENT_UPLOADS: int = 2
+    # Espera máxima por el limitador en las publicaciones inmediatas (después, 429)
+    INSTAGRAM_REQUEST_RATE_LIMIT_WAIT_SECONDS: float = 10
+    INSTAGRAM_UPLOAD_RETRIES: int = 3
+    INSTAGRAM_RETRY_BACKOFF_SECONDS: float = 30
+    INSTAGRAM_BACKEND: str = "instagrapi"  # instagrapi, fake
+    INSTAGRAM_SESSION_CHECK_SECONDS: int = 300
+
+    # Publicación en lote
+    BATCH_PUBLISH_MAX_CONCURRENCY: int = 4
+    BATCH_RENDER_WORKERS: int = 4
+    BATCH_PUBLISH_MAX_JOBS: int = 2
+    # Latido de los lotes en ejecución; sin latido por STALE_SECONDS se dan por fallidos
+    BATCH_PUBLISH_HEARTBEAT_SECONDS: int = 30
+    BATCH_PUBLISH_STALE_SECONDS: int = 300
+
+    # Programador (elección de líder)
+    SCHEDULER_LEASE_TTL_SECONDS: int = 15
+    SCHEDULER_LEASE_RENEW_SECONDS: int = 5
+    # El líder deja de ejecutar jobs este margen antes del vencimiento del lease
+    # si la renovación no termina (p. ej. bloqueada esperando una conexión)
+    SCHEDULER_LEASE_MARGIN_SECONDS: float = 3
+    SCHEDULER_NOTIFY_POLL_SECONDS: float = 1.0
+    SCHEDULER_MISFIRE_GRACE_SECONDS: int = 300
+    SCHEDULER_EXECUTOR_WORKERS: int = 20
+    SCHEDULER_DRAIN_TIMEOUT_SECONDS: float = 60
+    SCHEDULER_HEALTH_HOST: str = "127.0.0.1"
+    SCHEDULER_HEALTH_PORT: int = 8081  # 0 para desactivar
+
+    # Programador (recuperación de publicaciones vencidas al iniciar)
+    SCHEDULER_CATCHUP_POLICY: str = "publish_now"  # publish_now, spread, skip
+    SCHEDULER_CATCHUP_MAX_PER_MINUTE: int = 10
+    SCHEDULER_CATCHUP_SPREAD_MINUTES: int = 60
+    SCHEDULER_CATCHUP_MAX_AGE_HOURS: int = 72
+    SCHEDULER_CATCHUP_PAGE_SIZE: int = 500
+
+    # Programador (despacho por franjas)
+    SCHEDULER_DISPATCH_MODE: str = "bucket"  # bucket, per_job
+    SCHEDULER_DISPATCH_BUCKET_SECONDS: int = 60
+    SCHEDULER_DISPATCH_WINDOW_SECONDS: float = 2.0
+    SCHEDULER_DISPATCH_CONCURRENCY: int = 4
+
+    # Programador (ejecución de las publicaciones)
+    SCHEDULER_EXECUTION_MODE: str = "threads"  # threads, asyncio
+    SCHEDULER_ASYNC_CONCURRENCY: int = 50
+    SCHEDULER_ASYNC_DB_WORKERS: int = 4
+    SCHEDULER_ASYNC_RENDER_WORKERS: int = 2
+    SCHEDULER_ASYNC_IO_WORKERS: int = 4
+
+    # Programador (planificación de horarios de la cuenta)
+    SCHEDULER_PLANNER_MIN_SPACING_MINUTES: float = 10
+    SCHEDULER_PLANNER_MAX_POSTS_PER_HOUR: int = 4
+    SCHEDULER_PLANNER_HORIZON_DAYS: int = 30
+
+    # Programador (pre-generación de imágenes)
+    SCHEDULER_PRERENDER_HORIZON_MINUTES: int = 180
+    SCHEDULER_PRERENDER_INTERVAL_SECONDS: int = 300
+
+    # Backend falso de Instagram (pruebas de carga)
+    FAKE_INSTAGRAM_LATENCY_MS: float = 300
+    FAKE_INSTAGRAM_ERROR_RATE: float = 0.0
+    FAKE_INSTAGRAM_RATE_LIMIT_RATE: float = 0.0
+    FAKE_INSTAGRAM_CHALLENGE_RATE: float = 0.0
+
     # Media storage
     MEDIA_DIR: str = "media"
     TEMPLATES_DIR: str = "media/templates"
@@ -64,6 +165,22 @@ class Settings(BaseSettings):
     
     # Security
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    # Caché por proceso del usuario de cada token (0 la desactiva); un
+    # usuario desactivado desde otro proceso puede seguir entrando hasta el TTL
+    USER_CACHE_TTL_SECONDS: float = 30
+    USER_CACHE_MAX_SIZE: int = 10000
+    # Costo de bcrypt; los hashes con otro costo se rehacen al iniciar sesión
+    BCRYPT_ROUNDS: int = 12
+    # Pool propio para bcrypt: hilos y operaciones admitidas a la vez (las
+    # siguientes reciben 503 sin esperar)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 16
+    # Intentos de inicio de sesión por ventana, por proceso: fallidos por
+    # usuario y totales por IP (la del cliente según uvicorn; detrás de un
+    # proxy requiere X-Forwarded-For)
+    LOGIN_ATTEMPT_WINDOW_SECONDS: int = 300
+    LOGIN_MAX_FAILURES_PER_USERNAME: int = 5
+    LOGIN_MAX_ATTEMPTS_PER_IP: int = 30
     
     class Config:
         case_sensitive = True
@@ -1,13 +1,15 @@
 # app/core/security.py
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Optional, Tuple, Union
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Al cambiar BCRYPT_ROUNDS los hashes anteriores se actualizan en el siguiente
+# inicio de sesión (verify_password_and_update)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: Optional[timedelta] = None
@@ -62,6 +64,20 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_password_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verificar una contraseña y obtener un nuevo hash si el guardado está desactualizado.
+    
+    Args:
+        plain_password: Contraseña en texto plano
+        hashed_password: Contraseña hasheada
+        
+    Returns:
+        Tupla (contraseña correcta, nuevo hash o None si el guardado usa el
+        esquema y el costo configurados)
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """
     Hashear una contraseña.
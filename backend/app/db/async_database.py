@@ -0,0 +1,142 @@
+# backend/app/db/async_database.py
+import asyncio
+import threading
+from typing import AsyncGenerator, Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.db.database import SQLALCHEMY_DATABASE_URL, SQLALCHEMY_REPLICA_URL, ReplicaSession, engine_options
+from app.db.replica import get_replica_router
+
+# Driver asíncrono equivalente a cada driver síncrono
+ASYNC_DRIVERS = {
+    "mssql+pyodbc": "mssql+aioodbc",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """
+    Obtener la URL con el driver asíncrono equivalente.
+
+    Args:
+        url: URL de conexión síncrona
+
+    Returns:
+        URL para create_async_engine
+
+    Raises:
+        ValueError: Si no hay un driver asíncrono conocido para la URL
+    """
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    if driver is None:
+        raise ValueError(f"No hay un driver asíncrono para {parsed.drivername}; indicar ASYNC_DATABASE_URL")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+def _create_async_engine(url: str) -> AsyncEngine:
+    """Crear un motor asíncrono con las opciones del pool asíncrono."""
+    options = engine_options(url)
+    # Una base SQLite en memoria usa una única conexión, sin pool
+    if make_url(url).database not in (None, "", ":memory:"):
+        options.update(
+            pool_size=settings.DB_ASYNC_POOL_SIZE,
+            max_overflow=settings.DB_ASYNC_MAX_OVERFLOW
+        )
+    return create_async_engine(url, **options)
+
+_async_engine: Optional[AsyncEngine] = None
+_async_sessionmaker: Optional[async_sessionmaker] = None
+_async_replica_engine: Optional[AsyncEngine] = None
+_async_replica_sessionmaker: Optional[async_sessionmaker] = None
+_lock = threading.Lock()
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Obtener el motor asíncrono del proceso.
+
+    Se crea en el primer uso, de modo que el driver asíncrono solo hace falta
+    con DB_ASYNC_READS activo. Tiene su propio pool de DB_ASYNC_POOL_SIZE
+    conexiones (más DB_ASYNC_MAX_OVERFLOW) y el resto de opciones del motor
+    síncrono.
+
+    Returns:
+        Motor asíncrono
+    """
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                url = settings.ASYNC_DATABASE_URL or async_database_url(SQLALCHEMY_DATABASE_URL)
+                _async_engine = _create_async_engine(url)
+                # Los objetos se leen después de cerrar la sesión, sin recargas
+                _async_sessionmaker = async_sessionmaker(_async_engine, expire_on_commit=False)
+    return _async_engine
+
+def get_async_replica_engine() -> Optional[AsyncEngine]:
+    """
+    Obtener el motor asíncrono de la réplica, si hay una configurada.
+
+    Returns:
+        Motor asíncrono de la réplica o None
+    """
+    global _async_replica_engine, _async_replica_sessionmaker
+    if _async_replica_engine is None and SQLALCHEMY_REPLICA_URL:
+        primary = get_async_engine()
+        with _lock:
+            if _async_replica_engine is None:
+                _async_replica_engine = _create_async_engine(async_database_url(SQLALCHEMY_REPLICA_URL))
+                # Las consultas fallidas en la réplica se repiten en el primario
+                _async_replica_sessionmaker = async_sessionmaker(
+                    _async_replica_engine,
+                    expire_on_commit=False,
+                    sync_session_class=ReplicaSession,
+                    primary_bind=primary.sync_engine
+                )
+    return _async_replica_engine
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependencia para obtener una sesión asíncrona de la base de datos.
+    """
+    get_async_engine()
+    async with _async_sessionmaker() as db:
+        yield db
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependencia para obtener una sesión asíncrona de solo lectura.
+
+    Igual que get_read_db: usa la réplica mientras responda y su retraso esté
+    dentro de la tolerancia, y repite en el primario una consulta que falle
+    en la réplica. La comprobación del retraso usa el motor
+    síncrono, por lo que se hace en un hilo para no bloquear el bucle.
+    """
+    router = get_replica_router()
+    if router.is_due():
+        await asyncio.to_thread(router.refresh)
+
+    use_replica = router.use_replica(refresh=False)
+    if use_replica:
+        get_async_replica_engine()
+        sessions = _async_replica_sessionmaker
+    else:
+        get_async_engine()
+        sessions = _async_sessionmaker
+
+    async with sessions() as db:
+        yield db
+
+async def dispose_async_engine() -> None:
+    """Cerrar las conexiones de los motores asíncronos (al detener la aplicación)."""
+    global _async_engine, _async_sessionmaker, _async_replica_engine, _async_replica_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_sessionmaker = None
+    if _async_replica_engine is not None:
+        await _async_replica_engine.dispose()
+        _async_replica_engine = None
+        _async_replica_sessionmaker = None
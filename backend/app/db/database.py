@@ -1,10 +1,15 @@
 # backend/app/db/database.py
 import os
-from sqlalchemy import create_engine
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from dotenv import load_dotenv
 
+from app.core.config import settings
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -15,19 +20,160 @@ USERNAME = os.getenv("DB_USERNAME")
 PASSWORD = os.getenv("DB_PASSWORD")
 DRIVER = os.getenv("DB_DRIVER", "ODBC Driver 17 for SQL Server")  # Ajusta según el driver instalado
 
-# Construir la URL de conexión
-SQLALCHEMY_DATABASE_URL = f"mssql+pyodbc://{USERNAME}:{PASSWORD}@{SERVER}/{DATABASE}?driver={DRIVER}"
-
-# Crear el motor de la base de datos
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    echo=False,  # Establecer a True para ver las consultas SQL generadas
-    pool_pre_ping=True  # Verificar la conexión antes de usarla
+# Construir la URL de conexión (DATABASE_URL permite usar otra base, p. ej. SQLite para pruebas de carga)
+SQLALCHEMY_DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"mssql+pyodbc://{USERNAME}:{PASSWORD}@{SERVER}/{DATABASE}?driver={DRIVER}"
 )
 
+# Réplica de solo lectura opcional para los listados (ver app/db/replica.py)
+SQLALCHEMY_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """
+    Opciones de create_engine según la configuración del pool (DB_POOL_*).
+
+    La verificación de las conexiones se elige con DB_POOL_PING:
+
+    - pre_ping: un SELECT 1 en cada checkout (la opción más segura, con una
+      ida y vuelta extra por sesión);
+    - recycle: sin ping; las conexiones se renuevan cada DB_POOL_RECYCLE
+      segundos, antes de que las corte el servidor o un firewall, y un error de
+      desconexión invalida el pool para que las siguientes sesiones abran
+      conexiones nuevas;
+    - none: sin verificación ni reciclado por tiempo.
+
+    Args:
+        url: URL de conexión
+
+    Returns:
+        Argumentos para create_engine
+    """
+    options: Dict[str, Any] = {
+        "echo": False,  # Establecer a True para ver las consultas SQL generadas
+        "pool_pre_ping": settings.DB_POOL_PING == "pre_ping",
+    }
+
+    if url.startswith("sqlite"):
+        # SQLite necesita permitir el uso de la conexión desde varios hilos
+        options["connect_args"] = {"check_same_thread": False, "timeout": 30}
+    else:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE if settings.DB_POOL_PING != "none" else -1,
+            # Reusar primero las conexiones recientes: las que sobran quedan
+            # ociosas y se reciclan, en lugar de mantener todo el pool abierto
+            pool_use_lifo=settings.DB_POOL_USE_LIFO,
+        )
+
+    if url.startswith("mssql+pyodbc"):
+        # Envía los parámetros de executemany en bloque en lugar de una ida y
+        # vuelta por fila (inserciones y actualizaciones en lote)
+        options["fast_executemany"] = settings.DB_FAST_EXECUTEMANY
+
+    return options
+
+# Crear el motor de la base de datos, compartido por la API, el programador y
+# el jobstore de APScheduler
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+
+# Contadores del pool desde el inicio del proceso
+_pool_counters = {"connects": 0, "checkouts": 0, "invalidations": 0}
+
+@event.listens_for(engine, "connect")
+def _count_connect(dbapi_connection, connection_record):
+    _pool_counters["connects"] += 1
+
+@event.listens_for(engine, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    _pool_counters["checkouts"] += 1
+
+@event.listens_for(engine, "invalidate")
+def _count_invalidate(dbapi_connection, connection_record, exception):
+    _pool_counters["invalidations"] += 1
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Obtener el estado del pool de conexiones del proceso.
+
+    Sirve para dimensionar DB_POOL_SIZE según el número de workers: el pico
+    de conexiones de la base es aproximadamente
+    workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+
+    Returns:
+        Diccionario con el tamaño del pool, las conexiones en uso y ociosas,
+        el desborde y los contadores de conexiones, checkouts e invalidaciones
+    """
+    pool = engine.pool
+    stats: Dict[str, Any] = {
+        "pool_class": type(pool).__name__,
+        "ping": settings.DB_POOL_PING,
+        **_pool_counters
+    }
+
+    # Solo QueuePool informa el tamaño y el uso
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    if "size" in stats:
+        stats["max_overflow"] = pool._max_overflow
+        stats["timeout"] = pool.timeout()
+
+    return stats
+
 # Crear la sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+class ReplicaSession(Session):
+    """
+    Sesión de lectura que repite en el primario una consulta fallida en la réplica.
+
+    Si la réplica da un error de base de datos, se deja de usar hasta la
+    próxima comprobación (ver ReplicaRouter.mark_failed) y la sesión pasa al
+    primario, donde se repite la consulta una sola vez. Solo sirve para
+    sesiones de solo lectura: al cambiar de base se descarta la transacción.
+    """
+
+    def __init__(self, *args: Any, primary_bind: Any = None, **kwargs: Any):
+        """
+        Args:
+            primary_bind: Motor del primario al que pasar si falla la réplica
+        """
+        super().__init__(*args, **kwargs)
+        self.primary_bind = primary_bind
+
+    def _execute_internal(self, *args: Any, **kwargs: Any) -> Any:
+        # execute, scalars, scalar, get y las consultas de Query pasan todas
+        # por aquí (también desde AsyncSession)
+        try:
+            return super()._execute_internal(*args, **kwargs)
+        except DBAPIError as e:
+            if self.primary_bind is None or self.bind is self.primary_bind:
+                raise
+            # Importación diferida: replica.py importa este módulo
+            from app.db.replica import get_replica_router
+            get_replica_router().mark_failed(e)
+            self.rollback()
+            self.bind = self.primary_bind
+            return super()._execute_internal(*args, **kwargs)
+
+# Motor y sesión de la réplica; solo los usan las lecturas que toleran datos
+# algo atrasados (get_read_db), nunca las escrituras ni el programador
+replica_engine = None
+ReplicaSessionLocal = None
+if SQLALCHEMY_REPLICA_URL:
+    replica_options = engine_options(SQLALCHEMY_REPLICA_URL)
+    if SQLALCHEMY_REPLICA_URL.startswith("mssql+pyodbc"):
+        # Tiempo de inicio de sesión: una réplica caída no retiene la petición
+        replica_options["connect_args"] = {"timeout": settings.DB_REPLICA_CONNECT_TIMEOUT_SECONDS}
+    replica_engine = create_engine(SQLALCHEMY_REPLICA_URL, **replica_options)
+    ReplicaSessionLocal = sessionmaker(
+        class_=ReplicaSession, autocommit=False, autoflush=False, bind=replica_engine, primary_bind=engine
+    )
+
 # Declarative Base para modelos ORM
 Base = declarative_base()
 
@@ -1,8 +1,8 @@
 # backend/app/db/models.py
 import datetime
 from typing import List, Optional
-from sqlalchemy import Boolean, Column, Integer, String, Text, LargeBinary, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Date, Integer, String, Text, LargeBinary, ForeignKey, DateTime, Index
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 from .database import Base
@@ -14,6 +14,7 @@ class User(Base):
     username = Column(String(50), unique=True, index=True, nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
     full_name = Column(String(100), nullable=False)
+    hashed_password = Column(String(255), nullable=False)
     last_login = Column(DateTime, default=func.now())
     is_active = Column(Boolean, default=True)
     
@@ -29,8 +30,9 @@ class Template(Base):
     background_color = Column(String(20), default="#FFFFFF")
     text_color = Column(String(20), default="#000000")
     footer_text = Column(String(200))
-    template_image = Column(LargeBinary, nullable=True)  # Imagen base para la plantilla
-    created_at = Column(DateTime, default=func.now())
+    template_image = deferred(Column(LargeBinary, nullable=True))  # Imagen base (diferida, ver app/db/repositories.py)
+    caption_format = Column(Text, nullable=True)  # Formato de la leyenda de Instagram
+    created_at = Column(DateTime, nullable=False, default=func.now())  # Orden de la paginación (ver app/utils/pagination.py)
     is_active = Column(Boolean, default=True)
     
     # Relaciones
@@ -56,12 +58,16 @@ class Post(Base):
     requirements_priority = Column(Integer, default=4)
     
     # Campos relacionados con la publicación
-    generated_image = Column(LargeBinary, nullable=True)  # Imagen generada
+    generated_image = deferred(Column(LargeBinary, nullable=True))  # Imagen generada (diferida)
     instagram_post_id = Column(String(100), nullable=True)  # ID de la publicación en Instagram
-    status = Column(String(20), default="draft")  # draft, scheduled, published, failed
+    caption = Column(Text, nullable=True)  # Leyenda generada
+    caption_hash = Column(String(64), nullable=True)  # Hash del contenido usado para la leyenda
+    image_ready_at = Column(DateTime, nullable=True)  # Imagen generada y verificada antes de publicar
+    render_error = Column(Text, nullable=True)  # Último error al pre-generar la imagen
+    status = Column(String(20), default="draft")  # draft, scheduled, published, failed, missed
     
     # Fechas
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, nullable=False, default=func.now())  # Orden de la paginación (ver app/utils/pagination.py)
     scheduled_for = Column(DateTime, nullable=True)
     published_at = Column(DateTime, nullable=True)
     
@@ -70,6 +76,17 @@ class Post(Base):
     template = relationship("Template", back_populates="posts")
     logs = relationship("PostLog", back_populates="post")
     schedule = relationship("ScheduleSettings", back_populates="post", uselist=False)
+    
+    # Índices de las consultas frecuentes (ver scripts/benchmark_post_queries.py)
+    __table_args__ = (
+        # Posts programados por rango de fechas (pendientes, calendario, recuperación)
+        Index("ix_posts_status_scheduled_for", "status", "scheduled_for"),
+        # Listado paginado por cursor (fecha de creación, ID), con y sin estado
+        Index("ix_posts_created_at_post_id", "created_at", "post_id"),
+        Index("ix_posts_status_created_at_post_id", "status", "created_at", "post_id"),
+        # Posts de un usuario, los más recientes primero
+        Index("ix_posts_user_id_created_at", "user_id", "created_at"),
+    )
 
 class PostLog(Base):
     __tablename__ = "post_logs"
@@ -77,12 +94,17 @@ class PostLog(Base):
     log_id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("posts.post_id"), nullable=False)
     action = Column(String(50), nullable=False)  # generate, schedule, publish, error
-    status = Column(String(20), nullable=False)  # success, error
+    status = Column(String(20), nullable=False)  # success, error, skipped
     error_message = Column(Text, nullable=True)
     timestamp = Column(DateTime, default=func.now())
     
     # Relaciones
     post = relationship("Post", back_populates="logs")
+    
+    # Historial de un post en orden cronológico
+    __table_args__ = (
+        Index("ix_post_logs_post_id_timestamp", "post_id", "timestamp"),
+    )
 
 class ScheduleSettings(Base):
     __tablename__ = "schedule_settings"
@@ -90,10 +112,75 @@ class ScheduleSettings(Base):
     schedule_id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("posts.post_id"), unique=True, nullable=False)
     scheduled_time = Column(DateTime, nullable=False)
-    frequency = Column(String(20), nullable=True)  # once, daily, weekly, monthly
-    recurrence_pattern = Column(String(50), nullable=True)  # Para definir patrones específicos
+    frequency = Column(String(20), nullable=True)  # once, daily, weekly, monthly, custom
+    recurrence_pattern = Column(String(255), nullable=True)  # RRULE o cron en hora local
     end_date = Column(DateTime, nullable=True)  # Para publicaciones recurrentes
+    timezone = Column(String(50), nullable=True)  # Zona horaria IANA de las horas locales
+    blackout_windows = Column(Text, nullable=True)  # Ventanas sin publicación (JSON)
     is_active = Column(Boolean, default=True)
     
     # Relaciones
-    post = relationship("Post", back_populates="schedule")
\ No newline at end of file
+    post = relationship("Post", back_populates="schedule")
+
+class PublishJob(Base):
+    __tablename__ = "publish_jobs"
+    
+    job_id = Column(String(36), primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending, rendering, publishing, completed, failed
+    include_story = Column(Boolean, default=False)
+    as_carousel = Column(Boolean, default=False)
+    total = Column(Integer, default=0)
+    created_at = Column(DateTime, default=func.now())
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # Lo renueva el proceso que ejecuta el lote (UTC)
+    
+    # Relaciones
+    items = relationship("PublishJobItem", back_populates="job")
+
+class PublishJobItem(Base):
+    __tablename__ = "publish_job_items"
+    
+    item_id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(36), ForeignKey("publish_jobs.job_id"), nullable=False, index=True)
+    post_id = Column(Integer, ForeignKey("posts.post_id"), nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, rendering, ready, publishing, published, failed
+    instagram_post_id = Column(String(100), nullable=True)
+    story_id = Column(String(100), nullable=True)
+    error_message = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=func.now())
+    
+    # Relaciones
+    job = relationship("PublishJob", back_populates="items")
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String(50), primary_key=True)  # Recurso protegido, p. ej. 'scheduler'
+    holder_id = Column(String(100), nullable=False)  # Proceso que tiene el lease
+    acquired_at = Column(DateTime, nullable=False)
+    renewed_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class SchedulerState(Base):
+    __tablename__ = "scheduler_state"
+    
+    name = Column(String(50), primary_key=True)  # Clave del contador, p. ej. 'jobs'
+    version = Column(Integer, nullable=False, default=0)  # Se incrementa con cada cambio
+    updated_at = Column(DateTime, nullable=False)
+
+class PostStatusCount(Base):
+    __tablename__ = "post_status_counts"
+    
+    # Número de posts en cada estado (ver app/services/post_stats.py)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class PostLogDailyCount(Base):
+    __tablename__ = "post_log_daily_counts"
+    
+    # Número de PostLog por día (UTC), acción y resultado
+    day = Column(Date, primary_key=True)
+    action = Column(String(50), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,228 @@
+# backend/app/db/replica.py
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.database import engine, replica_engine
+from app.db.models import SchedulerState
+from app.services.leader_election import db_utcnow
+
+logger = logging.getLogger(__name__)
+
+# Fila de SchedulerState que se escribe en el primario para medir el retraso
+HEARTBEAT_KEY = "replica_heartbeat"
+
+class ReplicaRouter:
+    """
+    Elección entre la réplica y el primario para las lecturas.
+
+    El retraso se mide con un latido: en cada comprobación se lee el último
+    latido (SchedulerState 'replica_heartbeat') de la réplica y del primario,
+    y después se escribe uno nuevo en el primario con la hora de la base. El
+    retraso es la diferencia entre ambos: cero si la réplica ya tiene el
+    último latido, aunque haya pasado mucho tiempo sin comprobaciones, y
+    como mucho un intervalo de comprobación más que el retraso real si no.
+    Las horas son todas del reloj del primario, no de cada worker.
+
+    La comprobación se hace en el hilo de la petición que la encuentra
+    vencida; las peticiones simultáneas usan el último resultado. Si la
+    réplica falla en una consulta se deja de usar hasta la siguiente
+    comprobación.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replica: Optional[Engine],
+        max_lag_seconds: Optional[float] = None,
+        check_interval_seconds: Optional[float] = None
+    ):
+        """
+        Inicializar el enrutador.
+
+        Args:
+            primary: Motor del primario (donde se escribe el latido)
+            replica: Motor de la réplica (None si no hay réplica)
+            max_lag_seconds: Retraso máximo tolerado
+            check_interval_seconds: Segundos entre comprobaciones
+        """
+        self.primary = primary
+        self.replica = replica
+        self.max_lag_seconds = (
+            settings.DB_REPLICA_MAX_LAG_SECONDS if max_lag_seconds is None else max_lag_seconds
+        )
+        self.check_interval_seconds = (
+            settings.DB_REPLICA_CHECK_INTERVAL_SECONDS if check_interval_seconds is None else check_interval_seconds
+        )
+
+        self._available = False
+        self._lag: Optional[float] = None
+        self._error: Optional[str] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._counters = {"replica_reads": 0, "primary_fallbacks": 0}
+
+    def use_replica(self, refresh: bool = True) -> bool:
+        """
+        Decidir si una lectura puede ir a la réplica.
+
+        Args:
+            refresh: Comprobar el retraso si la última comprobación venció
+                (False en el bucle de eventos, donde se llama a refresh en un hilo)
+
+        Returns:
+            True si la réplica responde y su retraso está dentro de la tolerancia
+        """
+        if self.replica is None:
+            return False
+
+        if refresh:
+            self.refresh()
+
+        healthy = self._available and self._lag is not None and self._lag <= self.max_lag_seconds
+        self._counters["replica_reads" if healthy else "primary_fallbacks"] += 1
+        return healthy
+
+    def is_due(self) -> bool:
+        """Indicar si corresponde volver a comprobar la réplica."""
+        return self.replica is not None and (
+            self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval_seconds
+        )
+
+    def refresh(self) -> None:
+        """Comprobar la réplica si venció el intervalo y nadie lo está haciendo."""
+        if not self.is_due() or not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self.is_due():
+                self.check()
+        finally:
+            self._lock.release()
+
+    def check(self) -> None:
+        """Medir el retraso de la réplica y escribir un nuevo latido en el primario."""
+        try:
+            with self.replica.connect() as connection:
+                # pyodbc: tiempo máximo de la consulta (el de conexión se fija
+                # en el motor); la conexión vuelve al pool sin límite
+                dbapi_connection = connection.connection.dbapi_connection
+                previous_timeout = getattr(dbapi_connection, "timeout", None)
+                if previous_timeout is not None:
+                    dbapi_connection.timeout = settings.DB_REPLICA_CONNECT_TIMEOUT_SECONDS
+                try:
+                    heartbeat = self._read_heartbeat(connection)
+                finally:
+                    if previous_timeout is not None:
+                        dbapi_connection.timeout = previous_timeout
+        except Exception as e:
+            self._set_state(False, None, str(e))
+        else:
+            # Se lee después que la réplica: un latido escrito entre ambas
+            # lecturas solo puede aumentar el retraso medido
+            try:
+                with self.primary.connect() as connection:
+                    primary_heartbeat = self._read_heartbeat(connection)
+            except Exception as e:
+                self._set_state(True, None, f"No se pudo leer el latido del primario: {str(e)}")
+            else:
+                if heartbeat is None:
+                    self._set_state(True, None, "La réplica todavía no recibió ningún latido")
+                else:
+                    lag = max(0.0, (primary_heartbeat - heartbeat).total_seconds()) if primary_heartbeat else 0.0
+                    self._set_state(True, lag, None)
+        finally:
+            self._checked_at = time.monotonic()
+
+        self._write_heartbeat()
+
+    def mark_failed(self, error: Exception) -> None:
+        """
+        Dejar de usar la réplica hasta la siguiente comprobación.
+
+        Args:
+            error: Error de la consulta en la réplica
+        """
+        self._checked_at = time.monotonic()
+        self._set_state(False, self._lag, str(error))
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Obtener el estado de la réplica.
+
+        Returns:
+            Diccionario con la disponibilidad, el retraso medido, la tolerancia
+            y el número de lecturas enviadas a la réplica y al primario
+        """
+        if self.replica is None:
+            return {"configured": False}
+
+        return {
+            "configured": True,
+            "available": self._available,
+            "lag_seconds": None if self._lag is None else round(self._lag, 1),
+            "max_lag_seconds": self.max_lag_seconds,
+            "in_use": self._available and self._lag is not None and self._lag <= self.max_lag_seconds,
+            "error": self._error,
+            "pool": self.replica.pool.status(),
+            **self._counters
+        }
+
+    def _set_state(self, available: bool, lag: Optional[float], error: Optional[str]) -> None:
+        """Guardar el resultado de una comprobación y registrar los cambios."""
+        was_healthy = self._available and self._lag is not None and self._lag <= self.max_lag_seconds
+        self._available, self._lag, self._error = available, lag, error
+        healthy = available and lag is not None and lag <= self.max_lag_seconds
+
+        if was_healthy and not healthy:
+            reason = error or f"retraso de {lag:.1f}s"
+            logger.warning(f"Lecturas de la réplica desviadas al primario: {reason}")
+        elif healthy and not was_healthy:
+            logger.info(f"Lecturas enviadas a la réplica (retraso de {lag:.1f}s)")
+
+    def _read_heartbeat(self, connection) -> Optional[datetime]:
+        """Leer la hora del último latido en una base."""
+        return connection.execute(
+            select(SchedulerState.updated_at).where(SchedulerState.name == HEARTBEAT_KEY)
+        ).scalar()
+
+    def _write_heartbeat(self) -> None:
+        """Escribir el latido en el primario, con la hora de la base."""
+        try:
+            with self.primary.begin() as connection:
+                now = db_utcnow(connection.dialect.name)
+                result = connection.execute(
+                    update(SchedulerState)
+                    .where(SchedulerState.name == HEARTBEAT_KEY)
+                    .values(version=SchedulerState.version + 1, updated_at=now)
+                )
+                if result.rowcount == 0:
+                    connection.execute(insert(SchedulerState).values(name=HEARTBEAT_KEY, version=1, updated_at=now))
+        except IntegrityError:
+            # Otro worker creó la fila al mismo tiempo
+            pass
+        except Exception as e:
+            logger.error(f"Error al escribir el latido de la réplica: {str(e)}")
+
+_router: Optional[ReplicaRouter] = None
+_router_lock = threading.Lock()
+
+def get_replica_router() -> ReplicaRouter:
+    """
+    Obtener el enrutador de lecturas compartido por el proceso.
+
+    Returns:
+        Instancia de ReplicaRouter
+    """
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ReplicaRouter(engine, replica_engine)
+    return _router
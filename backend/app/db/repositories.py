@@ -0,0 +1,314 @@
+# app/db/repositories.py
+"""
+Consultas de posts, plantillas, registros y programaciones con la estrategia
+de carga de sus relaciones explícita.
+
+Las imágenes (Template.template_image, Post.generated_image) están diferidas
+en los modelos: solo se leen si se piden. Las relaciones se cargan con:
+
+- selectinload para la plantilla de los posts: una consulta extra por lote,
+  con cada plantilla (y su imagen) una sola vez aunque la usen muchos posts;
+- joinedload para la programación, que es uno a uno.
+
+Así un lote de n posts cuesta un número fijo de consultas en lugar de una por
+post, y los objetos se pueden desvincular de la sesión o usar desde otros
+hilos sin cargas perezosas pendientes (ver scripts/check_query_counts.py).
+
+Las clases Async* son las equivalentes para AsyncSession (DB_ASYNC_READS),
+con las mismas sentencias; en ellas no hay cargas perezosas posibles.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session, joinedload, selectinload, undefer
+
+from app.db.models import Post, PostLog, ScheduleSettings, Template
+
+# Máximo de IDs por consulta IN (SQL Server admite hasta 2100 parámetros)
+QUERY_CHUNK_SIZE = 1000
+
+def post_load_options(
+    with_template: bool = False,
+    with_image: bool = False,
+    with_schedule: bool = False
+) -> list:
+    """
+    Opciones de carga para consultas de posts.
+
+    Args:
+        with_template: Cargar la plantilla (sin su imagen)
+        with_image: Cargar la plantilla con su imagen, para generar la del post
+        with_schedule: Cargar la programación
+
+    Returns:
+        Opciones para Query.options
+    """
+    options = []
+    if with_template or with_image:
+        loader = selectinload(Post.template)
+        if with_image:
+            loader = loader.undefer(Template.template_image)
+        options.append(loader)
+    if with_schedule:
+        options.append(joinedload(Post.schedule))
+    return options
+
+def scheduled_between_statement(start: datetime, end: datetime) -> Select:
+    """Sentencia de los posts programados en un rango, por fecha de publicación."""
+    return select(Post).where(
+        Post.status == "scheduled",
+        Post.scheduled_for >= start,
+        Post.scheduled_for <= end
+    ).order_by(Post.scheduled_for)
+
+def _chunks(ids: List[int]) -> Iterable[List[int]]:
+    """Dividir una lista de IDs en grupos de QUERY_CHUNK_SIZE."""
+    for start in range(0, len(ids), QUERY_CHUNK_SIZE):
+        yield ids[start:start + QUERY_CHUNK_SIZE]
+
+class PostRepository:
+    """Consultas de posts."""
+
+    def __init__(self, db: Session):
+        """
+        Args:
+            db: Sesión de base de datos
+        """
+        self.db = db
+
+    def get(
+        self,
+        post_id: int,
+        with_template: bool = False,
+        with_image: bool = False,
+        with_schedule: bool = False
+    ) -> Optional[Post]:
+        """
+        Obtener un post por ID.
+
+        Args:
+            post_id: ID del post
+            with_template: Cargar la plantilla (sin su imagen)
+            with_image: Cargar la plantilla con su imagen
+            with_schedule: Cargar la programación
+
+        Returns:
+            Post o None si no existe
+        """
+        return self.db.query(Post).options(
+            *post_load_options(with_template, with_image, with_schedule)
+        ).filter(Post.post_id == post_id).first()
+
+    def get_many(
+        self,
+        post_ids: List[int],
+        with_template: bool = False,
+        with_image: bool = False,
+        with_schedule: bool = False
+    ) -> List[Post]:
+        """
+        Obtener varios posts en el orden pedido (los que no existen se omiten).
+
+        Args:
+            post_ids: IDs de los posts
+            with_template: Cargar las plantillas (sin su imagen)
+            with_image: Cargar las plantillas con su imagen
+            with_schedule: Cargar las programaciones
+
+        Returns:
+            Lista de posts
+        """
+        unique_ids = list(dict.fromkeys(post_ids))
+        options = post_load_options(with_template, with_image, with_schedule)
+
+        found: Dict[int, Post] = {}
+        for chunk in _chunks(unique_ids):
+            for post in self.db.query(Post).options(*options).filter(Post.post_id.in_(chunk)):
+                found[post.post_id] = post
+
+        return [found[post_id] for post_id in unique_ids if post_id in found]
+
+    def get_scheduled_between(self, start: datetime, end: datetime, with_template: bool = False) -> List[Post]:
+        """
+        Obtener los posts programados en un rango de fechas.
+
+        Args:
+            start: Inicio del rango
+            end: Fin del rango
+            with_template: Cargar las plantillas (sin su imagen)
+
+        Returns:
+            Lista de posts ordenada por fecha de publicación
+        """
+        statement = scheduled_between_statement(start, end).options(*post_load_options(with_template))
+        return list(self.db.scalars(statement))
+
+class TemplateRepository:
+    """Consultas de plantillas."""
+
+    def __init__(self, db: Session):
+        """
+        Args:
+            db: Sesión de base de datos
+        """
+        self.db = db
+
+    def get(self, template_id: int, with_image: bool = False) -> Optional[Template]:
+        """
+        Obtener una plantilla por ID.
+
+        Args:
+            template_id: ID de la plantilla
+            with_image: Cargar también su imagen
+
+        Returns:
+            Plantilla o None si no existe
+        """
+        query = self.db.query(Template)
+        if with_image:
+            query = query.options(undefer(Template.template_image))
+        return query.filter(Template.template_id == template_id).first()
+
+    def query(self, active_only: bool = False) -> Query:
+        """
+        Consulta base para listar plantillas, sin sus imágenes.
+
+        Args:
+            active_only: Solo las plantillas activas
+
+        Returns:
+            Query de plantillas
+        """
+        query = self.db.query(Template)
+        if active_only:
+            query = query.filter(Template.is_active == True)
+        return query
+
+class PostLogRepository:
+    """Consultas del historial de publicación."""
+
+    def __init__(self, db: Session):
+        """
+        Args:
+            db: Sesión de base de datos
+        """
+        self.db = db
+
+    def get_for_post(self, post_id: int, limit: Optional[int] = None) -> List[PostLog]:
+        """
+        Obtener el historial de un post en orden cronológico.
+
+        Args:
+            post_id: ID del post
+            limit: Número máximo de registros (los más recientes)
+
+        Returns:
+            Lista de registros
+        """
+        query = self.db.query(PostLog).filter(PostLog.post_id == post_id)
+        if limit is None:
+            return query.order_by(PostLog.timestamp, PostLog.log_id).all()
+
+        logs = query.order_by(PostLog.timestamp.desc(), PostLog.log_id.desc()).limit(limit).all()
+        logs.reverse()
+        return logs
+
+class ScheduleRepository:
+    """Consultas de programaciones."""
+
+    def __init__(self, db: Session):
+        """
+        Args:
+            db: Sesión de base de datos
+        """
+        self.db = db
+
+    def get_for_post(self, post_id: int) -> Optional[ScheduleSettings]:
+        """
+        Obtener la programación de un post.
+
+        Args:
+            post_id: ID del post
+
+        Returns:
+            Programación o None si no tiene
+        """
+        return self.db.query(ScheduleSettings).filter(ScheduleSettings.post_id == post_id).first()
+
+    def get_for_posts(self, post_ids: List[int]) -> Dict[int, ScheduleSettings]:
+        """
+        Obtener las programaciones de varios posts.
+
+        Args:
+            post_ids: IDs de los posts
+
+        Returns:
+            Diccionario post_id -> programación (solo los que tienen)
+        """
+        schedules: Dict[int, ScheduleSettings] = {}
+        for chunk in _chunks(list(dict.fromkeys(post_ids))):
+            for schedule in self.db.query(ScheduleSettings).filter(ScheduleSettings.post_id.in_(chunk)):
+                schedules[schedule.post_id] = schedule
+        return schedules
+
+class AsyncPostRepository:
+    """Consultas de posts con la sesión asíncrona."""
+
+    def __init__(self, db: AsyncSession):
+        """
+        Args:
+            db: Sesión asíncrona de base de datos
+        """
+        self.db = db
+
+    async def get(self, post_id: int) -> Optional[Post]:
+        """
+        Obtener un post por ID (sin relaciones).
+
+        Args:
+            post_id: ID del post
+
+        Returns:
+            Post o None si no existe
+        """
+        return await self.db.get(Post, post_id)
+
+    async def get_scheduled_between(self, start: datetime, end: datetime) -> List[Post]:
+        """
+        Obtener los posts programados en un rango de fechas.
+
+        Args:
+            start: Inicio del rango
+            end: Fin del rango
+
+        Returns:
+            Lista de posts ordenada por fecha de publicación
+        """
+        return list(await self.db.scalars(scheduled_between_statement(start, end)))
+
+class AsyncTemplateRepository:
+    """Consultas de plantillas con la sesión asíncrona."""
+
+    def __init__(self, db: AsyncSession):
+        """
+        Args:
+            db: Sesión asíncrona de base de datos
+        """
+        self.db = db
+
+    def statement(self, active_only: bool = False) -> Select:
+        """
+        Sentencia base para listar plantillas, sin sus imágenes.
+
+        Args:
+            active_only: Solo las plantillas activas
+
+        Returns:
+            Sentencia select de plantillas
+        """
+        statement = select(Template)
+        if active_only:
+            statement = statement.where(Template.is_active == True)
+        return statement
@@ -1,11 +1,20 @@
 # app/main.py
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
 
-from app.api.endpoints import auth, posts, templates, scheduler
+from app.api.endpoints import auth, posts, templates, scheduler, stats
 from app.core.config import settings
+from app.db.async_database import dispose_async_engine
+from app.db.database import get_pool_stats
+from app.db.replica import get_replica_router
+from app.services.audit_log import get_audit_log
+from app.services.batch_publisher import BatchPublisher
+from app.services.user_cache import get_user_cache
+from app.utils.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
 
 # Configuración de logging
 logging.basicConfig(
@@ -14,9 +23,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cerrar los lotes de publicación que quedaron a medias en un worker detenido
+    await run_in_threadpool(BatchPublisher().fail_stale_jobs)
+    yield
+    # Insertar los registros de acciones pendientes antes de cerrar el worker
+    # (atexit no se ejecuta si el proceso termina por una señal)
+    await run_in_threadpool(get_audit_log().close)
+    # Cerrar el pool asíncrono (DB_ASYNC_READS) al detener el worker
+    await dispose_async_engine()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Configurar CORS
@@ -27,6 +48,8 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Cabeceras de paginación que lee el frontend
+        expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
     )
 
 # Incluir los routers
@@ -34,6 +57,7 @@ app.include_router(auth.router, prefix=settings.API_V1_STR)
 app.include_router(posts.router, prefix=settings.API_V1_STR)
 app.include_router(templates.router, prefix=settings.API_V1_STR)
 app.include_router(scheduler.router, prefix=settings.API_V1_STR)
+app.include_router(stats.router, prefix=settings.API_V1_STR)
 
 # Servir archivos estáticos (imágenes)
 app.mount("/media", StaticFiles(directory=settings.MEDIA_DIR), name="media")
@@ -44,4 +68,18 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/health/db")
+def database_pool_health():
+    """
+    Estado del pool de conexiones de este worker (para dimensionar DB_POOL_SIZE),
+    de la réplica de lectura, de los registros de acciones pendientes y de la
+    caché de usuarios (consultas evitadas).
+    """
+    return {
+        **get_pool_stats(),
+        "replica": get_replica_router().get_status(),
+        "audit_log": get_audit_log().get_status(),
+        "user_cache": get_user_cache().get_stats()
+    }
@@ -1,6 +1,6 @@
 # app/schemas/post.py
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from pydantic import BaseModel, EmailStr, Field
 
 # Esquema base para Post
@@ -22,9 +22,16 @@ class PostCreate(PostBase):
 class PostSchedule(BaseModel):
     post_id: int
     scheduled_for: datetime
-    frequency: Optional[str] = "once"  # once, daily, weekly, monthly
-    recurrence_pattern: Optional[str] = None
+    frequency: Optional[str] = "once"  # once, daily, weekly, monthly, custom
+    recurrence_pattern: Optional[str] = Field(None, max_length=255)  # RRULE o cron ("cron:0 9 * * 1-5")
     end_date: Optional[datetime] = None
+    timezone: Optional[str] = None  # Zona horaria IANA, p. ej. "America/Argentina/Buenos_Aires"
+    blackout_windows: Optional[List[Dict[str, Any]]] = None  # [{"start": "22:00", "end": "07:00"}]
+    auto_slot: bool = False  # Mover al primer horario libre (ver CapacityPlanner)
+
+# Esquema para programar varios posts en una sola transacción
+class PostScheduleBatch(BaseModel):
+    items: List[PostSchedule] = Field(..., min_length=1, max_length=1000)
 
 # Esquema para actualizar un post
 class PostUpdate(BaseModel):
@@ -49,6 +56,8 @@ class PostInDB(PostBase):
     created_at: datetime
     scheduled_for: Optional[datetime] = None
     published_at: Optional[datetime] = None
+    image_ready_at: Optional[datetime] = None
+    render_error: Optional[str] = None
     
     class Config:
         orm_mode = True
@@ -59,4 +68,40 @@ class PostResponse(PostInDB):
 
 # Esquema para publicación inmediata
 class PostPublishNow(BaseModel):
-    post_id: int
\ No newline at end of file
+    post_id: int
+
+# Esquema para publicación en lote
+class PostPublishBatch(BaseModel):
+    post_ids: List[int] = Field(..., min_length=1, max_length=200)
+    include_story: bool = False
+    as_carousel: bool = False  # Agrupar los posts en carruseles de hasta 10
+    max_concurrency: Optional[int] = Field(None, ge=1, le=20)
+
+# Esquema para publicar varios posts como un carrusel
+class PostPublishCarousel(BaseModel):
+    post_ids: List[int] = Field(..., min_length=2, max_length=10)
+
+# Esquema para el progreso de cada post de un lote
+class PublishJobItemResponse(BaseModel):
+    post_id: int
+    status: str
+    instagram_post_id: Optional[str] = None
+    story_id: Optional[str] = None
+    error_message: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        orm_mode = True
+
+# Esquema para el estado de un lote de publicación
+class PublishJobResponse(BaseModel):
+    job_id: str
+    status: str
+    include_story: bool
+    as_carousel: bool = False
+    total: int
+    published: int = 0
+    failed: int = 0
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    items: List[PublishJobItemResponse] = []
@@ -0,0 +1,24 @@
+# app/schemas/stats.py
+from datetime import date
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+# Publicaciones y fallos de un día
+class DailyPublishCount(BaseModel):
+    date: date
+    published: int
+    failed: int
+
+# Resultados de una acción en el período
+class ActionFailureRate(BaseModel):
+    success: int
+    error: int
+    failure_rate: Optional[float] = None
+
+# Esquema para respuesta de estadísticas del panel
+class PostStats(BaseModel):
+    posts_by_status: Dict[str, int]
+    total_posts: int
+    days: int
+    daily: List[DailyPublishCount]
+    failure_rates: Dict[str, ActionFailureRate]
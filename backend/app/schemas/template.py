@@ -10,6 +10,7 @@ class TemplateBase(BaseModel):
     background_color: str = Field("#FFFFFF", regex=r"^#([A-Fa-f0-9]{6}|[A-Fa-f0-9]{3})$")
     text_color: str = Field("#000000", regex=r"^#([A-Fa-f0-9]{6}|[A-Fa-f0-9]{3})$")
     footer_text: Optional[str] = None
+    caption_format: Optional[str] = None
 
 # Esquema para crear un template
 class TemplateCreate(TemplateBase):
@@ -22,6 +23,7 @@ class TemplateUpdate(BaseModel):
     background_color: Optional[str] = None
     text_color: Optional[str] = None
     footer_text: Optional[str] = None
+    caption_format: Optional[str] = None
     is_active: Optional[bool] = None
 
 # Esquema para respuesta de template
@@ -41,4 +41,5 @@ class Token(BaseModel):
 
 # Esquema para datos del payload del token
 class TokenPayload(BaseModel):
-    sub: Optional[int] = None
\ No newline at end of file
+    sub: Optional[int] = None
+    exp: Optional[int] = None
\ No newline at end of file
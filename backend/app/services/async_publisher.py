@@ -0,0 +1,278 @@
+# app/services/async_publisher.py
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import Post, ScheduleSettings
+from app.db.repositories import PostRepository
+from app.services.instagram_publisher import InstagramPublisher
+from app.services.post_stats import track_status_change
+from app.services.schedule_client import has_next_run
+
+logger = logging.getLogger(__name__)
+
+class AsyncPublisher:
+    """
+    Ejecución de las publicaciones programadas en un bucle de asyncio.
+
+    Las publicaciones son casi todo espera de red, por lo que en lugar de un hilo
+    por publicación (cada uno con su conexión a la base de datos y su cliente de
+    Instagram) corren como corrutinas en un único hilo, acotadas por un
+    semáforo. Lo que sigue siendo bloqueante se delega en pools pequeños:
+
+    - base de datos (pyodbc): SCHEDULER_ASYNC_DB_WORKERS hilos, que acotan
+      también las conexiones en uso;
+    - generación de imágenes (Pillow): SCHEDULER_ASYNC_RENDER_WORKERS hilos;
+    - llamadas de red de clientes sin versión asíncrona (instagrapi, inicio de
+      sesión): SCHEDULER_ASYNC_IO_WORKERS hilos, el executor por defecto del bucle.
+
+    Todas las publicaciones comparten un único InstagramPublisher.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        db_workers: Optional[int] = None,
+        render_workers: Optional[int] = None,
+        io_workers: Optional[int] = None
+    ):
+        """
+        Inicializar el publicador.
+
+        Args:
+            max_concurrency: Número máximo de publicaciones en curso
+            db_workers: Hilos para la base de datos
+            render_workers: Hilos para generar imágenes
+            io_workers: Hilos para las llamadas de red bloqueantes
+        """
+        self.max_concurrency = max_concurrency or settings.SCHEDULER_ASYNC_CONCURRENCY
+        self.db_workers = db_workers or settings.SCHEDULER_ASYNC_DB_WORKERS
+        self.render_workers = render_workers or settings.SCHEDULER_ASYNC_RENDER_WORKERS
+        self.io_workers = io_workers or settings.SCHEDULER_ASYNC_IO_WORKERS
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._db_executor: Optional[ThreadPoolExecutor] = None
+        self._render_executor: Optional[ThreadPoolExecutor] = None
+        self._io_executor: Optional[ThreadPoolExecutor] = None
+
+        self._publisher: Optional[InstagramPublisher] = None
+        self._publisher_lock: Optional[asyncio.Lock] = None
+
+        self._futures: Set[Future] = set()
+        self._futures_lock = threading.Lock()
+        self._in_flight = 0
+
+    def start(self) -> None:
+        """Iniciar el bucle de asyncio en un hilo propio."""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._db_executor = ThreadPoolExecutor(self.db_workers, thread_name_prefix="async-db")
+        self._render_executor = ThreadPoolExecutor(self.render_workers, thread_name_prefix="async-render")
+        self._io_executor = ThreadPoolExecutor(self.io_workers, thread_name_prefix="async-io")
+
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(self._io_executor)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._publisher_lock = asyncio.Lock()
+
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name="async-publisher",
+            daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"Publicador asíncrono iniciado ({self.max_concurrency} publicaciones simultáneas, "
+            f"{self.db_workers} hilos de base de datos, {self.render_workers} de imágenes, "
+            f"{self.io_workers} de red)"
+        )
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Esperar a que terminen las publicaciones en curso y detener el bucle.
+
+        Args:
+            timeout: Tiempo máximo de espera en segundos (None para esperar sin límite)
+
+        Returns:
+            True si todas las publicaciones terminaron a tiempo
+        """
+        if not self._loop:
+            return True
+
+        with self._futures_lock:
+            pending = set(self._futures)
+        _, not_done = wait(pending, timeout=timeout)
+
+        if not_done:
+            logger.warning(f"{len(not_done)} publicaciones asíncronas no terminaron dentro del tiempo de espera")
+            for future in not_done:
+                future.cancel()
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        for executor in (self._db_executor, self._render_executor, self._io_executor):
+            executor.shutdown(wait=False)
+
+        return not not_done
+
+    def submit(self, post_id: int) -> Future:
+        """
+        Publicar un post programado: cargarlo, publicarlo y actualizar su programación.
+
+        Args:
+            post_id: ID del post
+
+        Returns:
+            Future con True si la publicación fue exitosa
+        """
+        return self._track(asyncio.run_coroutine_threadsafe(self._publish_scheduled(post_id), self._loop))
+
+    def submit_post(self, post: Post) -> Future:
+        """
+        Publicar un post ya cargado (p. ej. por el despachador por franjas).
+
+        Args:
+            post: Post desvinculado de su sesión, con su plantilla cargada
+
+        Returns:
+            Future con True si la publicación fue exitosa
+        """
+        return self._track(asyncio.run_coroutine_threadsafe(self.publish(post), self._loop))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtener el estado del publicador.
+
+        Returns:
+            Diccionario con las publicaciones en curso y la ocupación
+        """
+        with self._futures_lock:
+            queued = len(self._futures)
+
+        return {
+            "in_flight": self._in_flight,
+            "queued": queued,
+            "max_concurrency": self.max_concurrency,
+            "saturation": round(min(self._in_flight, self.max_concurrency) / self.max_concurrency, 2),
+            "db_workers": self.db_workers,
+            "render_workers": self.render_workers,
+            "io_workers": self.io_workers
+        }
+
+    async def publish(self, post: Post) -> bool:
+        """
+        Publicar un post en el feed, respetando la concurrencia máxima.
+
+        Args:
+            post: Post desvinculado de su sesión, con su plantilla cargada
+
+        Returns:
+            True si la publicación fue exitosa
+        """
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                publisher = await self._get_publisher()
+                success, _, error = await publisher.publish_post_async(
+                    post,
+                    db_executor=self._db_executor,
+                    render_executor=self._render_executor
+                )
+
+                if success:
+                    logger.info(f"Post {post.post_id} publicado exitosamente")
+                else:
+                    logger.error(f"Error al publicar post {post.post_id}: {error}")
+                return success
+
+            except Exception as e:
+                logger.error(f"Error en la publicación programada del post {post.post_id}: {str(e)}")
+                return False
+
+            finally:
+                self._in_flight -= 1
+
+    async def _publish_scheduled(self, post_id: int) -> bool:
+        """Cargar un post programado, publicarlo y actualizar su programación."""
+        loop = asyncio.get_running_loop()
+
+        post = await loop.run_in_executor(self._db_executor, self._load_post, post_id)
+        if post is None:
+            return False
+
+        success = await self.publish(post)
+
+        await loop.run_in_executor(self._db_executor, self._finish, post, success)
+        return success
+
+    async def _get_publisher(self) -> InstagramPublisher:
+        """Publicador compartido; se crea (e inicia sesión) en el primer uso."""
+        if self._publisher is None:
+            async with self._publisher_lock:
+                if self._publisher is None:
+                    self._publisher = await asyncio.get_running_loop().run_in_executor(None, InstagramPublisher)
+        return self._publisher
+
+    def _track(self, future: Future) -> Future:
+        """Registrar una publicación pendiente hasta que termine."""
+        with self._futures_lock:
+            self._futures.add(future)
+
+        def discard(done: Future) -> None:
+            with self._futures_lock:
+                self._futures.discard(done)
+
+        future.add_done_callback(discard)
+        return future
+
+    def _load_post(self, post_id: int) -> Optional[Post]:
+        """Cargar un post activo con su plantilla y programación (hilo de base de datos)."""
+        db = SessionLocal()
+        try:
+            post = PostRepository(db).get(post_id, with_image=True, with_schedule=True)
+
+            if not post:
+                logger.error(f"No se encontró el post con ID {post_id}")
+                return None
+
+            if not post.schedule or not post.schedule.is_active:
+                logger.info(f"Programación inactiva para post {post_id}")
+                return None
+
+            db.expunge_all()
+            return post
+
+        finally:
+            db.close()
+
+    def _finish(self, post: Post, success: bool) -> None:
+        """Desactivar la programación terminada o marcar el fallo (hilo de base de datos)."""
+        db = SessionLocal()
+        try:
+            if not success:
+                track_status_change(db, [post.post_id], "failed")
+                db.execute(update(Post).where(Post.post_id == post.post_id).values(status="failed"))
+            elif post.schedule.frequency == "once" or not has_next_run(post.schedule):
+                db.execute(
+                    update(ScheduleSettings)
+                    .where(ScheduleSettings.post_id == post.post_id)
+                    .values(is_active=False)
+                )
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error al actualizar la programación del post {post.post_id}: {str(e)}")
+
+        finally:
+            db.close()
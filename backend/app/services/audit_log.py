@@ -0,0 +1,429 @@
+# app/services/audit_log.py
+import os
+import json
+import glob
+import uuid
+import atexit
+import socket
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import PostLog
+from app.services.post_stats import record_log_entries
+
+logger = logging.getLogger(__name__)
+
+# Archivo de AUDIT_LOG_SPILL_DIR con los registros que la base rechazó
+DEAD_LETTER_FILE = "dead-letter.jsonl"
+
+def _process_alive(pid: int) -> bool:
+    """
+    Indicar si un proceso de este equipo sigue en ejecución.
+
+    Un archivo con el PID de este proceso pertenece a una ejecución anterior
+    (p. ej. un contenedor reiniciado, donde el PID se repite).
+    """
+    if pid == os.getpid():
+        return False
+    # En Windows os.kill con la señal 0 no sirve para comprobarlo
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class AuditLogWriter:
+    """
+    Escritura en lote de los registros de acciones (PostLog).
+
+    Los registros se acumulan en memoria y un hilo los inserta en una sola
+    transacción al llegar a AUDIT_LOG_BATCH_SIZE o cada
+    AUDIT_LOG_FLUSH_SECONDS, en una sesión propia: no dependen de la
+    transacción del post ni la alargan.
+
+    Cada registro se agrega también a un archivo del proceso en
+    AUDIT_LOG_SPILL_DIR, que se borra cuando su contenido queda insertado. Si
+    el proceso termina sin insertarlos, el siguiente proceso del mismo equipo
+    los recupera al iniciar. La entrega es al menos una vez: una caída entre
+    el commit y el borrado del archivo puede duplicar ese lote.
+
+    Si la base rechaza un lote por sus datos (p. ej. el post ya no existe),
+    los registros se insertan uno a uno y los rechazados se guardan en
+    DEAD_LETTER_FILE en lugar de reintentarse, para que no bloqueen al resto.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: Optional[int] = None,
+        flush_seconds: Optional[float] = None,
+        spill_dir: Optional[str] = None,
+        buffered: Optional[bool] = None
+    ):
+        """
+        Inicializar el escritor.
+
+        Args:
+            session_factory: Fábrica de sesiones para las inserciones
+            batch_size: Registros acumulados que disparan una inserción
+            flush_seconds: Segundos máximos que un registro espera en memoria
+            spill_dir: Directorio de los archivos de respaldo
+            buffered: False para insertar cada registro al momento
+        """
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.AUDIT_LOG_BATCH_SIZE
+        self.flush_seconds = flush_seconds or settings.AUDIT_LOG_FLUSH_SECONDS
+        self.buffered = settings.AUDIT_LOG_BUFFERED if buffered is None else buffered
+
+        # Un subdirectorio por equipo: solo se recuperan archivos de procesos locales
+        self.spill_dir = os.path.join(spill_dir or settings.AUDIT_LOG_SPILL_DIR, socket.gethostname())
+        self._instance = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        # Archivo en el que se escriben los registros nuevos y archivos ya
+        # cerrados cuyos registros siguen pendientes de insertar
+        self._spill_file = None
+        self._spill_error = False
+        self._segments: List[str] = []
+        self._segment_index = 0
+
+        self._counters = {"written": 0, "flushes": 0, "failed_flushes": 0, "recovered": 0, "dead_lettered": 0}
+
+    def record(
+        self,
+        post_id: int,
+        action: str,
+        status: str,
+        error_message: Optional[str] = None,
+        timestamp: Optional[datetime] = None
+    ) -> None:
+        """
+        Registrar una acción sobre un post.
+
+        Args:
+            post_id: ID del post
+            action: Tipo de acción ('publish', 'publish_story', etc.)
+            status: Estado ('success', 'error')
+            error_message: Mensaje de error (solo si status es 'error')
+            timestamp: Momento de la acción (por defecto, ahora)
+        """
+        entry = {
+            "post_id": post_id,
+            "action": action,
+            "status": status,
+            "error_message": error_message,
+            "timestamp": timestamp or datetime.utcnow()
+        }
+
+        if not self.buffered or self._closed:
+            try:
+                self._insert([entry])
+                self._counters["written"] += 1
+            except Exception as e:
+                logger.error(f"Error al registrar la acción {action} del post {post_id}: {str(e)}")
+            return
+
+        with self._lock:
+            self._spill(entry)
+            self._buffer.append(entry)
+            pending = len(self._buffer)
+
+        self._start()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Insertar los registros acumulados.
+
+        Returns:
+            Número de registros insertados; los que no se pudieron insertar
+            se reintentan en la siguiente, salvo los rechazados por la base
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._buffer:
+                    return 0
+                entries, self._buffer = self._buffer, []
+                self._rotate()
+                segments = list(self._segments)
+
+            try:
+                self._insert(entries)
+                written, pending = len(entries), []
+            except (IntegrityError, DataError) as e:
+                logger.warning(
+                    f"Lote de {len(entries)} registros de acciones rechazado, "
+                    f"se inserta uno a uno: {str(e)}"
+                )
+                written, pending = self._insert_each(entries)
+            except Exception as e:
+                logger.error(f"Error al insertar {len(entries)} registros de acciones: {str(e)}")
+                written, pending = 0, entries
+
+            if pending:
+                with self._lock:
+                    # Delante de los nuevos, para conservar el orden
+                    self._buffer[:0] = pending
+                self._counters["written"] += written
+                self._counters["failed_flushes"] += 1
+                return written
+
+            with self._lock:
+                self._segments = [path for path in self._segments if path not in segments]
+            for path in segments:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+            self._counters["written"] += written
+            self._counters["flushes"] += 1
+            return written
+
+    def recover(self) -> int:
+        """
+        Tomar los registros que dejaron sin insertar procesos terminados de este equipo.
+
+        Los archivos se renombran como propios antes de leerlos, de modo que
+        dos procesos que inician a la vez no recuperan el mismo. Se insertan con
+        la siguiente inserción en lote.
+
+        Returns:
+            Número de registros recuperados
+        """
+        recovered: List[Dict[str, Any]] = []
+
+        for path in sorted(glob.glob(os.path.join(self.spill_dir, "*.jsonl"))):
+            owner = os.path.basename(path).split(".")[0]
+            if owner == self._instance or os.path.basename(path) == DEAD_LETTER_FILE:
+                continue
+            try:
+                if _process_alive(int(owner.split("-")[0])):
+                    continue
+            except ValueError:
+                continue
+
+            with self._lock:
+                claimed = self._next_segment_path()
+                try:
+                    os.rename(path, claimed)
+                except OSError:
+                    # Otro proceso lo tomó primero
+                    continue
+                self._segments.append(claimed)
+
+            try:
+                recovered.extend(self._read_spill(claimed))
+            except OSError as e:
+                logger.error(f"Error al leer el respaldo de registros {claimed}: {str(e)}")
+
+        if recovered:
+            recovered.sort(key=lambda entry: entry["timestamp"])
+            with self._lock:
+                self._buffer[:0] = recovered
+            self._counters["recovered"] += len(recovered)
+            logger.warning(f"Recuperados {len(recovered)} registros de acciones sin insertar")
+            self._start()
+            self._wakeup.set()
+
+        return len(recovered)
+
+    def close(self) -> None:
+        """Detener el hilo de inserción e insertar lo pendiente (al terminar el proceso)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_seconds + 10)
+
+        self.flush()
+        with self._lock:
+            if self._buffer:
+                logger.warning(
+                    f"{len(self._buffer)} registros de acciones quedan en {self.spill_dir} "
+                    f"para el próximo inicio"
+                )
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Obtener el estado del escritor.
+
+        Returns:
+            Diccionario con los registros pendientes, los archivos de respaldo
+            pendientes y los contadores de inserciones y de registros rechazados
+        """
+        with self._lock:
+            return {
+                "buffered": self.buffered,
+                "pending": len(self._buffer),
+                "spill_segments": len(self._segments) + (self._spill_file is not None),
+                **self._counters
+            }
+
+    def _start(self) -> None:
+        """Iniciar el hilo de inserción en el primer registro."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="audit-log-writer", daemon=True
+                    )
+                    self._thread.start()
+
+    def _run(self) -> None:
+        """Insertar los registros por tamaño o por tiempo hasta el cierre."""
+        while not self._closed:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            if self._closed:
+                break
+            self.flush()
+
+    def _insert(self, entries: List[Dict[str, Any]]) -> None:
+        """Insertar los registros en una transacción propia."""
+        db = self.session_factory()
+        try:
+            db.execute(insert(PostLog), entries)
+            record_log_entries(db, entries)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _insert_each(self, entries: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Insertar de a uno los registros de un lote rechazado.
+
+        Los que la base vuelve a rechazar se guardan en DEAD_LETTER_FILE.
+
+        Returns:
+            Tupla (registros insertados, registros pendientes si se cortó la
+            inserción por otro error, p. ej. de conexión)
+        """
+        written = 0
+        for index, entry in enumerate(entries):
+            try:
+                self._insert([entry])
+            except (IntegrityError, DataError) as e:
+                self._dead_letter(entry, e)
+                continue
+            except Exception as e:
+                logger.error(f"Error al insertar registros de acciones: {str(e)}")
+                return written, entries[index:]
+            written += 1
+        return written, []
+
+    def _dead_letter(self, entry: Dict[str, Any], error: Exception) -> None:
+        """Guardar un registro rechazado por la base para revisarlo a mano."""
+        self._counters["dead_lettered"] += 1
+        line = json.dumps({**entry, "timestamp": entry["timestamp"].isoformat(), "error": str(error)})
+        logger.error(f"Registro de acciones rechazado por la base: {line}")
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(os.path.join(self.spill_dir, DEAD_LETTER_FILE), "a", encoding="utf-8") as dead_letter:
+                dead_letter.write(line + "\n")
+        except OSError as e:
+            logger.error(f"Error al escribir {DEAD_LETTER_FILE} en {self.spill_dir}: {str(e)}")
+
+    def _spill(self, entry: Dict[str, Any]) -> None:
+        """Agregar un registro al archivo de respaldo (requiere el lock)."""
+        try:
+            if self._spill_file is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self._spill_file = open(self._active_path(), "a", encoding="utf-8")
+            self._spill_file.write(json.dumps({**entry, "timestamp": entry["timestamp"].isoformat()}) + "\n")
+            self._spill_file.flush()
+            self._spill_error = False
+        except OSError as e:
+            # Sin respaldo en disco los registros siguen en memoria
+            if not self._spill_error:
+                logger.error(f"Error al escribir el respaldo de registros en {self.spill_dir}: {str(e)}")
+                self._spill_error = True
+
+    def _rotate(self) -> None:
+        """Cerrar el archivo actual y dejarlo pendiente con su lote (requiere el lock)."""
+        if self._spill_file is None:
+            return
+        self._spill_file.close()
+        self._spill_file = None
+
+        segment = self._next_segment_path()
+        try:
+            os.rename(self._active_path(), segment)
+            self._segments.append(segment)
+        except OSError as e:
+            logger.error(f"Error al rotar el respaldo de registros: {str(e)}")
+
+    def _active_path(self) -> str:
+        """Ruta del archivo en el que se escriben los registros nuevos."""
+        return os.path.join(self.spill_dir, f"{self._instance}.jsonl")
+
+    def _next_segment_path(self) -> str:
+        """Ruta para el siguiente archivo cerrado (requiere el lock)."""
+        self._segment_index += 1
+        return os.path.join(self.spill_dir, f"{self._instance}.{self._segment_index:06d}.jsonl")
+
+    def _read_spill(self, path: str) -> List[Dict[str, Any]]:
+        """Leer un archivo de respaldo; una última línea incompleta se descarta."""
+        entries = []
+        with open(path, encoding="utf-8") as spill_file:
+            for line in spill_file:
+                try:
+                    entry = json.loads(line)
+                    entry["timestamp"] = datetime.fromisoformat(entry["timestamp"])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Línea incompleta descartada en {path}")
+                    continue
+                entries.append(entry)
+        return entries
+
+_audit_log: Optional[AuditLogWriter] = None
+_audit_log_lock = threading.Lock()
+
+def get_audit_log() -> AuditLogWriter:
+    """
+    Obtener el escritor de registros compartido por el proceso.
+
+    Al crearlo recupera los registros que dejaron procesos anteriores y
+    programa la inserción de lo pendiente al terminar el proceso.
+
+    Returns:
+        Instancia única del escritor para este proceso
+    """
+    global _audit_log
+
+    if _audit_log is None:
+        with _audit_log_lock:
+            if _audit_log is None:
+                writer = AuditLogWriter()
+                if writer.buffered:
+                    writer.recover()
+                atexit.register(writer.close)
+                _audit_log = writer
+
+    return _audit_log
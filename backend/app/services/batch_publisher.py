@@ -0,0 +1,504 @@
+# app/services/batch_publisher.py
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import PublishJob, PublishJobItem
+from app.db.repositories import PostRepository
+from app.services.image_generator import ImageGenerator
+from app.services.instagram_publisher import CAROUSEL_MAX_ITEMS, InstagramPublisher
+from app.utils.image_utils import find_generated_image
+
+logger = logging.getLogger(__name__)
+
+# Estados de un lote que todavía no terminó
+ACTIVE_JOB_STATUSES = ("pending", "rendering", "publishing")
+
+# Estados finales de cada post de un lote
+FINISHED_ITEM_STATUSES = ("published", "failed")
+
+class BatchPublisher:
+    """
+    Servicio para publicar varios posts en un único lote.
+
+    El lote se ejecuta en segundo plano: primero genera en paralelo las imágenes
+    que falten y luego sube los posts con concurrencia acotada, compartiendo una
+    sola sesión de Instagram y el limitador de tasa. El progreso de cada post se
+    guarda en la base de datos para poder consultarlo desde cualquier worker.
+
+    Mientras un lote está en cola o en ejecución, un hilo del proceso renueva
+    su heartbeat_at cada BATCH_PUBLISH_HEARTBEAT_SECONDS. Un lote sin terminar
+    cuyo latido tiene más de BATCH_PUBLISH_STALE_SECONDS perdió su proceso
+    (p. ej. un worker reiniciado) y fail_stale_jobs lo da por fallido.
+    """
+
+    # Pool compartido por el proceso para ejecutar los lotes en segundo plano
+    _executor = ThreadPoolExecutor(
+        max_workers=settings.BATCH_PUBLISH_MAX_JOBS,
+        thread_name_prefix="batch-publish"
+    )
+
+    # Lotes en cola o en ejecución en este proceso
+    _running: Set[str] = set()
+    _running_lock = threading.Lock()
+    _heartbeat_thread: Optional[threading.Thread] = None
+
+    def create_job(
+        self,
+        db: Session,
+        post_ids: List[int],
+        include_story: bool = False,
+        user_id: Optional[int] = None,
+        as_carousel: bool = False
+    ) -> PublishJob:
+        """
+        Registrar un lote de publicación.
+
+        Args:
+            db: Sesión de base de datos
+            post_ids: IDs de los posts a publicar
+            include_story: Publicar también cada post en historias
+            user_id: Usuario que solicita el lote
+            as_carousel: Agrupar los posts en carruseles de hasta 10 imágenes
+
+        Returns:
+            Lote creado
+        """
+        # Quitar duplicados manteniendo el orden solicitado
+        unique_ids = list(dict.fromkeys(post_ids))
+
+        job = PublishJob(
+            job_id=str(uuid.uuid4()),
+            user_id=user_id,
+            status="pending",
+            include_story=include_story,
+            as_carousel=as_carousel,
+            total=len(unique_ids),
+            heartbeat_at=datetime.utcnow()
+        )
+        db.add(job)
+        db.add_all([
+            PublishJobItem(job_id=job.job_id, post_id=post_id, status="pending")
+            for post_id in unique_ids
+        ])
+        db.commit()
+        db.refresh(job)
+
+        return job
+
+    def submit(self, job_id: str, max_concurrency: Optional[int] = None) -> None:
+        """
+        Ejecutar un lote en segundo plano.
+
+        Args:
+            job_id: ID del lote
+            max_concurrency: Número máximo de subidas simultáneas
+        """
+        self._start_heartbeat(job_id)
+        try:
+            self._executor.submit(
+                self.run_job,
+                job_id,
+                max_concurrency or settings.BATCH_PUBLISH_MAX_CONCURRENCY
+            )
+        except Exception:
+            self._stop_heartbeat(job_id)
+            raise
+
+    def run_job(self, job_id: str, max_concurrency: int) -> None:
+        """
+        Ejecutar un lote de publicación. Los fallos de un post no detienen el resto.
+
+        Si el lote se interrumpe por un error, los posts que no llegaron a un
+        estado final y el propio lote quedan como fallidos.
+
+        Args:
+            job_id: ID del lote
+            max_concurrency: Número máximo de subidas simultáneas
+        """
+        try:
+            self._run_job(job_id, max_concurrency)
+        finally:
+            self._stop_heartbeat(job_id)
+
+    def _run_job(self, job_id: str, max_concurrency: int) -> None:
+        """Ejecutar las fases del lote (ver run_job)."""
+        db = SessionLocal()
+        try:
+            job = db.query(PublishJob).filter(PublishJob.job_id == job_id).first()
+            if not job:
+                logger.error(f"No se encontró el lote {job_id}")
+                return
+
+            include_story = job.include_story
+            as_carousel = job.as_carousel
+            post_ids = [
+                item.post_id for item in
+                db.query(PublishJobItem).filter(PublishJobItem.job_id == job_id).order_by(PublishJobItem.item_id)
+            ]
+        except Exception as e:
+            logger.error(f"Error al leer el lote de publicación {job_id}: {str(e)}")
+            self._fail_job(job_id, f"Error al iniciar el lote: {str(e)}")
+            return
+        finally:
+            db.close()
+
+        try:
+            # Fase 1: generar en paralelo las imágenes que falten
+            self._set_job_status(job_id, "rendering")
+            failed = self._render_missing(job_id, post_ids)
+
+            # Fase 2: subir con concurrencia acotada y una sola sesión de Instagram
+            self._set_job_status(job_id, "publishing")
+            pending_ids = [post_id for post_id in post_ids if post_id not in failed]
+
+            if pending_ids:
+                publisher = InstagramPublisher()
+                with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+                    if as_carousel:
+                        # Un carrusel por cada grupo de hasta 10 posts
+                        for start in range(0, len(pending_ids), CAROUSEL_MAX_ITEMS):
+                            chunk = pending_ids[start:start + CAROUSEL_MAX_ITEMS]
+                            if len(chunk) == 1:
+                                pool.submit(self._publish_one, publisher, job_id, chunk[0], include_story)
+                            else:
+                                pool.submit(self._publish_carousel, publisher, job_id, chunk)
+                    else:
+                        for post_id in pending_ids:
+                            pool.submit(self._publish_one, publisher, job_id, post_id, include_story)
+
+            self._set_job_status(job_id, "completed", finished=True)
+            logger.info(f"Lote {job_id} finalizado ({len(post_ids)} posts)")
+
+        except Exception as e:
+            logger.error(f"Error en el lote de publicación {job_id}: {str(e)}")
+            self._fail_job(job_id, f"Lote interrumpido: {str(e)}")
+
+    def fail_stale_jobs(self) -> int:
+        """
+        Dar por fallidos los lotes sin terminar cuyo proceso ya no existe.
+
+        Se ejecuta al iniciar la API: un lote corre en el proceso que lo
+        recibió, y si ese proceso se detiene el lote quedaría sin terminar para
+        siempre. Se reconocen por no renovar heartbeat_at en
+        BATCH_PUBLISH_STALE_SECONDS.
+
+        Returns:
+            Número de lotes marcados como fallidos
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.BATCH_PUBLISH_STALE_SECONDS)
+
+        db = SessionLocal()
+        try:
+            stale_ids = db.execute(
+                select(PublishJob.job_id).where(
+                    PublishJob.status.in_(ACTIVE_JOB_STATUSES),
+                    or_(PublishJob.heartbeat_at.is_(None), PublishJob.heartbeat_at < cutoff)
+                )
+            ).scalars().all()
+        except Exception as e:
+            logger.error(f"Error al buscar lotes de publicación interrumpidos: {str(e)}")
+            return 0
+        finally:
+            db.close()
+
+        failed = 0
+        for job_id in stale_ids:
+            with self._running_lock:
+                if job_id in self._running:
+                    continue
+            try:
+                self._fail_job(job_id, "El proceso que ejecutaba el lote se detuvo antes de terminarlo")
+                failed += 1
+            except Exception as e:
+                logger.error(f"Error al cerrar el lote interrumpido {job_id}: {str(e)}")
+
+        if failed:
+            logger.warning(f"{failed} lotes de publicación interrumpidos marcados como fallidos")
+        return failed
+
+    def _fail_job(self, job_id: str, error_message: str) -> None:
+        """
+        Marcar como fallidos el lote y los posts que no llegaron a un estado final.
+
+        Args:
+            job_id: ID del lote
+            error_message: Motivo, guardado en cada post afectado
+        """
+        now = datetime.utcnow()
+
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(PublishJobItem)
+                .where(
+                    PublishJobItem.job_id == job_id,
+                    PublishJobItem.status.not_in(FINISHED_ITEM_STATUSES)
+                )
+                .values(status="failed", error_message=error_message, updated_at=now)
+            )
+            db.execute(
+                update(PublishJob)
+                .where(PublishJob.job_id == job_id)
+                .values(status="failed", finished_at=now)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    @classmethod
+    def _start_heartbeat(cls, job_id: str) -> None:
+        """Registrar un lote de este proceso e iniciar el hilo de latidos si hace falta."""
+        with cls._running_lock:
+            cls._running.add(job_id)
+            if cls._heartbeat_thread is None:
+                cls._heartbeat_thread = threading.Thread(
+                    target=cls._heartbeat, name="batch-publish-heartbeat", daemon=True
+                )
+                cls._heartbeat_thread.start()
+
+    @classmethod
+    def _stop_heartbeat(cls, job_id: str) -> None:
+        """Quitar un lote terminado de los que renuevan su latido."""
+        with cls._running_lock:
+            cls._running.discard(job_id)
+
+    @classmethod
+    def _heartbeat(cls) -> None:
+        """Renovar heartbeat_at de los lotes de este proceso mientras haya alguno."""
+        while True:
+            time.sleep(settings.BATCH_PUBLISH_HEARTBEAT_SECONDS)
+            with cls._running_lock:
+                job_ids = list(cls._running)
+                if not job_ids:
+                    cls._heartbeat_thread = None
+                    return
+
+            db = SessionLocal()
+            try:
+                db.execute(
+                    update(PublishJob)
+                    .where(PublishJob.job_id.in_(job_ids))
+                    .values(heartbeat_at=datetime.utcnow())
+                )
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error al renovar el latido de los lotes de publicación: {str(e)}")
+            finally:
+                db.close()
+
+    def _render_missing(self, job_id: str, post_ids: List[int]) -> Set[int]:
+        """
+        Generar en paralelo las imágenes de los posts que no tienen una.
+
+        Args:
+            job_id: ID del lote
+            post_ids: IDs de los posts del lote
+
+        Returns:
+            IDs de los posts que no se pueden publicar
+        """
+        failed: Set[int] = set()
+
+        db = SessionLocal()
+        try:
+            # Los posts y sus plantillas (con la imagen base) en dos consultas
+            posts = PostRepository(db).get_many(post_ids, with_image=True)
+
+            found_ids = {post.post_id for post in posts}
+            for post_id in post_ids:
+                if post_id not in found_ids:
+                    failed.add(post_id)
+                    self._update_item(job_id, post_id, status="failed", error_message="Publicación no encontrada")
+
+            to_render = [post for post in posts if find_generated_image(post.post_id) is None]
+            render_ids = {post.post_id for post in to_render}
+
+            ready_ids = [post_id for post_id in found_ids if post_id not in render_ids]
+            if ready_ids:
+                self._update_item(job_id, ready_ids, status="ready")
+
+            if not to_render:
+                return failed
+
+            self._update_item(job_id, list(render_ids), status="rendering")
+
+            generator = ImageGenerator()
+            with ThreadPoolExecutor(max_workers=settings.BATCH_RENDER_WORKERS) as pool:
+                futures = {
+                    pool.submit(generator.generate_post_image, post): post.post_id
+                    for post in to_render
+                }
+
+                for future in as_completed(futures):
+                    post_id = futures[future]
+                    try:
+                        future.result()
+                        self._update_item(job_id, post_id, status="ready")
+                    except Exception as e:
+                        failed.add(post_id)
+                        self._update_item(job_id, post_id, status="failed", error_message=str(e))
+
+            return failed
+
+        finally:
+            db.close()
+
+    def _publish_one(self, publisher: InstagramPublisher, job_id: str, post_id: int, include_story: bool) -> None:
+        """
+        Publicar un post del lote con su propia sesión de base de datos.
+
+        Args:
+            publisher: Publicador compartido por el lote
+            job_id: ID del lote
+            post_id: ID del post
+            include_story: Publicar también en historias
+        """
+        self._update_item(job_id, post_id, status="publishing")
+
+        db = SessionLocal()
+        try:
+            post = PostRepository(db).get(post_id, with_image=True)
+
+            story_id = None
+            if include_story:
+                results = publisher.publish_post_with_story(post, db)
+                success, instagram_post_id, error = results["post"]
+                _, story_id, _ = results["story"]
+            else:
+                success, instagram_post_id, error = publisher.publish_post(post, db)
+
+            if success:
+                self._update_item(
+                    job_id, post_id,
+                    status="published",
+                    instagram_post_id=instagram_post_id,
+                    story_id=story_id
+                )
+            else:
+                self._update_item(job_id, post_id, status="failed", error_message=error)
+
+        except Exception as e:
+            logger.error(f"Error al publicar post {post_id} del lote {job_id}: {str(e)}")
+            self._update_item(job_id, post_id, status="failed", error_message=str(e))
+
+        finally:
+            db.close()
+
+    def _publish_carousel(self, publisher: InstagramPublisher, job_id: str, post_ids: List[int]) -> None:
+        """
+        Publicar un grupo de posts del lote como un carrusel.
+
+        Args:
+            publisher: Publicador compartido por el lote
+            job_id: ID del lote
+            post_ids: IDs de los posts del carrusel (entre 2 y 10)
+        """
+        self._update_item(job_id, post_ids, status="publishing")
+
+        db = SessionLocal()
+        try:
+            # En el orden de las diapositivas
+            posts = PostRepository(db).get_many(post_ids, with_image=True)
+
+            success, media_id, error = publisher.publish_carousel(posts, db)
+
+            if success:
+                self._update_item(job_id, post_ids, status="published", instagram_post_id=media_id)
+            else:
+                self._update_item(job_id, post_ids, status="failed", error_message=error)
+
+        except Exception as e:
+            logger.error(f"Error al publicar carrusel del lote {job_id}: {str(e)}")
+            self._update_item(job_id, post_ids, status="failed", error_message=str(e))
+
+        finally:
+            db.close()
+
+    def _update_item(self, job_id: str, post_ids, **values: Any) -> None:
+        """
+        Actualizar el progreso de uno o varios posts de un lote.
+
+        Args:
+            job_id: ID del lote
+            post_ids: ID o lista de IDs de los posts
+            values: Columnas a actualizar
+        """
+        if isinstance(post_ids, int):
+            post_ids = [post_ids]
+
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(PublishJobItem)
+                .where(PublishJobItem.job_id == job_id, PublishJobItem.post_id.in_(post_ids))
+                .values(updated_at=datetime.utcnow(), **values)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _set_job_status(self, job_id: str, status: str, finished: bool = False) -> None:
+        """Actualizar el estado general de un lote."""
+        values: Dict[str, Any] = {"status": status}
+        if finished:
+            values["finished_at"] = datetime.utcnow()
+
+        db = SessionLocal()
+        try:
+            db.execute(update(PublishJob).where(PublishJob.job_id == job_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def get_job_status(self, db: Session, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtener el estado de un lote con el progreso de cada post.
+
+        Args:
+            db: Sesión de base de datos
+            job_id: ID del lote
+
+        Returns:
+            Diccionario con el estado del lote o None si no existe
+        """
+        job = db.query(PublishJob).filter(PublishJob.job_id == job_id).first()
+        if not job:
+            return None
+
+        items = db.query(PublishJobItem).filter(
+            PublishJobItem.job_id == job_id
+        ).order_by(PublishJobItem.item_id).all()
+
+        return {
+            "job_id": job.job_id,
+            "status": job.status,
+            "include_story": job.include_story,
+            "as_carousel": job.as_carousel,
+            "total": job.total,
+            "published": sum(1 for item in items if item.status == "published"),
+            "failed": sum(1 for item in items if item.status == "failed"),
+            "created_at": job.created_at,
+            "finished_at": job.finished_at,
+            "items": [
+                {
+                    "post_id": item.post_id,
+                    "status": item.status,
+                    "instagram_post_id": item.instagram_post_id,
+                    "story_id": item.story_id,
+                    "error_message": item.error_message,
+                    "updated_at": item.updated_at
+                }
+                for item in items
+            ]
+        }
@@ -0,0 +1,346 @@
+# app/services/capacity_planner.py
+import logging
+import math
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import Post, ScheduleSettings
+from app.services.recurrence import compile_recurrence
+from app.services.schedule_client import get_jobs_version
+
+logger = logging.getLogger(__name__)
+
+# Ventana del límite de publicaciones por hora
+HOUR_SECONDS = 3600.0
+
+# Máximo de ocurrencias de una programación recurrente que se indexan
+MAX_OCCURRENCES_PER_SCHEDULE = 1000
+
+def _to_timestamp(value: datetime) -> float:
+    """Convertir una fecha (UTC si no tiene zona) a timestamp."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def _to_datetime(timestamp: float) -> datetime:
+    """Convertir un timestamp a fecha UTC sin zona, como se guardan en la base."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+class CapacityPlanner:
+    """
+    Planificador de horarios de publicación de la cuenta de Instagram.
+
+    Mantiene en memoria la lista ordenada de las horas de publicación
+    programadas (Post.scheduled_for de los posts de una sola vez y las
+    ocurrencias de las programaciones recurrentes dentro del horizonte) y
+    busca sobre ella con bisect el horario libre más cercano que respete:
+
+    - la separación mínima entre publicaciones (SCHEDULER_PLANNER_MIN_SPACING_MINUTES);
+    - el máximo de publicaciones en cualquier ventana de una hora
+      (SCHEDULER_PLANNER_MAX_POSTS_PER_HOUR).
+
+    Comprobar un horario cuesta O(log n + k), con k el máximo por hora; si
+    está ocupado se salta directamente al primer horario que podría estar
+    libre. La búsqueda es solo hacia adelante: una oferta no se publica antes
+    de la hora pedida.
+
+    Cada worker de la API tiene su propio índice; se recarga cuando cambia el
+    contador de versión del jobstore (ver ScheduleClient.notify).
+    """
+
+    def __init__(
+        self,
+        min_spacing_minutes: Optional[float] = None,
+        max_per_hour: Optional[int] = None,
+        horizon_days: Optional[int] = None
+    ):
+        """
+        Inicializar el planificador; el índice se carga en la primera consulta.
+
+        Args:
+            min_spacing_minutes: Separación mínima entre publicaciones
+            max_per_hour: Máximo de publicaciones en una hora
+            horizon_days: Días hacia adelante en que se expanden las recurrencias
+        """
+        if min_spacing_minutes is None:
+            min_spacing_minutes = settings.SCHEDULER_PLANNER_MIN_SPACING_MINUTES
+        # Al menos un segundo, para que dos publicaciones no coincidan
+        self.spacing = max(min_spacing_minutes * 60.0, 1.0)
+        self.max_per_hour = max_per_hour or settings.SCHEDULER_PLANNER_MAX_POSTS_PER_HOUR
+        self.horizon_days = horizon_days or settings.SCHEDULER_PLANNER_HORIZON_DAYS
+
+        # Horas de publicación ordenadas (timestamps) y las de cada post
+        self._times: List[float] = []
+        self._by_post: Dict[int, List[float]] = {}
+        # Horas anteriores de los posts con un horario reservado por assign,
+        # para restaurarlas si la programación no se guarda (ver cancel)
+        self._replaced: Dict[int, List[float]] = {}
+        self._version: Optional[int] = None
+        self._lock = threading.RLock()
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Recargar el índice si el jobstore cambió desde la última carga.
+
+        Args:
+            force: Recargar aunque la versión no haya cambiado
+        """
+        version = get_jobs_version()
+        with self._lock:
+            if force or version != self._version:
+                self._load()
+                self._version = version
+
+    def next_free_slot(self, desired: datetime, exclude_post_id: Optional[int] = None) -> datetime:
+        """
+        Obtener el primer horario libre a partir de una hora deseada.
+
+        Args:
+            desired: Hora deseada (UTC si no tiene zona)
+            exclude_post_id: Post cuyas horas actuales no se tienen en cuenta
+                (al reprogramarlo)
+
+        Returns:
+            Horario libre en UTC sin zona
+        """
+        self.refresh()
+        with self._lock:
+            return _to_datetime(self._find_free(self._start_from(desired), exclude_post_id))
+
+    def suggest_slots(self, desired: datetime, count: int = 5, exclude_post_id: Optional[int] = None) -> List[datetime]:
+        """
+        Sugerir los próximos horarios libres a partir de una hora deseada.
+
+        Cada sugerencia respeta también la separación con las anteriores, de
+        modo que se pueden asignar todas a la vez.
+
+        Args:
+            desired: Hora deseada (UTC si no tiene zona)
+            count: Número de horarios a sugerir
+            exclude_post_id: Post cuyas horas actuales no se tienen en cuenta
+
+        Returns:
+            Horarios libres en UTC sin zona, en orden
+        """
+        self.refresh()
+        slots: List[float] = []
+        with self._lock:
+            candidate = self._start_from(desired)
+            try:
+                for _ in range(count):
+                    slot = self._find_free(candidate, exclude_post_id)
+                    slots.append(slot)
+                    insort(self._times, slot)
+                    candidate = slot
+            finally:
+                # Las sugerencias no reservan el horario
+                for slot in slots:
+                    del self._times[bisect_left(self._times, slot)]
+
+        return [_to_datetime(slot) for slot in slots]
+
+    def assign(self, post_id: int, desired: datetime) -> datetime:
+        """
+        Asignar a un post el primer horario libre y reservarlo en el índice.
+
+        La reserva evita que otra asignación en este proceso tome el mismo
+        horario antes de que se guarde la programación. Si finalmente no se
+        guarda, hay que deshacerla con cancel.
+
+        Args:
+            post_id: ID del post
+            desired: Hora deseada (UTC si no tiene zona)
+
+        Returns:
+            Horario asignado en UTC sin zona
+        """
+        self.refresh()
+        with self._lock:
+            previous = self._by_post.get(post_id, [])
+            self._remove_post(post_id)
+            self._replaced.setdefault(post_id, previous)
+            slot = self._find_free(self._start_from(desired))
+            insort(self._times, slot)
+            self._by_post[post_id] = [slot]
+            return _to_datetime(slot)
+
+    def cancel(self, post_id: int) -> None:
+        """
+        Deshacer la reserva de assign de un post cuya programación no se guardó.
+
+        Libera el horario reservado y restaura las horas que el post tenía.
+        No hace nada si el índice se recargó desde la reserva.
+
+        Args:
+            post_id: ID del post
+        """
+        with self._lock:
+            if post_id not in self._replaced:
+                return
+            self._remove_post(post_id)
+            previous = self._replaced.pop(post_id)
+            for timestamp in previous:
+                insort(self._times, timestamp)
+            if previous:
+                self._by_post[post_id] = previous
+
+    def _start_from(self, desired: datetime) -> float:
+        """No sugerir horarios en el pasado."""
+        return max(_to_timestamp(desired), datetime.now(timezone.utc).timestamp())
+
+    def _find_free(self, candidate: float, exclude_post_id: Optional[int] = None) -> float:
+        """
+        Buscar el primer horario libre a partir de un candidato.
+
+        Cada conflicto devuelve una cota inferior del siguiente horario libre,
+        por lo que el candidato solo avanza y cada salto deja atrás al menos
+        una publicación existente.
+        """
+        excluded = self._by_post.get(exclude_post_id, []) if exclude_post_id is not None else []
+        if excluded:
+            for timestamp in excluded:
+                del self._times[bisect_left(self._times, timestamp)]
+
+        try:
+            while True:
+                next_candidate = self._conflict(candidate)
+                if next_candidate is None:
+                    return candidate
+                # Los horarios alternativos caen en minutos exactos
+                candidate = float(math.ceil(next_candidate / 60.0) * 60)
+        finally:
+            for timestamp in excluded:
+                insort(self._times, timestamp)
+
+    def _conflict(self, candidate: float) -> Optional[float]:
+        """
+        Comprobar si un horario respeta la separación y el máximo por hora.
+
+        Returns:
+            None si está libre; si no, el primer horario que podría estarlo
+        """
+        times = self._times
+        bound = None
+
+        # Separación mínima: ninguna publicación a menos de `spacing`
+        low = bisect_right(times, candidate - self.spacing)
+        high = bisect_left(times, candidate + self.spacing)
+        if low < high:
+            bound = times[high - 1] + self.spacing
+
+        # Máximo por hora: con el candidato insertado en `position`, ningún
+        # grupo de max_per_hour + 1 publicaciones consecutivas puede caber en
+        # una hora. Se revisan los grupos que contienen al candidato.
+        limit = self.max_per_hour
+        position = bisect_left(times, candidate)
+        for before in range(limit + 1):
+            after = limit - before
+            if before > position or position + after > len(times):
+                continue
+
+            first = times[position - before] if before else candidate
+            last = times[position + after - 1] if after else candidate
+            if last - first >= HOUR_SECONDS:
+                continue
+
+            if before:
+                # Hasta una hora después de la primera del grupo, la ventana
+                # que empieza en ella sigue excedida
+                group_bound = first + HOUR_SECONDS
+            else:
+                # Antes de la siguiente publicación la ventana sigue excedida
+                group_bound = times[position] + self.spacing
+            bound = group_bound if bound is None else max(bound, group_bound)
+
+        return bound
+
+    def _remove_post(self, post_id: int) -> None:
+        """Quitar del índice las horas de un post."""
+        for timestamp in self._by_post.pop(post_id, []):
+            del self._times[bisect_left(self._times, timestamp)]
+
+    def _load(self) -> None:
+        """Cargar el índice con las publicaciones programadas."""
+        now = datetime.now(timezone.utc)
+        # Las publicaciones de la última hora cuentan para el máximo por hora
+        window_start = now - timedelta(seconds=HOUR_SECONDS)
+        horizon = now + timedelta(days=self.horizon_days)
+
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(
+                    Post.post_id,
+                    Post.scheduled_for,
+                    ScheduleSettings.scheduled_time,
+                    ScheduleSettings.frequency,
+                    ScheduleSettings.recurrence_pattern,
+                    ScheduleSettings.end_date,
+                    ScheduleSettings.timezone,
+                    ScheduleSettings.blackout_windows,
+                    ScheduleSettings.is_active
+                )
+                .outerjoin(ScheduleSettings, ScheduleSettings.post_id == Post.post_id)
+                .where(Post.status == "scheduled")
+            ).all()
+        finally:
+            db.close()
+
+        by_post: Dict[int, List[float]] = {}
+        for row in rows:
+            if row.is_active is False:
+                continue
+
+            recurring = row.frequency not in (None, "once") or row.recurrence_pattern or row.blackout_windows
+            if not recurring:
+                if row.scheduled_for and _to_timestamp(row.scheduled_for) >= window_start.timestamp():
+                    by_post[row.post_id] = [_to_timestamp(row.scheduled_for)]
+                continue
+
+            try:
+                recurrence = compile_recurrence(
+                    row.frequency or "once",
+                    row.scheduled_time,
+                    row.recurrence_pattern,
+                    row.end_date,
+                    row.timezone,
+                    row.blackout_windows
+                )
+            except ValueError:
+                continue
+
+            occurrences = []
+            for occurrence in recurrence.iter_after(window_start, MAX_OCCURRENCES_PER_SCHEDULE):
+                if occurrence > horizon:
+                    break
+                occurrences.append(occurrence.timestamp())
+            if occurrences:
+                by_post[row.post_id] = occurrences
+
+        self._by_post = by_post
+        self._replaced = {}
+        self._times = sorted(timestamp for timestamps in by_post.values() for timestamp in timestamps)
+        logger.debug(f"Índice de horarios cargado: {len(self._times)} publicaciones de {len(by_post)} posts")
+
+_planner: Optional[CapacityPlanner] = None
+_planner_lock = threading.Lock()
+
+def get_capacity_planner() -> CapacityPlanner:
+    """
+    Obtener el planificador de horarios compartido por el proceso.
+
+    Returns:
+        Instancia de CapacityPlanner
+    """
+    global _planner
+    if _planner is None:
+        with _planner_lock:
+            if _planner is None:
+                _planner = CapacityPlanner()
+    return _planner
@@ -0,0 +1,329 @@
+# app/services/caption_engine.py
+import re
+import hashlib
+import logging
+import unicodedata
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.db.models import Post
+
+logger = logging.getLogger(__name__)
+
+# Límites de Instagram
+INSTAGRAM_CAPTION_MAX_LENGTH = 2200
+INSTAGRAM_MAX_HASHTAGS = 30
+HASHTAG_MAX_LENGTH = 100
+
+# Cambiar esta versión invalida las leyendas ya guardadas en los posts
+CAPTION_ENGINE_VERSION = "2"
+
+# Campos disponibles en los formatos de leyenda
+CAPTION_FIELDS = frozenset({
+    "job_title", "location", "email", "requirements",
+    "hashtags", "footer_text", "template_name"
+})
+
+DEFAULT_CAPTION_FORMAT = (
+    "📢 BÚSQUEDA LABORAL 📢\n\n"
+    "🔷 Puesto: {job_title}\n"
+    "📍 Ubicación: {location}\n"
+    "{requirements}"
+    "\n📧 CV a: {email}\n\n"
+    "{hashtags}"
+)
+
+# Formato de cada post dentro de un carrusel (sin encabezado ni hashtags)
+CAROUSEL_ITEM_FORMAT = (
+    "🔷 Puesto: {job_title}\n"
+    "📍 Ubicación: {location}\n"
+    "{requirements}"
+    "\n📧 CV a: {email}"
+)
+CAROUSEL_SHORT_ITEM_FORMAT = (
+    "🔷 Puesto: {job_title}\n"
+    "📍 Ubicación: {location}\n"
+    "📧 CV a: {email}"
+)
+CAROUSEL_HEADER = "📢 BÚSQUEDAS LABORALES 📢"
+
+# Hashtags fijos; los del puesto y la ubicación se agregan por post
+BASE_HASHTAGS = ("Empleo", "Trabajo")
+TRAILING_HASHTAGS = ("Oportunidad", "BúsquedaLaboral")
+
+# Letras que NFKD no descompone en letra base y acento
+_TRANSLITERATION = str.maketrans({
+    "ß": "ss", "ẞ": "SS", "æ": "ae", "Æ": "AE", "ø": "o", "Ø": "O",
+    "œ": "oe", "Œ": "OE", "đ": "d", "Đ": "D", "ł": "l", "Ł": "L",
+    "ð": "d", "Ð": "D", "þ": "th", "Þ": "Th", "ı": "i",
+})
+
+# Separa palabras en cualquier signo que no sea letra o número (Unicode)
+_WORD_SPLIT = re.compile(r"[\W_]+")
+
+# Palabra o hashtag al final de un texto, para recortar sin cortarlo
+_TRAILING_WORD = re.compile(r"\S+$")
+
+class CompiledCaptionFormat:
+    """
+    Formato de leyenda analizado una sola vez.
+
+    Guarda el formato como una secuencia de textos literales y campos, de modo
+    que generar una leyenda es una concatenación sin volver a analizar el formato.
+    """
+
+    def __init__(self, source: str, pieces: Tuple[Tuple[str, Optional[str]], ...]):
+        self.source = source
+        self.pieces = pieces
+        self.fields = frozenset(field for _, field in pieces if field)
+
+    def render(self, values: Dict[str, str]) -> str:
+        """
+        Generar la leyenda con los valores indicados.
+
+        Args:
+            values: Valor de cada campo del formato
+
+        Returns:
+            Leyenda generada
+        """
+        parts = []
+        for literal, field in self.pieces:
+            parts.append(literal)
+            if field:
+                parts.append(values.get(field, ""))
+        return "".join(parts)
+
+@lru_cache(maxsize=256)
+def compile_caption_format(source: str) -> CompiledCaptionFormat:
+    """
+    Analizar y validar un formato de leyenda.
+
+    Args:
+        source: Formato con campos entre llaves, por ejemplo "{job_title}"
+
+    Returns:
+        Formato compilado
+
+    Raises:
+        ValueError: Si el formato no es válido o usa campos desconocidos
+    """
+    try:
+        parsed = list(Formatter().parse(source))
+    except ValueError as e:
+        raise ValueError(f"Formato de leyenda no válido: {str(e)}")
+
+    pieces = []
+    for literal, field, format_spec, conversion in parsed:
+        if field is not None:
+            if field not in CAPTION_FIELDS:
+                raise ValueError(f"Campo desconocido en el formato de leyenda: {{{field}}}")
+            if format_spec or conversion:
+                raise ValueError(f"El campo {{{field}}} no admite especificadores de formato")
+        pieces.append((literal, field or None))
+
+    return CompiledCaptionFormat(source, tuple(pieces))
+
+@lru_cache(maxsize=4096)
+def normalize_hashtag(text: str) -> Optional[str]:
+    """
+    Convertir un texto libre en un hashtag válido de Instagram.
+
+    Quita acentos y signos de puntuación y une las palabras en CamelCase,
+    por ejemplo "Médico clínico (CABA)" -> "#MedicoClinicoCABA". Las letras
+    sin acento de otros alfabetos se conservan, ya que Instagram las acepta.
+
+    Args:
+        text: Texto de origen, con o sin '#'
+
+    Returns:
+        Hashtag normalizado o None si el texto no produce un hashtag válido
+    """
+    folded = unicodedata.normalize("NFKD", text.lstrip("#").translate(_TRANSLITERATION))
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+
+    words = [word for word in _WORD_SPLIT.split(folded) if word]
+    tag = "".join(word[0].upper() + word[1:] for word in words)[:HASHTAG_MAX_LENGTH]
+
+    # Instagram no acepta hashtags solo numéricos
+    if not any(char.isalpha() for char in tag):
+        return None
+
+    return f"#{tag}"
+
+def truncate_caption(caption: str, max_length: int = INSTAGRAM_CAPTION_MAX_LENGTH) -> str:
+    """
+    Recortar una leyenda al límite de Instagram sin cortar palabras ni hashtags.
+
+    Args:
+        caption: Leyenda completa
+        max_length: Longitud máxima
+
+    Returns:
+        Leyenda sin las palabras o hashtags finales que no entran
+    """
+    if len(caption) <= max_length:
+        return caption
+
+    # Con el carácter siguiente al límite se sabe si el corte cae dentro de una palabra
+    trimmed = _TRAILING_WORD.sub("", caption[:max_length + 1]).rstrip()
+
+    # Una sola palabra más larga que el límite solo puede cortarse
+    return trimmed or caption[:max_length]
+
+def build_hashtags(candidates: Iterable[str], limit: int = INSTAGRAM_MAX_HASHTAGS) -> List[str]:
+    """
+    Normalizar una lista de hashtags quitando duplicados y respetando el límite.
+
+    Args:
+        candidates: Textos de origen en orden de preferencia
+        limit: Número máximo de hashtags
+
+    Returns:
+        Hashtags normalizados
+    """
+    hashtags = []
+    seen = set()
+    for candidate in candidates:
+        tag = normalize_hashtag(candidate)
+        if tag and tag.lower() not in seen:
+            seen.add(tag.lower())
+            hashtags.append(tag)
+            if len(hashtags) >= limit:
+                break
+    return hashtags
+
+class CaptionEngine:
+    """
+    Generador de leyendas de Instagram.
+
+    Cada plantilla puede definir su propio formato de leyenda; los formatos se
+    compilan una sola vez por proceso. La leyenda generada se guarda en el post
+    junto con un hash de su contenido, por lo que reintentos, historias y
+    recurrencias la reutilizan mientras el post y su plantilla no cambien.
+    """
+
+    def get_caption_format(self, post: Post) -> CompiledCaptionFormat:
+        """Obtener el formato compilado de la plantilla del post."""
+        template = post.template
+        source = template.caption_format if template and template.caption_format else DEFAULT_CAPTION_FORMAT
+        return compile_caption_format(source)
+
+    def content_hash(self, post: Post, caption_format: Optional[CompiledCaptionFormat] = None) -> str:
+        """
+        Calcular el hash del contenido que determina la leyenda de un post.
+
+        Args:
+            post: Objeto Post
+            caption_format: Formato compilado; por defecto el de su plantilla
+
+        Returns:
+            Hash SHA-256 en hexadecimal
+        """
+        caption_format = caption_format or self.get_caption_format(post)
+        template = post.template
+        parts = [
+            CAPTION_ENGINE_VERSION,
+            caption_format.source,
+            post.job_title or "",
+            post.location or "",
+            post.email or "",
+            post.requirements or "",
+            (template.footer_text or "") if template else "",
+            (template.name or "") if template else "",
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get_caption(self, post: Post) -> str:
+        """
+        Obtener la leyenda de un post, reutilizando la guardada si sigue vigente.
+
+        La leyenda nueva se asigna al post; se guarda con el siguiente commit
+        de la sesión.
+
+        Args:
+            post: Objeto Post
+
+        Returns:
+            Leyenda del post
+        """
+        caption_format = self.get_caption_format(post)
+        digest = self.content_hash(post, caption_format)
+
+        if post.caption and post.caption_hash == digest:
+            return post.caption
+
+        caption = self.render(post, caption_format)
+        post.caption = caption
+        post.caption_hash = digest
+        return caption
+
+    def render(self, post: Post, caption_format: Optional[CompiledCaptionFormat] = None) -> str:
+        """
+        Generar la leyenda de un post sin usar la guardada.
+
+        Args:
+            post: Objeto Post
+            caption_format: Formato compilado; por defecto el de su plantilla
+
+        Returns:
+            Leyenda generada, dentro del límite de longitud de Instagram
+        """
+        caption_format = caption_format or self.get_caption_format(post)
+        values = self._field_values(post)
+        values["hashtags"] = " ".join(self.post_hashtags(post))
+        return truncate_caption(caption_format.render(values))
+
+    def post_hashtags(self, post: Post) -> List[str]:
+        """Hashtags de un post: fijos, del puesto y de la ubicación."""
+        return build_hashtags(BASE_HASHTAGS + (post.job_title, post.location) + TRAILING_HASHTAGS)
+
+    def render_carousel(self, posts: List[Post]) -> str:
+        """
+        Generar la leyenda de un carrusel combinando los datos de varios posts.
+
+        Args:
+            posts: Posts incluidos en el carrusel
+
+        Returns:
+            Leyenda combinada, dentro del límite de longitud de Instagram
+        """
+        total = len(posts)
+        values = [self._field_values(post) for post in posts]
+        hashtags_line = " ".join(build_hashtags(
+            tag for post in posts
+            for tag in BASE_HASHTAGS + (post.job_title, post.location) + TRAILING_HASHTAGS
+        ))
+
+        for item_format in (CAROUSEL_ITEM_FORMAT, CAROUSEL_SHORT_ITEM_FORMAT):
+            compiled = compile_caption_format(item_format)
+            sections = [
+                f"{index}/{total}\n{compiled.render(post_values)}"
+                for index, post_values in enumerate(values, start=1)
+            ]
+            caption = f"{CAROUSEL_HEADER}\n\n" + "\n\n".join(sections) + f"\n\n{hashtags_line}"
+
+            # Si no entra, probar con la versión corta: solo puesto, ubicación y email
+            if len(caption) <= INSTAGRAM_CAPTION_MAX_LENGTH:
+                break
+
+        return truncate_caption(caption)
+
+    def _field_values(self, post: Post) -> Dict[str, str]:
+        """Valores de los campos del formato, salvo los hashtags."""
+        template = post.template
+
+        requirements = ""
+        lines = [req.strip() for req in (post.requirements or "").split("\n") if req.strip()]
+        if lines:
+            requirements = "\n📋 Requisitos:\n" + "".join(f"✓ {line}\n" for line in lines)
+
+        return {
+            "job_title": post.job_title or "",
+            "location": post.location or "",
+            "email": post.email or "",
+            "requirements": requirements,
+            "footer_text": (template.footer_text or "") if template else "",
+            "template_name": (template.name or "") if template else "",
+        }
@@ -0,0 +1,289 @@
+# app/services/catchup.py
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+from sqlalchemy import String, cast, exists, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import Post, PostLog, ScheduleSettings
+from app.db.repositories import PostRepository
+from app.services.post_stats import track_status_change
+from app.services.schedule_client import ScheduleClient, get_job_id, get_schedule_client, trigger_for_schedule
+
+logger = logging.getLogger(__name__)
+
+CATCHUP_POLICIES = ("publish_now", "spread", "skip")
+
+class CatchupService:
+    """
+    Recuperación de las publicaciones vencidas mientras el programador no corría.
+
+    APScheduler descarta en silencio los jobs que vencieron hace más de
+    `misfire_grace_time`, y los posts cuyo job se perdió quedan en "scheduled"
+    para siempre. Al ser elegido líder, y antes de reanudar los jobs, este
+    servicio recorre por páginas:
+
+    1. Los jobs del jobstore vencidos hace más del margen de tolerancia.
+    2. Los posts en "scheduled" con la fecha vencida y sin job.
+
+    y les aplica la política configurada:
+
+    - publish_now: publicarlos cuanto antes, como máximo
+      SCHEDULER_CATCHUP_MAX_PER_MINUTE por minuto.
+    - spread: repartirlos en SCHEDULER_CATCHUP_SPREAD_MINUTES, sin superar
+      tampoco ese máximo.
+    - skip: no publicarlos; los posts de una sola vez quedan en "missed" y los
+      recurrentes pasan a su próxima ejecución.
+
+    Los vencidos hace más de SCHEDULER_CATCHUP_MAX_AGE_HOURS se omiten siempre.
+    Cada omisión se registra en PostLog.
+    """
+
+    def __init__(
+        self,
+        client: Optional[ScheduleClient] = None,
+        policy: Optional[str] = None,
+        max_per_minute: Optional[int] = None,
+        spread_minutes: Optional[int] = None,
+        max_age_hours: Optional[int] = None,
+        page_size: Optional[int] = None
+    ):
+        """
+        Inicializar el servicio.
+
+        Args:
+            client: Cliente de programación (por defecto el compartido)
+            policy: Política a aplicar ('publish_now', 'spread', 'skip')
+            max_per_minute: Máximo de publicaciones recuperadas por minuto
+            spread_minutes: Ventana en la que repartir las publicaciones (política spread)
+            max_age_hours: Antigüedad a partir de la cual se omiten siempre
+            page_size: Número de elementos por página
+        """
+        self.client = client or get_schedule_client()
+        self.policy = policy or settings.SCHEDULER_CATCHUP_POLICY
+        self.max_per_minute = max_per_minute or settings.SCHEDULER_CATCHUP_MAX_PER_MINUTE
+        self.spread_minutes = spread_minutes or settings.SCHEDULER_CATCHUP_SPREAD_MINUTES
+        self.max_age_hours = max_age_hours or settings.SCHEDULER_CATCHUP_MAX_AGE_HOURS
+        self.page_size = page_size or settings.SCHEDULER_CATCHUP_PAGE_SIZE
+
+        if self.policy not in CATCHUP_POLICIES:
+            raise ValueError(f"Política de recuperación no válida: {self.policy}")
+
+    def run(self, should_continue: Optional[Callable[[], bool]] = None) -> Dict[str, int]:
+        """
+        Recuperar las publicaciones vencidas.
+
+        Args:
+            should_continue: Se consulta antes de cada página; si devuelve False
+                la recuperación se interrumpe (p. ej. al perder el liderazgo)
+
+        Returns:
+            Diccionario con el número de publicaciones reprogramadas, omitidas y
+            de jobs eliminados
+        """
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=settings.SCHEDULER_MISFIRE_GRACE_SECONDS)
+        stats = {"rescheduled": 0, "skipped": 0, "removed": 0}
+
+        total = self._count_overdue(cutoff)
+        if total == 0:
+            return stats
+
+        # Separación entre publicaciones recuperadas
+        spacing = 60.0 / self.max_per_minute
+        if self.policy == "spread":
+            spacing = max(spacing, self.spread_minutes * 60.0 / total)
+        slots = (now + timedelta(seconds=spacing * index) for index in range(total))
+
+        logger.warning(
+            f"{total} publicaciones vencidas mientras el programador no corría; "
+            f"política '{self.policy}', una cada {spacing:.1f}s"
+        )
+
+        for page in self._overdue_pages(cutoff):
+            if should_continue and not should_continue():
+                logger.warning("Recuperación de publicaciones interrumpida")
+                break
+            self._process_page(page, now, slots, stats)
+
+        logger.info(
+            f"Recuperación finalizada: {stats['rescheduled']} reprogramadas, "
+            f"{stats['skipped']} omitidas, {stats['removed']} jobs sin programación eliminados"
+        )
+        return stats
+
+    def _orphan_filter(self, cutoff: datetime) -> list:
+        """Condiciones de los posts programados y vencidos que no tienen job."""
+        jobs_t = self.client.jobstore.jobs_t
+        return [
+            Post.status == "scheduled",
+            Post.scheduled_for < cutoff.replace(tzinfo=None),
+            ~exists().where(jobs_t.c.id == literal(get_job_id(0)[:-1]) + cast(Post.post_id, String))
+        ]
+
+    def _count_overdue(self, cutoff: datetime) -> int:
+        """Contar los jobs vencidos y los posts programados sin job."""
+        jobs_t = self.client.jobstore.jobs_t
+        db = SessionLocal()
+        try:
+            overdue_jobs = db.execute(
+                select(func.count()).select_from(jobs_t).where(
+                    jobs_t.c.next_run_time < datetime_to_utc_timestamp(cutoff)
+                )
+            ).scalar()
+            orphans = db.execute(
+                select(func.count()).select_from(Post).where(*self._orphan_filter(cutoff))
+            ).scalar()
+            return (overdue_jobs or 0) + (orphans or 0)
+        finally:
+            db.close()
+
+    def _overdue_pages(self, cutoff: datetime):
+        """
+        Recorrer por páginas los elementos vencidos, en orden de clave.
+
+        Yields:
+            Listas de tuplas (ID del post, fecha en que vencía, tiene job)
+        """
+        jobs_t = self.client.jobstore.jobs_t
+        prefix = get_job_id(0)[:-1]
+
+        last_job_id = ""
+        while True:
+            db = SessionLocal()
+            try:
+                rows = db.execute(
+                    select(jobs_t.c.id, jobs_t.c.next_run_time)
+                    .where(
+                        jobs_t.c.next_run_time < datetime_to_utc_timestamp(cutoff),
+                        jobs_t.c.id > last_job_id
+                    )
+                    .order_by(jobs_t.c.id)
+                    .limit(self.page_size)
+                ).all()
+            finally:
+                db.close()
+
+            if not rows:
+                break
+
+            last_job_id = rows[-1].id
+            yield [
+                (int(row.id[len(prefix):]), utc_timestamp_to_datetime(row.next_run_time), True)
+                for row in rows if row.id.startswith(prefix)
+            ]
+
+        last_post_id = 0
+        while True:
+            db = SessionLocal()
+            try:
+                rows = db.execute(
+                    select(Post.post_id, Post.scheduled_for)
+                    .where(*self._orphan_filter(cutoff), Post.post_id > last_post_id)
+                    .order_by(Post.post_id)
+                    .limit(self.page_size)
+                ).all()
+            finally:
+                db.close()
+
+            if not rows:
+                break
+
+            last_post_id = rows[-1].post_id
+            yield [
+                (row.post_id, row.scheduled_for.replace(tzinfo=timezone.utc), False)
+                for row in rows
+            ]
+
+    def _process_page(self, page: List[Tuple[int, datetime, bool]], now: datetime, slots, stats: Dict[str, int]) -> None:
+        """
+        Aplicar la política a una página de elementos vencidos.
+
+        Args:
+            page: Tuplas (ID del post, fecha en que vencía, tiene job)
+            now: Momento de inicio de la recuperación
+            slots: Iterador de horarios disponibles para publicar
+            stats: Contadores a actualizar
+        """
+        if not page:
+            return
+
+        max_age = timedelta(hours=self.max_age_hours)
+        missed_ids: List[int] = []
+        logs: List[PostLog] = []
+
+        db = SessionLocal()
+        try:
+            # Una consulta por página para los posts y sus programaciones
+            posts = {
+                post.post_id: post for post in PostRepository(db).get_many(
+                    [post_id for post_id, _, _ in page], with_schedule=True
+                )
+            }
+
+            for post_id, due_at, has_job in page:
+                post = posts.get(post_id)
+                schedule = post.schedule if post else None
+
+                try:
+                    trigger = trigger_for_schedule(schedule) if schedule and schedule.is_active else None
+                except ValueError:
+                    trigger = None
+
+                if trigger is None:
+                    # Job de un post borrado, cancelado o con programación no válida
+                    if has_job:
+                        self.client.remove_job(post_id, notify=False)
+                        stats["removed"] += 1
+                    if post and post.status == "scheduled":
+                        missed_ids.append(post_id)
+                    continue
+
+                if self.policy != "skip" and now - due_at <= max_age:
+                    self.client.put_job(post_id, trigger, next(slots))
+                    stats["rescheduled"] += 1
+                    continue
+
+                # Omitir: los recurrentes siguen con su próxima ejecución
+                next_run = None
+                if schedule.frequency != "once":
+                    next_run = trigger.get_next_fire_time(None, now)
+
+                if next_run:
+                    self.client.put_job(post_id, trigger, next_run)
+                else:
+                    if has_job:
+                        self.client.remove_job(post_id, notify=False)
+                    missed_ids.append(post_id)
+
+                logs.append(PostLog(
+                    post_id=post_id,
+                    action="catchup",
+                    status="skipped",
+                    error_message=f"Publicación omitida: vencía el {due_at:%Y-%m-%d %H:%M} UTC",
+                    timestamp=now.replace(tzinfo=None)
+                ))
+                stats["skipped"] += 1
+
+            self._save(db, missed_ids, logs)
+
+        finally:
+            db.close()
+
+    def _save(self, db: Session, missed_ids: List[int], logs: List[PostLog]) -> None:
+        """Marcar como perdidos los posts omitidos y registrar las omisiones."""
+        if missed_ids:
+            track_status_change(db, missed_ids, "missed")
+            db.execute(update(Post).where(Post.post_id.in_(missed_ids)).values(status="missed"))
+            db.execute(
+                update(ScheduleSettings)
+                .where(ScheduleSettings.post_id.in_(missed_ids))
+                .values(is_active=False)
+            )
+        if logs:
+            db.add_all(logs)
+        db.commit()
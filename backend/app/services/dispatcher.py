@@ -0,0 +1,378 @@
+# app/services/dispatcher.py
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import Post, ScheduleSettings
+from app.db.repositories import PostRepository
+from app.services.async_publisher import AsyncPublisher
+from app.services.image_generator import ImageGenerator
+from app.services.instagram_publisher import InstagramPublisher
+from app.services.post_stats import track_status_change
+from app.services.schedule_client import has_next_run
+from app.utils.image_utils import find_generated_image
+
+logger = logging.getLogger(__name__)
+
+class BucketDispatcher:
+    """
+    Despachador por franjas de tiempo de las publicaciones programadas.
+
+    En los picos de una campaña cientos de jobs vencen en el mismo minuto. En
+    lugar de que cada job abra su sesión, consulte el post y su programación y
+    cree su propio InstagramPublisher, los jobs solo encolan el post en la
+    franja (bucket) de su hora de ejecución. Un único hilo despierta una vez por
+    franja, pasados unos segundos para reunir los jobs que vencen juntos, y:
+
+    1. Carga todos los posts con su programación y plantilla en una consulta.
+    2. Genera en paralelo las imágenes que falten.
+    3. Publica con concurrencia acotada a través del limitador de tasa,
+       compartiendo una sola sesión de Instagram entre franjas.
+    4. Desactiva las programaciones terminadas y marca los fallos con una
+       sentencia UPDATE cada una.
+
+    Las consultas por franja son constantes; solo el estado de cada post
+    publicado se escribe por post (los PostLog se insertan en lote, ver
+    app/services/audit_log.py).
+
+    Con un AsyncPublisher las subidas del paso 3 corren como corrutinas en su
+    bucle en lugar de en un pool de hilos por franja.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: Optional[int] = None,
+        window_seconds: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        publisher: Optional[InstagramPublisher] = None,
+        async_publisher: Optional[AsyncPublisher] = None
+    ):
+        """
+        Inicializar el despachador.
+
+        Args:
+            bucket_seconds: Duración de cada franja
+            window_seconds: Espera desde el primer post de una franja hasta despacharla
+            max_concurrency: Número máximo de publicaciones simultáneas por franja
+            publisher: Publicador a usar (por defecto uno compartido, creado al primer uso)
+            async_publisher: Publicador asíncrono a usar en lugar del pool de hilos
+        """
+        self.bucket_seconds = bucket_seconds or settings.SCHEDULER_DISPATCH_BUCKET_SECONDS
+        self.window_seconds = (
+            settings.SCHEDULER_DISPATCH_WINDOW_SECONDS if window_seconds is None else window_seconds
+        )
+        self.max_concurrency = max_concurrency or settings.SCHEDULER_DISPATCH_CONCURRENCY
+
+        self._publisher = publisher
+        self.async_publisher = async_publisher
+        self._publisher_lock = threading.Lock()
+
+        # Franjas pendientes: clave -> (momento de despacho, IDs de posts)
+        self._buckets: Dict[int, Tuple[float, List[int]]] = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._in_flight = 0
+
+    @property
+    def publisher(self) -> InstagramPublisher:
+        """Publicador compartido por todas las franjas (un solo inicio de sesión)."""
+        if self._publisher is None:
+            with self._publisher_lock:
+                if self._publisher is None:
+                    self._publisher = InstagramPublisher()
+        return self._publisher
+
+    def start(self) -> None:
+        """Iniciar el hilo que despacha las franjas."""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name="scheduler-dispatcher",
+            daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"Despachador por franjas iniciado ({self.bucket_seconds}s por franja, "
+            f"{self.window_seconds}s de espera, {self.max_concurrency} publicaciones simultáneas)"
+        )
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Detener el despachador, publicando antes las franjas pendientes.
+
+        Args:
+            timeout: Tiempo máximo de espera en segundos (None para esperar sin límite)
+
+        Returns:
+            True si se publicaron todas las franjas dentro del tiempo de espera
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logger.warning(
+                    f"El despachador no terminó de publicar las franjas pendientes "
+                    f"({self._in_flight} en curso, {self.pending()} encolados)"
+                )
+                return False
+
+        return True
+
+    def submit(self, post_id: int, fire_time: Optional[datetime] = None) -> None:
+        """
+        Encolar un post en la franja de su hora de ejecución.
+
+        Args:
+            post_id: ID del post a publicar
+            fire_time: Hora de ejecución del job (por defecto ahora)
+        """
+        fire_time = fire_time or datetime.now(timezone.utc)
+        key = int(fire_time.timestamp()) // self.bucket_seconds
+
+        with self._condition:
+            if key in self._buckets:
+                self._buckets[key][1].append(post_id)
+            else:
+                self._buckets[key] = (time.monotonic() + self.window_seconds, [post_id])
+                self._condition.notify()
+
+    def pending(self) -> int:
+        """Número de posts encolados que aún no se despacharon."""
+        with self._condition:
+            return sum(len(post_ids) for _, post_ids in self._buckets.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtener el estado del despachador.
+
+        Returns:
+            Diccionario con los posts encolados, los que se están publicando y
+            la ocupación respecto a la concurrencia máxima
+        """
+        with self._condition:
+            buckets = len(self._buckets)
+        in_flight = self._in_flight
+
+        return {
+            "pending_buckets": buckets,
+            "pending_posts": self.pending(),
+            "in_flight": in_flight,
+            "max_concurrency": self.max_concurrency,
+            "saturation": round(min(in_flight, self.max_concurrency) / self.max_concurrency, 2)
+        }
+
+    def _run(self) -> None:
+        """Bucle del hilo: esperar a que venza cada franja y despacharla."""
+        while True:
+            with self._condition:
+                while True:
+                    if self._buckets:
+                        key, (deadline, _) = min(self._buckets.items(), key=lambda item: item[1][0])
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or self._stopping:
+                            _, post_ids = self._buckets.pop(key)
+                            break
+                        self._condition.wait(remaining)
+                    elif self._stopping:
+                        return
+                    else:
+                        self._condition.wait()
+
+            self._in_flight = len(post_ids)
+            try:
+                self.dispatch(key, post_ids)
+            except Exception as e:
+                logger.error(f"Error al despachar la franja {self._bucket_label(key)}: {str(e)}")
+            finally:
+                self._in_flight = 0
+
+    def dispatch(self, key: int, post_ids: List[int]) -> None:
+        """
+        Publicar todos los posts de una franja.
+
+        Args:
+            key: Clave de la franja
+            post_ids: IDs de los posts encolados en la franja
+        """
+        started = time.perf_counter()
+        unique_ids = list(dict.fromkeys(post_ids))
+
+        db = SessionLocal()
+        try:
+            # Posts con sus programaciones y plantillas (con la imagen base) en
+            # un número fijo de consultas
+            posts = PostRepository(db).get_many(unique_ids, with_image=True, with_schedule=True)
+            # Los objetos quedan desvinculados con sus datos ya cargados
+            db.expunge_all()
+        finally:
+            db.close()
+
+        found_ids = {post.post_id for post in posts}
+        for post_id in unique_ids:
+            if post_id not in found_ids:
+                logger.error(f"No se encontró el post con ID {post_id}")
+
+        active = []
+        for post in posts:
+            if post.schedule is None or not post.schedule.is_active:
+                logger.info(f"Programación inactiva para post {post.post_id}")
+            else:
+                active.append(post)
+        position = {post_id: index for index, post_id in enumerate(unique_ids)}
+        active.sort(key=lambda post: position[post.post_id])
+
+        failed = self._render_missing(active)
+        to_publish = [post for post in active if post.post_id not in failed]
+
+        finished_ids: List[int] = []
+        published = 0
+        if to_publish:
+            pool = None
+            if self.async_publisher:
+                futures = {self.async_publisher.submit_post(post): post for post in to_publish}
+            else:
+                pool = ThreadPoolExecutor(
+                    max_workers=min(self.max_concurrency, len(to_publish)),
+                    thread_name_prefix="scheduler-publish"
+                )
+                futures = {pool.submit(self._publish_one, post): post for post in to_publish}
+
+            try:
+                for future in as_completed(futures):
+                    post = futures[future]
+                    if not future.result():
+                        failed.add(post.post_id)
+                        continue
+
+                    published += 1
+                    if post.schedule.frequency == "once" or not has_next_run(post.schedule):
+                        finished_ids.append(post.post_id)
+            finally:
+                if pool:
+                    pool.shutdown()
+
+        self._finish(finished_ids, failed)
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Franja {self._bucket_label(key)}: {len(unique_ids)} posts, "
+            f"{published} publicados, "
+            f"{len(failed)} con error en {elapsed:.1f}s"
+        )
+
+    def _render_missing(self, posts: List[Post]) -> Set[int]:
+        """
+        Generar en paralelo las imágenes de los posts que no tienen una.
+
+        Args:
+            posts: Posts de la franja
+
+        Returns:
+            IDs de los posts cuya imagen no se pudo generar
+        """
+        failed: Set[int] = set()
+        to_render = [post for post in posts if find_generated_image(post.post_id) is None]
+        if not to_render:
+            return failed
+
+        generator = ImageGenerator()
+        with ThreadPoolExecutor(
+            max_workers=min(settings.BATCH_RENDER_WORKERS, len(to_render)),
+            thread_name_prefix="scheduler-render"
+        ) as pool:
+            futures = {pool.submit(generator.generate_post_image, post): post.post_id for post in to_render}
+
+            for future in as_completed(futures):
+                post_id = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Error al generar la imagen del post {post_id}: {str(e)}")
+                    failed.add(post_id)
+
+        return failed
+
+    def _publish_one(self, post: Post) -> bool:
+        """
+        Publicar un post de la franja con su propia sesión de base de datos.
+
+        Args:
+            post: Post desvinculado, con su plantilla y programación cargadas
+
+        Returns:
+            True si la publicación fue exitosa
+        """
+        # Sin expirar al confirmar: el post ya está cargado y no hace falta
+        # volver a leerlo tras guardar el resultado
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            # Copia en esta sesión sin volver a consultar la base de datos
+            attached = db.merge(post, load=False)
+            success, _, error = self.publisher.publish_post(attached, db)
+
+            if success:
+                logger.info(f"Post {post.post_id} publicado exitosamente")
+            else:
+                logger.error(f"Error al publicar post {post.post_id}: {error}")
+
+            return success
+
+        except Exception as e:
+            logger.error(f"Error en la publicación programada del post {post.post_id}: {str(e)}")
+            return False
+
+        finally:
+            db.close()
+
+    def _finish(self, finished_ids: List[int], failed_ids: Set[int]) -> None:
+        """
+        Guardar el resultado de la franja con una sentencia por tipo de cambio.
+
+        Args:
+            finished_ids: Posts cuya programación no tiene más publicaciones
+            failed_ids: Posts que no se pudieron publicar
+        """
+        if not finished_ids and not failed_ids:
+            return
+
+        db = SessionLocal()
+        try:
+            if finished_ids:
+                db.execute(
+                    update(ScheduleSettings)
+                    .where(ScheduleSettings.post_id.in_(finished_ids))
+                    .values(is_active=False)
+                )
+            if failed_ids:
+                track_status_change(db, list(failed_ids), "failed")
+                db.execute(
+                    update(Post)
+                    .where(Post.post_id.in_(failed_ids))
+                    .values(status="failed")
+                )
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error al guardar el resultado de la franja: {str(e)}")
+
+        finally:
+            db.close()
+
+    def _bucket_label(self, key: int) -> str:
+        """Hora de inicio de una franja, para los logs."""
+        return datetime.fromtimestamp(key * self.bucket_seconds, timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
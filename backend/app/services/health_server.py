@@ -0,0 +1,80 @@
+# app/services/health_server.py
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class HealthServer:
+    """
+    Servidor HTTP local con las sondas de salud de un servicio en segundo plano.
+
+    - GET /health: estado del proceso (siempre 200 mientras responde).
+    - GET /ready: 200 si el servicio está listo, 503 si no (p. ej. drenando o
+      sin base de datos).
+
+    Ambas rutas devuelven el diccionario de estado como JSON. Usa la librería
+    estándar para no sumar dependencias al servicio del programador.
+    """
+
+    def __init__(self, get_status: Callable[[], Dict[str, Any]], host: str, port: int):
+        """
+        Inicializar el servidor.
+
+        Args:
+            get_status: Devuelve el estado actual; la clave "ready" decide la respuesta de /ready
+            host: Dirección en la que escuchar
+            port: Puerto en el que escuchar
+        """
+        self.get_status = get_status
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Empezar a atender las sondas en un hilo en segundo plano."""
+        get_status = self.get_status
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/health", "/ready"):
+                    self.send_error(404)
+                    return
+
+                try:
+                    status = get_status()
+                    code = 200 if self.path == "/health" or status.get("ready") else 503
+                except Exception as e:
+                    status = {"status": "error", "detail": str(e)}
+                    code = 500
+
+                body = json.dumps(status, default=str).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Las sondas se consultan con frecuencia; no llenar el log
+                logger.debug(format % args)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="health-server",
+            daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Sondas de salud en http://{self.host}:{self.port}/health y /ready")
+
+    def stop(self) -> None:
+        """Dejar de atender las sondas."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -6,7 +6,8 @@ from typing import Optional, Dict, Tuple
 from PIL import Image, ImageDraw, ImageFont
 
 from app.core.config import settings
-from app.db.models import Template, Post
+from app.db.models import Post
+from app.db.repositories import TemplateRepository
 from app.utils.image_utils import (
     get_font, overlay_text, save_image, calculate_text_position, get_image_url
 )
@@ -204,7 +205,7 @@ class ImageGenerator:
         
         db = SessionLocal()
         try:
-            template = db.query(Template).filter(Template.template_id == template_id).first()
+            template = TemplateRepository(db).get(template_id, with_image=True)
             
             if not template:
                 raise ValueError(f"No se encontró la plantilla con ID {template_id}")
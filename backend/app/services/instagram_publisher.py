@@ -1,40 +1,87 @@
 # app/services/instagram_publisher.py
 import os
 import time
+import asyncio
 import logging
-from typing import Dict, Any, Optional, Tuple
+import tempfile
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, wait
+from typing import Dict, Any, List, Optional, Tuple
 import requests
 from datetime import datetime
-from instagrapi import Client
+from PIL import Image
 from instagrapi.exceptions import (
-    LoginRequired, ClientError, ClientLoginRequired,
-    ClientCookieExpiredError, ClientConnectionError
+    LoginRequired, ClientError, ClientLoginRequired, ClientConnectionError,
+    ClientThrottledError, PleaseWaitFewMinutes, RateLimitError
 )
+from tenacity import AsyncRetrying, Retrying, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 from app.core.config import settings
-from app.db.models import Post, PostLog
+from app.db.database import SessionLocal
+from app.db.models import Post
+from app.services.audit_log import get_audit_log
+from app.services.caption_engine import CaptionEngine
+from app.services.publisher_backends import PublisherBackend, create_publisher_backend
+from app.services.rate_limiter import RateLimitExceeded, get_instagram_rate_limiter
+from app.utils.image_utils import (
+    find_generated_image, prepare_feed_image, prepare_story_image, save_image
+)
 
 logger = logging.getLogger(__name__)
 
+# Errores de Instagram que indican límite de tasa (HTTP 429)
+RATE_LIMIT_ERRORS = (PleaseWaitFewMinutes, RateLimitError, ClientThrottledError)
+
+# Límite de imágenes por carrusel en Instagram
+CAROUSEL_MAX_ITEMS = 10
+
+def upload_retry_policy() -> Dict[str, Any]:
+    """
+    Política de reintentos de las subidas ante límites de tasa (HTTP 429).
+    
+    Returns:
+        Argumentos para Retrying / AsyncRetrying de tenacity
+    """
+    return {
+        "retry": retry_if_exception_type(RATE_LIMIT_ERRORS),
+        "stop": stop_after_attempt(settings.INSTAGRAM_UPLOAD_RETRIES + 1),
+        "wait": wait_exponential(
+            multiplier=settings.INSTAGRAM_RETRY_BACKOFF_SECONDS,
+            max=settings.INSTAGRAM_RETRY_BACKOFF_SECONDS * 16
+        ),
+        "before_sleep": lambda state: logger.warning(
+            f"Límite de tasa de Instagram, reintento {state.attempt_number}"
+        ),
+        "reraise": True
+    }
+
 class InstagramPublisher:
-    """Servicio para publicar en Instagram usando instagrapi."""
+    """Servicio para publicar en Instagram a través de un backend intercambiable."""
     
-    def __init__(self):
-        """Inicializar el cliente de Instagram."""
-        self.client = Client()
+    def __init__(self, backend: Optional[PublisherBackend] = None, rate_limit_timeout: Optional[float] = None):
+        """
+        Inicializar el cliente de Instagram.
+        
+        Args:
+            backend: Backend de publicación (por defecto el configurado en INSTAGRAM_BACKEND)
+            rate_limit_timeout: Espera máxima por el limitador de tasa; al agotarse
+                se lanza RateLimitExceeded (None para esperar sin límite, como el
+                programador)
+        """
+        self.backend = backend or create_publisher_backend()
+        self.rate_limit_timeout = rate_limit_timeout
+        self.caption_engine = CaptionEngine()
         self.logged_in = False
+        self.session_checked_at = 0.0
+        
+        # Permite compartir una instancia entre hilos (publicación en lote)
+        self._login_lock = threading.Lock()
         
         # Intentar cargar sesión guardada
-        session_file = "instagram_session.json"
-        if os.path.exists(session_file):
-            try:
-                self.client.load_settings(session_file)
-                self.client.get_timeline_feed()  # Verificar que la sesión es válida
-                self.logged_in = True
-                logger.info("Sesión de Instagram cargada correctamente")
-            except (ClientCookieExpiredError, ClientLoginRequired):
-                logger.info("Sesión de Instagram expirada, iniciando sesión nuevamente")
-                self._login()
+        if self.backend.load_session():
+            self.logged_in = True
+            self.session_checked_at = time.monotonic()
+            logger.info("Sesión de Instagram cargada correctamente")
         else:
             self._login()
     
@@ -46,21 +93,17 @@ class InstagramPublisher:
             True si el inicio de sesión fue exitoso, False en caso contrario
         """
         try:
-            self.logged_in = self.client.login(
-                settings.INSTAGRAM_USERNAME,
-                settings.INSTAGRAM_PASSWORD
-            )
+            self.logged_in = self.backend.login()
             
             if self.logged_in:
-                # Guardar sesión para futuros usos
-                self.client.dump_settings("instagram_session.json")
+                self.session_checked_at = time.monotonic()
                 logger.info("Inicio de sesión en Instagram exitoso")
             else:
                 logger.error("Error al iniciar sesión en Instagram")
                 
             return self.logged_in
             
-        except (ClientLoginRequired, ClientCookieExpiredError) as e:
+        except (ClientLoginRequired, LoginRequired) as e:
             logger.error(f"Error de autenticación en Instagram: {str(e)}")
             return False
         except Exception as e:
@@ -74,17 +117,152 @@ class InstagramPublisher:
         Returns:
             True si el cliente está autenticado, False en caso contrario
         """
-        if not self.logged_in:
-            return self._login()
+        with self._login_lock:
+            if not self.logged_in:
+                return self._login()
             
-        try:
+            # No volver a verificar una sesión comprobada recientemente
+            if time.monotonic() - self.session_checked_at < settings.INSTAGRAM_SESSION_CHECK_SECONDS:
+                return True
+                
             # Verificar si la sesión es válida
-            self.client.get_timeline_feed()
-            return True
-        except (ClientLoginRequired, ClientCookieExpiredError):
+            if self.backend.is_session_valid():
+                self.session_checked_at = time.monotonic()
+                return True
+            
             logger.info("Sesión de Instagram expirada, iniciando sesión nuevamente")
             return self._login()
     
+    def _resolve_image_path(self, post: Post) -> str:
+        """
+        Obtener la imagen generada de un post, generándola si no existe.
+        
+        Args:
+            post: Objeto Post con los datos de la publicación
+            
+        Returns:
+            Ruta de la imagen generada
+        """
+        image_path = find_generated_image(post.post_id)
+        if image_path:
+            return image_path
+        
+        # Generar la imagen si no existe
+        from app.services.image_generator import ImageGenerator
+        generator = ImageGenerator()
+        image_path, _ = generator.generate_post_image(post)
+        return image_path
+    
+    def _prepare_media(self, image_path: str, output_dir: str) -> Tuple[str, str]:
+        """
+        Preparar las versiones de feed e historia a partir de una única lectura.
+        
+        Args:
+            image_path: Ruta de la imagen generada
+            output_dir: Directorio donde guardar los archivos preparados
+            
+        Returns:
+            Tupla (ruta_feed, ruta_historia)
+        """
+        with Image.open(image_path) as source:
+            source.load()
+            feed_image = prepare_feed_image(source)
+            story_image = prepare_story_image(source)
+        
+        feed_path = save_image(feed_image, os.path.join(output_dir, "feed.jpg"), format="JPEG")
+        story_path = save_image(story_image, os.path.join(output_dir, "story.jpg"), format="JPEG")
+        
+        return feed_path, story_path
+    
+    def _call_with_retry(self, func, *args, reserved: bool = False, **kwargs):
+        """
+        Ejecutar una llamada a Instagram bajo el limitador de tasa.
+        
+        Las respuestas de límite de tasa (429) se reintentan con espera
+        exponencial hasta INSTAGRAM_UPLOAD_RETRIES veces. Con reserved=True el
+        llamador ya tiene el lugar de concurrencia y el token del primer
+        intento (ver RateLimiter.reserve); los reintentos solo toman un token.
+        """
+        limiter = get_instagram_rate_limiter()
+        for attempt in Retrying(**upload_retry_policy()):
+            with attempt:
+                if not reserved:
+                    with limiter.limit(self.rate_limit_timeout):
+                        return func(*args, **kwargs)
+                if attempt.retry_state.attempt_number > 1 and not limiter.acquire(self.rate_limit_timeout):
+                    raise RateLimitExceeded(limiter.retry_after())
+                return func(*args, **kwargs)
+    
+    def _upload_feed(self, image_path: str, caption: str, reserved: bool = False):
+        """Subir una imagen al feed respetando el limitador de tasa."""
+        return self._call_with_retry(self.backend.photo_upload, image_path, caption, reserved=reserved)
+    
+    async def _upload_feed_async(self, image_path: str, caption: str):
+        """Versión para corrutinas de _upload_feed, con los mismos reintentos y limitador."""
+        async for attempt in AsyncRetrying(**upload_retry_policy()):
+            with attempt:
+                async with get_instagram_rate_limiter().limit_async():
+                    return await self.backend.photo_upload_async(image_path, caption)
+    
+    def _upload_story(self, image_path: str, reserved: bool = False):
+        """Subir una imagen a historias respetando el limitador de tasa."""
+        return self._call_with_retry(self.backend.photo_upload_to_story, image_path, reserved=reserved)
+    
+    def _finish_feed(self, post: Post, result, db_session) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Registrar el resultado de una subida al feed.
+        
+        Args:
+            post: Objeto Post publicado
+            result: Media devuelta por Instagram (o None si falló)
+            db_session: Sesión de base de datos
+            
+        Returns:
+            Tupla (éxito, id_publicación, mensaje_error)
+        """
+        if not result:
+            error_msg = "Error desconocido al publicar en Instagram"
+            self._log_action(post, "publish", "error", error_msg)
+            return False, None, error_msg
+        
+        instagram_post_id = result.id
+        
+        # Actualizar post en la base de datos
+        post.instagram_post_id = instagram_post_id
+        post.status = "published"
+        post.published_at = datetime.utcnow()
+        db_session.commit()
+        
+        # Registrar acción
+        self._log_action(post, "publish", "success", None)
+        
+        logger.info(f"Publicación exitosa en Instagram: {instagram_post_id}")
+        return True, instagram_post_id, None
+    
+    def _finish_story(self, post: Post, result) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Registrar el resultado de una subida a historias.
+        
+        Args:
+            post: Objeto Post publicado
+            result: Media devuelta por Instagram (o None si falló)
+            
+        Returns:
+            Tupla (éxito, id_historia, mensaje_error)
+        """
+        if not result:
+            error_msg = "Error desconocido al publicar historia en Instagram"
+            self._log_action(post, "publish_story", "error", error_msg)
+            return False, None, error_msg
+        
+        story_id = result.id
+        
+        # Registrar acción
+        self._log_action(post, "publish_story", "success", None)
+        
+        logger.info(f"Historia publicada exitosamente en Instagram: {story_id}")
+        return True, story_id, None
+    
     def publish_post(self, post: Post, db_session) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Publicar una imagen en el feed de Instagram.
@@ -95,64 +273,90 @@ class InstagramPublisher:
             
         Returns:
             Tupla (éxito, id_publicación, mensaje_error)
+            
+        Raises:
+            RateLimitExceeded: Si el limitador no dio lugar dentro de rate_limit_timeout
         """
         if not self._ensure_login():
             error_msg = "No se pudo iniciar sesión en Instagram"
-            self._log_action(post, "publish", "error", error_msg, db_session)
+            self._log_action(post, "publish", "error", error_msg)
             return False, None, error_msg
         
         try:
-            # Verificar si hay una imagen generada
-            if not post.generated_image and not os.path.exists(f"{settings.GENERATED_DIR}/post_{post.post_id}_*.png"):
-                # Generar la imagen si no existe
-                from app.services.image_generator import ImageGenerator
-                generator = ImageGenerator()
-                image_path, _ = generator.generate_post_image(post)
-            else:
-                # Usar la imagen existente
-                import glob
-                image_files = glob.glob(f"{settings.GENERATED_DIR}/post_{post.post_id}_*.png")
-                if image_files:
-                    image_path = image_files[0]
-                else:
-                    error_msg = "No se encontró la imagen generada"
-                    self._log_action(post, "publish", "error", error_msg, db_session)
-                    return False, None, error_msg
+            image_path = self._resolve_image_path(post)
             
             # Preparar la leyenda
             caption = self._generate_caption(post)
             
             # Publicar en Instagram
-            result = self.client.photo_upload(
-                image_path,
-                caption=caption
-            )
+            result = self._upload_feed(image_path, caption)
             
-            if result:
-                instagram_post_id = result.id
-                
-                # Actualizar post en la base de datos
-                post.instagram_post_id = instagram_post_id
-                post.status = "published"
-                post.published_at = datetime.utcnow()
-                db_session.commit()
-                
-                # Registrar acción
-                self._log_action(post, "publish", "success", None, db_session)
-                
-                logger.info(f"Publicación exitosa en Instagram: {instagram_post_id}")
-                return True, instagram_post_id, None
-            else:
-                error_msg = "Error desconocido al publicar en Instagram"
-                self._log_action(post, "publish", "error", error_msg, db_session)
-                return False, None, error_msg
+            return self._finish_feed(post, result, db_session)
+        
+        except RateLimitExceeded:
+            raise
                 
         except Exception as e:
             error_msg = f"Error al publicar en Instagram: {str(e)}"
             logger.error(error_msg)
-            self._log_action(post, "publish", "error", error_msg, db_session)
+            self._log_action(post, "publish", "error", error_msg)
             return False, None, error_msg
     
+    async def publish_post_async(
+        self,
+        post: Post,
+        db_executor: Optional[Executor] = None,
+        render_executor: Optional[Executor] = None
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Publicar una imagen en el feed desde una corrutina.
+        
+        La subida corre en el bucle de asyncio; el acceso a la base de datos y la
+        generación de la imagen, que son bloqueantes, se delegan en executors.
+        
+        Args:
+            post: Post desvinculado de su sesión, con su plantilla ya cargada
+            db_executor: Executor para la base de datos (por defecto el del bucle)
+            render_executor: Executor para Pillow (por defecto el del bucle)
+            
+        Returns:
+            Tupla (éxito, id_publicación, mensaje_error)
+        """
+        loop = asyncio.get_running_loop()
+        
+        # Copia del post en una sesión propia, sin consultar la base de datos:
+        # la sesión solo toma una conexión al guardar el resultado
+        db_session = SessionLocal(expire_on_commit=False)
+        post = db_session.merge(post, load=False)
+        
+        try:
+            if not await loop.run_in_executor(None, self._ensure_login):
+                error_msg = "No se pudo iniciar sesión en Instagram"
+                self._log_action(post, "publish", "error", error_msg)
+                return False, None, error_msg
+            
+            try:
+                image_path = find_generated_image(post.post_id)
+                if not image_path:
+                    image_path = await loop.run_in_executor(render_executor, self._resolve_image_path, post)
+                
+                # Preparar la leyenda
+                caption = self._generate_caption(post)
+                
+                # Publicar en Instagram
+                result = await self._upload_feed_async(image_path, caption)
+                
+                return await loop.run_in_executor(db_executor, self._finish_feed, post, result, db_session)
+                
+            except Exception as e:
+                error_msg = f"Error al publicar en Instagram: {str(e)}"
+                logger.error(error_msg)
+                self._log_action(post, "publish", "error", error_msg)
+                return False, None, error_msg
+        
+        finally:
+            db_session.close()
+    
     def publish_story(self, post: Post, db_session) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Publicar una imagen como historia de Instagram.
@@ -163,99 +367,230 @@ class InstagramPublisher:
             
         Returns:
             Tupla (éxito, id_historia, mensaje_error)
+            
+        Raises:
+            RateLimitExceeded: Si el limitador no dio lugar dentro de rate_limit_timeout
         """
         if not self._ensure_login():
             error_msg = "No se pudo iniciar sesión en Instagram"
-            self._log_action(post, "publish_story", "error", error_msg, db_session)
+            self._log_action(post, "publish_story", "error", error_msg)
             return False, None, error_msg
         
         try:
-            # Usar la misma imagen que para el post
-            import glob
-            image_files = glob.glob(f"{settings.GENERATED_DIR}/post_{post.post_id}_*.png")
-            if image_files:
-                image_path = image_files[0]
-            else:
-                error_msg = "No se encontró la imagen generada"
-                self._log_action(post, "publish_story", "error", error_msg, db_session)
-                return False, None, error_msg
+            image_path = self._resolve_image_path(post)
             
-            # Publicar en Instagram Stories
-            result = self.client.photo_upload_to_story(
-                image_path
-            )
+            # Encuadrar la imagen en formato 9:16 antes de subirla
+            with tempfile.TemporaryDirectory(prefix=f"post_{post.post_id}_") as tmp_dir:
+                _, story_path = self._prepare_media(image_path, tmp_dir)
+                result = self._upload_story(story_path)
             
-            if result:
-                story_id = result.id
-                
-                # Registrar acción
-                self._log_action(post, "publish_story", "success", None, db_session)
-                
-                logger.info(f"Historia publicada exitosamente en Instagram: {story_id}")
-                return True, story_id, None
-            else:
-                error_msg = "Error desconocido al publicar historia en Instagram"
-                self._log_action(post, "publish_story", "error", error_msg, db_session)
-                return False, None, error_msg
+            return self._finish_story(post, result)
+        
+        except RateLimitExceeded:
+            raise
                 
         except Exception as e:
             error_msg = f"Error al publicar historia en Instagram: {str(e)}"
             logger.error(error_msg)
-            self._log_action(post, "publish_story", "error", error_msg, db_session)
+            self._log_action(post, "publish_story", "error", error_msg)
             return False, None, error_msg
     
-    def _generate_caption(self, post: Post) -> str:
+    def publish_post_with_story(self, post: Post, db_session) -> Dict[str, Tuple[bool, Optional[str], Optional[str]]]:
         """
-        Generar la leyenda para una publicación de Instagram.
+        Publicar un post en el feed y en historias preparando la imagen una sola vez.
+        
+        Se verifica la sesión una única vez, se lee la imagen generada una vez y se
+        derivan de ella la versión cuadrada del feed y la versión 9:16 de la historia.
+        Ambas subidas se ejecutan bajo el limitador de tasa compartido, con los
+        dos tokens y los lugares de concurrencia reservados juntos antes de subir
+        nada: en paralelo si el limitador admite dos subidas simultáneas y una
+        detrás de otra si no.
         
         Args:
             post: Objeto Post con los datos de la publicación
+            db_session: Sesión de base de datos para registrar el resultado
             
         Returns:
-            Leyenda formateada
+            Diccionario con las tuplas (éxito, id, mensaje_error) de "post" y "story"
+            
+        Raises:
+            RateLimitExceeded: Si no hubo lugar para ambas subidas dentro de
+                rate_limit_timeout, o si ninguna se publicó porque un reintento
+                no obtuvo lugar a tiempo
         """
-        hashtags = [
-            "#Empleo", 
-            "#Trabajo", 
-            f"#{post.job_title.replace(' ', '')}", 
-            f"#{post.location.replace(' ', '')}", 
-            "#Oportunidad", 
-            "#BúsquedaLaboral"
+        if not self._ensure_login():
+            error_msg = "No se pudo iniciar sesión en Instagram"
+            self._log_action(post, "publish", "error", error_msg)
+            self._log_action(post, "publish_story", "error", error_msg)
+            return {"post": (False, None, error_msg), "story": (False, None, error_msg)}
+        
+        with tempfile.TemporaryDirectory(prefix=f"post_{post.post_id}_") as tmp_dir:
+            try:
+                image_path = self._resolve_image_path(post)
+                feed_path, story_path = self._prepare_media(image_path, tmp_dir)
+                caption = self._generate_caption(post)
+            except Exception as e:
+                error_msg = f"Error al preparar la imagen para Instagram: {str(e)}"
+                logger.error(error_msg)
+                self._log_action(post, "publish", "error", error_msg)
+                self._log_action(post, "publish_story", "error", error_msg)
+                return {"post": (False, None, error_msg), "story": (False, None, error_msg)}
+            
+            # Reservar tokens y lugares de ambas subidas: no se publica el feed
+            # sin la historia por falta de lugar en el limitador
+            limiter = get_instagram_rate_limiter()
+            with limiter.reserve(self.rate_limit_timeout, tokens=2, slots=2) as slots:
+                # La sesión de BD solo se usa en este hilo
+                with ThreadPoolExecutor(max_workers=slots) as executor:
+                    feed_future = executor.submit(self._upload_feed, feed_path, caption, True)
+                    story_future = executor.submit(self._upload_story, story_path, True)
+                    wait([feed_future, story_future])
+        
+        # Un reintento sin lugar a tiempo: si no se publicó nada, se informa
+        # como límite de tasa (429) en lugar de como error
+        rate_limited = [
+            future.exception() for future in (feed_future, story_future)
+            if isinstance(future.exception(), RateLimitExceeded)
         ]
+        if rate_limited and all(future.exception() is not None for future in (feed_future, story_future)):
+            raise rate_limited[0]
+        
+        try:
+            feed_outcome = self._finish_feed(post, feed_future.result(), db_session)
+        except Exception as e:
+            error_msg = f"Error al publicar en Instagram: {str(e)}"
+            logger.error(error_msg)
+            self._log_action(post, "publish", "error", error_msg)
+            feed_outcome = (False, None, error_msg)
+        
+        try:
+            story_outcome = self._finish_story(post, story_future.result())
+        except Exception as e:
+            error_msg = f"Error al publicar historia en Instagram: {str(e)}"
+            logger.error(error_msg)
+            self._log_action(post, "publish_story", "error", error_msg)
+            story_outcome = (False, None, error_msg)
+        
+        return {"post": feed_outcome, "story": story_outcome}
+    
+    def publish_carousel(self, posts: List[Post], db_session) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Publicar varios posts como un único carrusel (álbum) de Instagram.
+        
+        Las imágenes que falten se generan en paralelo y la leyenda combina las de
+        cada post. Todos los posts quedan vinculados al ID del carrusel publicado.
+        
+        Args:
+            posts: Posts a incluir, en el orden de las diapositivas (entre 2 y 10)
+            db_session: Sesión de base de datos para registrar el resultado
+            
+        Returns:
+            Tupla (éxito, id_carrusel, mensaje_error)
+            
+        Raises:
+            RateLimitExceeded: Si el limitador no dio lugar dentro de rate_limit_timeout
+        """
+        if not 2 <= len(posts) <= CAROUSEL_MAX_ITEMS:
+            return False, None, f"Un carrusel debe tener entre 2 y {CAROUSEL_MAX_ITEMS} publicaciones"
+        
+        if not self._ensure_login():
+            error_msg = "No se pudo iniciar sesión en Instagram"
+            for post in posts:
+                self._log_action(post, "publish_carousel", "error", error_msg)
+            return False, None, error_msg
+        
+        try:
+            # Cargar las plantillas en este hilo: la sesión no se comparte entre hilos
+            for post in posts:
+                if find_generated_image(post.post_id) is None:
+                    post.template.template_image
+            
+            with ThreadPoolExecutor(max_workers=settings.BATCH_RENDER_WORKERS) as pool:
+                image_paths = list(pool.map(self._resolve_image_path, posts))
+            
+            caption = self._generate_carousel_caption(posts)
+            
+            with tempfile.TemporaryDirectory(prefix="carousel_") as tmp_dir:
+                slide_paths = []
+                for index, image_path in enumerate(image_paths):
+                    with Image.open(image_path) as source:
+                        slide = prepare_feed_image(source)
+                    slide_paths.append(
+                        save_image(slide, os.path.join(tmp_dir, f"slide_{index:02d}.jpg"), format="JPEG")
+                    )
+                
+                result = self._call_with_retry(self.backend.album_upload, slide_paths, caption)
+            
+            if not result:
+                error_msg = "Error desconocido al publicar el carrusel en Instagram"
+                for post in posts:
+                    self._log_action(post, "publish_carousel", "error", error_msg)
+                return False, None, error_msg
+            
+            media_id = result.id
+            published_at = datetime.utcnow()
+            
+            # Vincular todos los posts al carrusel
+            for post in posts:
+                post.instagram_post_id = media_id
+                post.status = "published"
+                post.published_at = published_at
+            db_session.commit()
+            
+            for post in posts:
+                self._log_action(post, "publish_carousel", "success", None)
+            
+            logger.info(f"Carrusel publicado en Instagram: {media_id} ({len(posts)} posts)")
+            return True, media_id, None
         
-        caption = f"📢 BÚSQUEDA LABORAL 📢\n\n"
-        caption += f"🔷 Puesto: {post.job_title}\n"
-        caption += f"📍 Ubicación: {post.location}\n"
+        except RateLimitExceeded:
+            raise
+            
+        except Exception as e:
+            error_msg = f"Error al publicar carrusel en Instagram: {str(e)}"
+            logger.error(error_msg)
+            for post in posts:
+                self._log_action(post, "publish_carousel", "error", error_msg)
+            return False, None, error_msg
+    
+    def _generate_carousel_caption(self, posts: List[Post]) -> str:
+        """
+        Combinar los datos de varios posts en la leyenda de un carrusel.
         
-        if post.requirements:
-            caption += f"\n📋 Requisitos:\n"
-            for req in post.requirements.split("\n"):
-                if req.strip():
-                    caption += f"✓ {req.strip()}\n"
+        Args:
+            posts: Posts incluidos en el carrusel
+            
+        Returns:
+            Leyenda combinada, dentro del límite de longitud de Instagram
+        """
+        return self.caption_engine.render_carousel(posts)
+    
+    def _generate_caption(self, post: Post) -> str:
+        """
+        Generar la leyenda para una publicación de Instagram.
         
-        caption += f"\n📧 CV a: {post.email}\n\n"
-        caption += " ".join(hashtags)
+        La leyenda queda guardada en el post y se reutiliza mientras su
+        contenido y su plantilla no cambien.
         
-        return caption
+        Args:
+            post: Objeto Post con los datos de la publicación
+            
+        Returns:
+            Leyenda formateada
+        """
+        return self.caption_engine.get_caption(post)
     
-    def _log_action(self, post: Post, action: str, status: str, error_message: Optional[str], db_session) -> None:
+    def _log_action(self, post: Post, action: str, status: str, error_message: Optional[str]) -> None:
         """
-        Registrar una acción en la base de datos.
+        Registrar una acción del post.
+        
+        El registro se inserta en lote y en su propia transacción (ver
+        app/services/audit_log.py), sin confirmar la sesión del post.
         
         Args:
             post: Objeto Post relacionado
             action: Tipo de acción ('publish', 'publish_story', etc.)
             status: Estado ('success', 'error')
             error_message: Mensaje de error (solo si status es 'error')
-            db_session: Sesión de base de datos
         """
-        log = PostLog(
-            post_id=post.post_id,
-            action=action,
-            status=status,
-            error_message=error_message,
-            timestamp=datetime.utcnow()
-        )
-        
-        db_session.add(log)
-        db_session.commit()
\ No newline at end of file
+        get_audit_log().record(post.post_id, action, status, error_message)
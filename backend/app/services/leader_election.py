@@ -0,0 +1,322 @@
+# app/services/leader_election.py
+import os
+import time
+import uuid
+import socket
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import case, func, insert, literal_column, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+def db_utcnow(dialect: str, offset_seconds: float = 0):
+    """
+    Expresión SQL con la hora UTC del servidor de base de datos.
+
+    Los leases se comparan y vencen con un único reloj, el de la base de
+    datos, y no con el de cada proceso.
+
+    Args:
+        dialect: Nombre del dialecto de la conexión
+        offset_seconds: Segundos a sumar a la hora actual
+    """
+    if dialect == "mssql":
+        return func.dateadd(literal_column("millisecond"), int(offset_seconds * 1000), func.sysutcdatetime())
+    if dialect == "sqlite":
+        # Mismo formato de texto con el que SQLAlchemy guarda las fechas en SQLite
+        return func.strftime("%Y-%m-%d %H:%M:%f", "now", f"{offset_seconds:+.3f} seconds")
+    # Se asume un servidor en UTC
+    return func.current_timestamp() + timedelta(seconds=offset_seconds)
+
+def default_holder_id() -> str:
+    """Identificador único del proceso: host, PID y un sufijo aleatorio."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class LeaderElector:
+    """
+    Elección de líder mediante un lease guardado en la base de datos.
+
+    Cada proceso candidato intenta tomar o renovar el lease periódicamente con
+    un UPDATE condicional, que solo tiene éxito si el lease es suyo o ya
+    expiró. El líder lo renueva cada `renew_seconds`; si el proceso muere, otro
+    candidato lo toma en como máximo `ttl_seconds + renew_seconds`. Al detenerse
+    de forma ordenada el lease se libera y el relevo es inmediato.
+
+    La expiración se calcula y se compara con el reloj de la base de datos, de
+    modo que la diferencia entre los relojes de los equipos no adelanta el
+    relevo. Localmente, el líder deja de actuar como tal cuando pasan
+    `ttl_seconds - margin_seconds` (medidos con time.monotonic) desde el inicio
+    de la última renovación correcta, aunque la renovación en curso siga
+    bloqueada: antes de que el lease venza y otro candidato pueda tomarlo.
+    """
+
+    def __init__(
+        self,
+        name: str = "scheduler",
+        holder_id: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        renew_seconds: Optional[float] = None,
+        margin_seconds: Optional[float] = None,
+        on_elected: Optional[Callable[[], None]] = None,
+        on_revoked: Optional[Callable[[], None]] = None,
+        on_tick: Optional[Callable[[], None]] = None
+    ):
+        """
+        Inicializar el candidato.
+
+        Args:
+            name: Nombre del recurso protegido por el lease
+            holder_id: Identificador de este proceso (por defecto host:pid:aleatorio)
+            ttl_seconds: Duración del lease sin renovar
+            renew_seconds: Intervalo entre renovaciones e intentos de toma
+            margin_seconds: Anticipación con la que se deja de ser líder
+                respecto del vencimiento del lease
+            on_elected: Se llama al convertirse en líder
+            on_revoked: Se llama al perder el liderazgo
+            on_tick: Se llama en cada renovación mientras se es líder
+        """
+        self.name = name
+        self.holder_id = holder_id or default_holder_id()
+        self.ttl_seconds = ttl_seconds or settings.SCHEDULER_LEASE_TTL_SECONDS
+        self.renew_seconds = renew_seconds or settings.SCHEDULER_LEASE_RENEW_SECONDS
+
+        self.margin_seconds = (
+            settings.SCHEDULER_LEASE_MARGIN_SECONDS if margin_seconds is None else margin_seconds
+        )
+
+        if self.renew_seconds + self.margin_seconds >= self.ttl_seconds:
+            raise ValueError(
+                "El intervalo de renovación más el margen debe ser menor que la duración del lease"
+            )
+
+        self.on_elected = on_elected
+        self.on_revoked = on_revoked
+        self.on_tick = on_tick
+
+        self._is_leader = False
+        self._leader_lock = threading.Lock()
+        # Inicio (time.monotonic) de la última renovación correcta
+        self._renewed_at = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        """Indica si este proceso tiene el lease."""
+        return self._is_leader
+
+    def start(self) -> None:
+        """Empezar a competir por el lease en un hilo en segundo plano."""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"leader-election-{self.name}",
+            daemon=True
+        )
+        self._thread.start()
+        self._watchdog = threading.Thread(
+            target=self._watch_lease,
+            name=f"leader-watchdog-{self.name}",
+            daemon=True
+        )
+        self._watchdog.start()
+        logger.info(f"Candidato {self.holder_id} compitiendo por el lease '{self.name}'")
+
+    def stop(self, release: bool = True) -> None:
+        """
+        Dejar de competir por el lease.
+
+        Args:
+            release: Liberar el lease para que otro candidato lo tome de inmediato
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.renew_seconds + 5)
+        if self._watchdog:
+            self._watchdog.join(timeout=5)
+
+        if self._is_leader:
+            self._set_leader(False)
+            if release:
+                self.release()
+
+    def try_acquire(self) -> bool:
+        """
+        Tomar o renovar el lease.
+
+        Returns:
+            True si este proceso tiene el lease tras el intento
+        """
+        db = SessionLocal()
+        try:
+            dialect = db.get_bind().dialect.name
+            now = db_utcnow(dialect)
+            expires_at = db_utcnow(dialect, self.ttl_seconds)
+
+            result = db.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    or_(
+                        SchedulerLease.holder_id == self.holder_id,
+                        SchedulerLease.expires_at < now
+                    )
+                )
+                .values(
+                    holder_id=self.holder_id,
+                    acquired_at=case(
+                        (SchedulerLease.holder_id == self.holder_id, SchedulerLease.acquired_at),
+                        else_=now
+                    ),
+                    renewed_at=now,
+                    expires_at=expires_at
+                )
+            )
+
+            if result.rowcount == 0:
+                if db.get(SchedulerLease, self.name) is not None:
+                    # El lease existe y lo tiene otro proceso
+                    db.rollback()
+                    return False
+
+                db.execute(insert(SchedulerLease).values(
+                    name=self.name,
+                    holder_id=self.holder_id,
+                    acquired_at=now,
+                    renewed_at=now,
+                    expires_at=expires_at
+                ))
+
+            db.commit()
+            return True
+
+        except IntegrityError:
+            # Otro candidato creó el lease al mismo tiempo
+            db.rollback()
+            return False
+
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"No se pudo renovar el lease '{self.name}': {str(e)}")
+            return False
+
+        finally:
+            db.close()
+
+    def release(self) -> None:
+        """Liberar el lease si lo tiene este proceso."""
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name, SchedulerLease.holder_id == self.holder_id)
+                .values(expires_at=db_utcnow(db.get_bind().dialect.name))
+            )
+            db.commit()
+            logger.info(f"Lease '{self.name}' liberado por {self.holder_id}")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"No se pudo liberar el lease '{self.name}': {str(e)}")
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        """Bucle de renovación y toma del lease."""
+        while not self._stop_event.is_set():
+            # Ante cualquier fallo de renovación se deja de actuar como líder de
+            # inmediato: es preferible retrasar un job a ejecutarlo dos veces
+            started = time.monotonic()
+            acquired = self.try_acquire()
+
+            # Una renovación que tardó casi todo el TTL deja un lease a punto de vencer
+            if acquired and time.monotonic() - started >= self.ttl_seconds - self.margin_seconds:
+                logger.warning(f"La renovación del lease '{self.name}' tardó demasiado")
+                acquired = False
+
+            if acquired:
+                self._renewed_at = started
+            self._set_leader(acquired)
+
+            if self._is_leader and self.on_tick:
+                try:
+                    self.on_tick()
+                except Exception as e:
+                    logger.error(f"Error en la tarea periódica del líder: {str(e)}")
+
+            self._stop_event.wait(self.renew_seconds)
+
+    def _watch_lease(self) -> None:
+        """Dejar de ser líder si la renovación no termina antes del margen."""
+        interval = min(1.0, self.margin_seconds / 2) or 0.5
+        while not self._stop_event.wait(interval):
+            if not self._is_leader:
+                continue
+            age = time.monotonic() - self._renewed_at
+            if age >= self.ttl_seconds - self.margin_seconds:
+                logger.warning(
+                    f"Sin renovar el lease '{self.name}' hace {age:.1f}s: "
+                    f"se deja de actuar como líder antes de que venza"
+                )
+                self._set_leader(False)
+
+    def _set_leader(self, is_leader: bool) -> None:
+        """Actualizar el estado y avisar de los cambios de liderazgo."""
+        with self._leader_lock:
+            if is_leader == self._is_leader:
+                return
+            self._is_leader = is_leader
+
+        callback = self.on_elected if is_leader else self.on_revoked
+
+        if is_leader:
+            logger.info(f"{self.holder_id} es ahora líder de '{self.name}'")
+        else:
+            logger.warning(f"{self.holder_id} dejó de ser líder de '{self.name}'")
+
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error al procesar el cambio de liderazgo: {str(e)}")
+
+def get_lease_status(db: Session, name: str = "scheduler") -> Optional[Dict[str, Any]]:
+    """
+    Obtener el estado de un lease.
+
+    Args:
+        db: Sesión de base de datos
+        name: Nombre del lease
+
+    Returns:
+        Diccionario con el titular y las fechas del lease, o None si no existe
+    """
+    row = db.execute(
+        select(SchedulerLease, SchedulerLease.expires_at < db_utcnow(db.get_bind().dialect.name))
+        .where(SchedulerLease.name == name)
+    ).first()
+    if not row:
+        return None
+
+    lease, is_expired = row
+
+    return {
+        "name": lease.name,
+        "holder_id": lease.holder_id,
+        "acquired_at": lease.acquired_at,
+        "renewed_at": lease.renewed_at,
+        "expires_at": lease.expires_at,
+        "is_expired": bool(is_expired)
+    }
@@ -0,0 +1,187 @@
+# app/services/login_limiter.py
+import time
+import math
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Claves (usuarios o IPs) recordadas como máximo; se olvidan las más antiguas
+MAX_TRACKED_KEYS = 50000
+
+class SlidingWindowCounter:
+    """Número de eventos por clave en una ventana deslizante de tiempo."""
+
+    def __init__(self, window_seconds: float, max_events: int):
+        """
+        Inicializar el contador.
+
+        Args:
+            window_seconds: Duración de la ventana
+            max_events: Eventos permitidos por clave dentro de la ventana
+        """
+        self.window_seconds = window_seconds
+        self.max_events = max_events
+        self._events: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def retry_after(self, key: str, now: float) -> Optional[float]:
+        """
+        Segundos hasta que la clave vuelva a tener eventos disponibles.
+
+        Returns:
+            None si la clave no alcanzó el máximo
+        """
+        events = self._prune(key, now)
+        if events is None or len(events) < self.max_events:
+            return None
+        return events[0] + self.window_seconds - now
+
+    def add(self, key: str, now: float) -> None:
+        """Registrar un evento de la clave."""
+        events = self._prune(key, now)
+        if events is None:
+            events = self._events[key] = deque()
+        events.append(now)
+        self._events.move_to_end(key)
+
+        while len(self._events) > MAX_TRACKED_KEYS:
+            self._events.popitem(last=False)
+
+    def reset(self, key: str) -> None:
+        """Olvidar los eventos de la clave."""
+        self._events.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def _prune(self, key: str, now: float) -> Optional[Deque[float]]:
+        """Descartar los eventos fuera de la ventana."""
+        events = self._events.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - self.window_seconds:
+            events.popleft()
+        if not events:
+            del self._events[key]
+            return None
+        return events
+
+class LoginAttemptLimiter:
+    """
+    Límite de intentos de inicio de sesión, previo a verificar la contraseña.
+
+    Cuenta todos los intentos de cada IP y los fallidos de cada usuario en una
+    ventana de LOGIN_ATTEMPT_WINDOW_SECONDS. Un intento que supera alguno de
+    los límites se rechaza sin ejecutar bcrypt; un inicio de sesión correcto
+    borra los fallos del usuario. Los contadores son de cada proceso.
+    """
+
+    def __init__(
+        self,
+        window_seconds: Optional[float] = None,
+        max_failures_per_username: Optional[int] = None,
+        max_attempts_per_ip: Optional[int] = None
+    ):
+        """
+        Inicializar el limitador.
+
+        Args:
+            window_seconds: Duración de la ventana
+            max_failures_per_username: Intentos fallidos permitidos por usuario
+            max_attempts_per_ip: Intentos permitidos por IP
+        """
+        window = window_seconds or settings.LOGIN_ATTEMPT_WINDOW_SECONDS
+        self._failures = SlidingWindowCounter(
+            window, max_failures_per_username or settings.LOGIN_MAX_FAILURES_PER_USERNAME
+        )
+        self._attempts = SlidingWindowCounter(
+            window, max_attempts_per_ip or settings.LOGIN_MAX_ATTEMPTS_PER_IP
+        )
+        self._lock = threading.Lock()
+        self._counters = {"allowed": 0, "rejected_username": 0, "rejected_ip": 0}
+
+    def acquire(self, username: str, ip: Optional[str]) -> Optional[int]:
+        """
+        Registrar un intento si está dentro de los límites.
+
+        Args:
+            username: Usuario del intento
+            ip: IP del cliente (None si no se conoce)
+
+        Returns:
+            None si el intento puede continuar, o los segundos a esperar
+            (para la cabecera Retry-After) si se rechaza
+        """
+        now = time.monotonic()
+        username = self._normalize(username)
+
+        with self._lock:
+            wait = self._failures.retry_after(username, now)
+            if wait is not None:
+                self._counters["rejected_username"] += 1
+                logger.warning(f"Intentos de inicio de sesión bloqueados para el usuario {username!r}")
+                return max(1, math.ceil(wait))
+
+            if ip is not None:
+                wait = self._attempts.retry_after(ip, now)
+                if wait is not None:
+                    self._counters["rejected_ip"] += 1
+                    logger.warning(f"Intentos de inicio de sesión bloqueados para la IP {ip}")
+                    return max(1, math.ceil(wait))
+                self._attempts.add(ip, now)
+
+            self._counters["allowed"] += 1
+            return None
+
+    def record_failure(self, username: str) -> None:
+        """Registrar un intento fallido del usuario."""
+        with self._lock:
+            self._failures.add(self._normalize(username), time.monotonic())
+
+    def record_success(self, username: str) -> None:
+        """Borrar los intentos fallidos del usuario tras un inicio de sesión correcto."""
+        with self._lock:
+            self._failures.reset(self._normalize(username))
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Obtener los contadores del limitador.
+
+        Returns:
+            Diccionario con los intentos admitidos, los rechazados y las
+            claves recordadas
+        """
+        with self._lock:
+            return {
+                **self._counters,
+                "tracked_usernames": len(self._failures),
+                "tracked_ips": len(self._attempts)
+            }
+
+    @staticmethod
+    def _normalize(username: str) -> str:
+        """Usar la misma clave para variantes de mayúsculas y espacios."""
+        return username.strip().lower()
+
+_login_limiter: Optional[LoginAttemptLimiter] = None
+_login_limiter_lock = threading.Lock()
+
+def get_login_limiter() -> LoginAttemptLimiter:
+    """
+    Obtener el limitador de inicios de sesión del proceso.
+
+    Returns:
+        Instancia única del limitador para este proceso
+    """
+    global _login_limiter
+
+    if _login_limiter is None:
+        with _login_limiter_lock:
+            if _login_limiter is None:
+                _login_limiter = LoginAttemptLimiter()
+
+    return _login_limiter
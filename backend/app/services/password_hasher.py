@@ -0,0 +1,128 @@
+# app/services/password_hasher.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_password_and_update
+
+class PasswordHasherBusy(Exception):
+    """No hay lugar para otra verificación de contraseña."""
+
+class PasswordHasher:
+    """
+    Verificación y hash de contraseñas en un pool de hilos propio.
+
+    bcrypt consume del orden de 100ms de CPU por operación. Ejecutarlo en el
+    threadpool de Starlette deja sin hilos al resto de endpoints durante una
+    ráfaga de inicios de sesión; aquí corre en PASSWORD_HASH_WORKERS hilos
+    dedicados (bcrypt libera el GIL) y admite como máximo
+    PASSWORD_HASH_MAX_PENDING operaciones entre en curso y en espera. Las
+    siguientes se rechazan al momento con PasswordHasherBusy.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        Inicializar el pool.
+
+        Args:
+            workers: Hilos dedicados a bcrypt
+            max_pending: Operaciones admitidas a la vez (en curso y en espera)
+        """
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_pending = max_pending or settings.PASSWORD_HASH_MAX_PENDING
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counters = {"verified": 0, "hashed": 0, "rehashed": 0, "rejected": 0}
+
+    async def verify(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verificar una contraseña.
+
+        Args:
+            plain_password: Contraseña en texto plano
+            hashed_password: Contraseña hasheada
+
+        Returns:
+            Tupla (contraseña correcta, nuevo hash si el guardado usa
+            parámetros de costo anteriores a los configurados)
+
+        Raises:
+            PasswordHasherBusy: Si se alcanzó PASSWORD_HASH_MAX_PENDING
+        """
+        valid, new_hash = await self._run(verify_password_and_update, plain_password, hashed_password)
+        self._counters["verified"] += 1
+        if new_hash:
+            self._counters["rehashed"] += 1
+        return valid, new_hash
+
+    async def hash(self, password: str) -> str:
+        """
+        Hashear una contraseña.
+
+        Args:
+            password: Contraseña en texto plano
+
+        Returns:
+            Contraseña hasheada
+
+        Raises:
+            PasswordHasherBusy: Si se alcanzó PASSWORD_HASH_MAX_PENDING
+        """
+        hashed = await self._run(get_password_hash, password)
+        self._counters["hashed"] += 1
+        return hashed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtener la ocupación del pool.
+
+        Returns:
+            Diccionario con los hilos, las operaciones en curso y en espera y
+            los contadores
+        """
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            **self._counters
+        }
+
+    async def _run(self, func, *args) -> Any:
+        """Ejecutar una operación en el pool si hay lugar."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._counters["rejected"] += 1
+                raise PasswordHasherBusy()
+            self._pending += 1
+
+        # Se descuenta al terminar el hilo, aunque la petición se cancele antes
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future) -> None:
+        """Liberar el lugar de una operación terminada."""
+        with self._lock:
+            self._pending -= 1
+
+_password_hasher: Optional[PasswordHasher] = None
+_password_hasher_lock = threading.Lock()
+
+def get_password_hasher() -> PasswordHasher:
+    """
+    Obtener el pool de hash de contraseñas del proceso.
+
+    Returns:
+        Instancia única del pool para este proceso
+    """
+    global _password_hasher
+
+    if _password_hasher is None:
+        with _password_hasher_lock:
+            if _password_hasher is None:
+                _password_hasher = PasswordHasher()
+
+    return _password_hasher
@@ -0,0 +1,253 @@
+# app/services/post_stats.py
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Sequence, Tuple
+
+from sqlalchemy import Date, cast, delete, event, func, insert, inspect, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.models import Post, PostLog, PostLogDailyCount, PostStatusCount, SchedulerState
+from app.db.repositories import QUERY_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Estados que siempre aparecen en las estadísticas, aunque no tengan posts
+POST_STATUSES = ("draft", "scheduled", "published", "failed", "missed")
+DEFAULT_POST_STATUS = "draft"
+
+# Acciones de PostLog que cuentan como publicación en el feed
+PUBLISH_ACTIONS = ("publish", "publish_carousel")
+
+# Fila de SchedulerState que indica que los contadores ya se calcularon
+COUNTERS_KEY = "post_stats"
+
+class StatsNotReady(Exception):
+    """Los contadores todavía no se calcularon (ver scripts/rebuild_post_stats.py)."""
+
+def _add_counts(connection: Connection, model, deltas: Dict[Tuple, int]) -> None:
+    """
+    Sumar diferencias a filas de contadores, creándolas si no existen.
+
+    Las filas se actualizan siempre en el mismo orden para que dos
+    transacciones no se bloqueen mutuamente.
+    """
+    key_columns = [column for column in model.__table__.primary_key.columns]
+    for key, delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        where = [column == value for column, value in zip(key_columns, key)]
+        increment = update(model).where(*where).values(count=model.count + delta)
+        if connection.execute(increment).rowcount:
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(
+                    insert(model).values(count=delta, **{column.name: value for column, value in zip(key_columns, key)})
+                )
+        except IntegrityError:
+            # Otra transacción creó la fila al mismo tiempo
+            connection.execute(increment)
+
+def _log_key(entry: Dict[str, Any]) -> Tuple[date, str, str]:
+    """Clave del contador diario de un registro de PostLog."""
+    timestamp = entry.get("timestamp") or datetime.utcnow()
+    return timestamp.date(), entry["action"], entry["status"]
+
+def track_status_change(db: Session, post_ids: Sequence[int], new_status: str) -> None:
+    """
+    Actualizar los contadores por estado antes de un UPDATE masivo de Post.status.
+
+    Los cambios hechos con el ORM (post.status = ...) se cuentan solos al
+    hacer flush; las sentencias update(Post) no pasan por él y deben llamar
+    a esta función antes de ejecutarse, en la misma transacción.
+
+    Args:
+        db: Sesión de la transacción que cambia el estado
+        post_ids: IDs de los posts que se van a actualizar
+        new_status: Estado nuevo
+    """
+    deltas: Counter = Counter()
+    for start in range(0, len(post_ids), QUERY_CHUNK_SIZE):
+        chunk = post_ids[start:start + QUERY_CHUNK_SIZE]
+        rows = db.execute(
+            select(Post.status, func.count())
+            .where(Post.post_id.in_(chunk))
+            .group_by(Post.status)
+        ).all()
+        for status, count in rows:
+            deltas[(status or DEFAULT_POST_STATUS,)] -= count
+            deltas[(new_status,)] += count
+
+    _add_counts(db.connection(), PostStatusCount, deltas)
+
+def record_log_entries(db: Session, entries: Iterable[Dict[str, Any]]) -> None:
+    """
+    Actualizar los contadores diarios con registros de PostLog insertados en lote.
+
+    Los PostLog agregados a la sesión (db.add) se cuentan solos al hacer flush.
+
+    Args:
+        db: Sesión de la transacción que inserta los registros
+        entries: Valores de cada registro (post_id, action, status, timestamp)
+    """
+    deltas = Counter(_log_key(entry) for entry in entries)
+    _add_counts(db.connection(), PostLogDailyCount, deltas)
+
+@event.listens_for(Post.status, "set", active_history=True)
+def _load_previous_status(target, value, oldvalue, initiator) -> None:
+    """Cargar el estado anterior al cambiarlo, para descontarlo al hacer flush."""
+
+@event.listens_for(Session, "after_flush")
+def _count_flushed_changes(session: Session, flush_context) -> None:
+    """Contar los posts y PostLog que el flush creó, modificó o eliminó."""
+    status_deltas: Counter = Counter()
+    log_deltas: Counter = Counter()
+
+    for obj in session.new:
+        if isinstance(obj, Post):
+            status_deltas[(inspect(obj).dict.get("status") or DEFAULT_POST_STATUS,)] += 1
+        elif isinstance(obj, PostLog):
+            state = inspect(obj).dict
+            log_deltas[_log_key(state)] += 1
+
+    for obj in session.dirty:
+        if isinstance(obj, Post):
+            history = inspect(obj).attrs.status.history
+            if history.added and history.deleted and history.added[0] != history.deleted[0]:
+                status_deltas[(history.deleted[0] or DEFAULT_POST_STATUS,)] -= 1
+                status_deltas[(history.added[0] or DEFAULT_POST_STATUS,)] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, Post):
+            history = inspect(obj).attrs.status.history
+            previous = (history.deleted or history.unchanged or [None])[0]
+            status_deltas[(previous or DEFAULT_POST_STATUS,)] -= 1
+
+    if status_deltas or log_deltas:
+        connection = session.connection()
+        _add_counts(connection, PostStatusCount, status_deltas)
+        _add_counts(connection, PostLogDailyCount, log_deltas)
+
+def rebuild_counters(db: Session) -> None:
+    """
+    Recalcular todos los contadores desde posts y post_logs.
+
+    Recorre ambas tablas completas; se ejecuta con scripts/rebuild_post_stats.py
+    al crear los contadores y para corregir desvíos (p. ej. borrados masivos,
+    que no se descuentan). Las tablas de contadores se bloquean antes de leer:
+    los cambios simultáneos esperan y se suman sobre los valores recalculados
+    en lugar de perderse.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "mssql":
+        for table in (PostStatusCount.__table__, PostLogDailyCount.__table__):
+            db.execute(text(f"SELECT COUNT(*) FROM {table.name} WITH (TABLOCKX, HOLDLOCK)"))
+    db.execute(delete(PostStatusCount))
+    db.execute(delete(PostLogDailyCount))
+
+    if dialect == "sqlite":
+        log_day = func.date(PostLog.timestamp)
+    else:
+        log_day = cast(PostLog.timestamp, Date)
+
+    status_rows = db.execute(select(Post.status, func.count()).group_by(Post.status)).all()
+    log_rows = db.execute(
+        select(log_day, PostLog.action, PostLog.status, func.count())
+        .where(PostLog.timestamp.is_not(None))
+        .group_by(log_day, PostLog.action, PostLog.status)
+    ).all()
+
+    status_counts: Counter = Counter()
+    for status, count in status_rows:
+        status_counts[status or DEFAULT_POST_STATUS] += count
+
+    if status_counts:
+        db.execute(insert(PostStatusCount), [
+            {"status": status, "count": count} for status, count in status_counts.items()
+        ])
+    if log_rows:
+        db.execute(insert(PostLogDailyCount), [
+            {
+                "day": day if isinstance(day, date) else date.fromisoformat(str(day)),
+                "action": action,
+                "status": status,
+                "count": count
+            }
+            for day, action, status, count in log_rows
+        ])
+
+    now = datetime.utcnow()
+    marker = update(SchedulerState).where(SchedulerState.name == COUNTERS_KEY).values(
+        version=SchedulerState.version + 1, updated_at=now
+    )
+    if not db.execute(marker).rowcount:
+        try:
+            with db.begin_nested():
+                db.execute(insert(SchedulerState).values(name=COUNTERS_KEY, version=1, updated_at=now))
+        except IntegrityError:
+            # Otro proceso creó la marca al mismo tiempo
+            db.execute(marker)
+    db.commit()
+
+    logger.info(f"Contadores de estadísticas recalculados ({len(status_rows)} estados, {len(log_rows)} días/acciones)")
+
+def get_post_stats(db: Session, days: int = 30) -> Dict[str, Any]:
+    """
+    Obtener las estadísticas del panel desde los contadores.
+
+    Lee solo las filas de contadores (una por estado y una por día, acción y
+    resultado), sin recorrer posts ni post_logs. No los calcula: eso se hace
+    una vez con scripts/rebuild_post_stats.py (ver rebuild_counters).
+
+    Args:
+        db: Sesión de base de datos
+        days: Días a incluir en la serie diaria y en las tasas de fallo
+
+    Returns:
+        Diccionario con los posts por estado, las publicaciones y fallos por
+        día y la tasa de fallo de cada acción
+
+    Raises:
+        StatsNotReady: Si los contadores todavía no se calcularon
+    """
+    if db.get(SchedulerState, COUNTERS_KEY) is None:
+        raise StatsNotReady("Los contadores de estadísticas todavía no se calcularon")
+
+    by_status = {status: 0 for status in POST_STATUSES}
+    for row in db.query(PostStatusCount).all():
+        # Un desvío no debe mostrarse como un número negativo
+        by_status[row.status] = max(row.count, 0)
+
+    today = datetime.utcnow().date()
+    since = today - timedelta(days=days - 1)
+    log_rows = db.query(PostLogDailyCount).filter(PostLogDailyCount.day >= since).all()
+
+    daily = {since + timedelta(days=offset): {"published": 0, "failed": 0} for offset in range(days)}
+    actions: Dict[str, Counter] = {}
+    for row in log_rows:
+        actions.setdefault(row.action, Counter())[row.status] += row.count
+        if row.action in PUBLISH_ACTIONS and row.day in daily:
+            if row.status == "success":
+                daily[row.day]["published"] += row.count
+            elif row.status == "error":
+                daily[row.day]["failed"] += row.count
+
+    failure_rates = {}
+    for action, counts in sorted(actions.items()):
+        attempts = counts["success"] + counts["error"]
+        failure_rates[action] = {
+            "success": counts["success"],
+            "error": counts["error"],
+            "failure_rate": round(counts["error"] / attempts, 4) if attempts else None
+        }
+
+    return {
+        "posts_by_status": by_status,
+        "total_posts": sum(by_status.values()),
+        "days": days,
+        "daily": [{"date": day, **counts} for day, counts in daily.items()],
+        "failure_rates": failure_rates
+    }
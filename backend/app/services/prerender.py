@@ -0,0 +1,186 @@
+# app/services/prerender.py
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from PIL import Image
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import Post, PostLog, ScheduleSettings
+from app.db.repositories import post_load_options
+from app.services.image_generator import ImageGenerator
+from app.services.schedule_client import get_schedule_client
+from app.utils.image_utils import find_generated_image
+
+logger = logging.getLogger(__name__)
+
+# Máximo de IDs por consulta (SQL Server admite hasta 2100 parámetros)
+QUERY_CHUNK_SIZE = 1000
+
+def verify_image(image_path: str) -> bool:
+    """
+    Comprobar que una imagen generada se puede leer.
+
+    Args:
+        image_path: Ruta de la imagen
+
+    Returns:
+        True si el archivo es una imagen válida
+    """
+    try:
+        with Image.open(image_path) as image:
+            image.verify()
+        return True
+    except Exception:
+        return False
+
+class PrerenderService:
+    """
+    Generación anticipada de las imágenes de los posts programados.
+
+    Revisa los jobs que vencen dentro del horizonte configurado, genera en
+    paralelo las imágenes que falten o estén dañadas y marca los posts como
+    listos (image_ready_at). Así la publicación programada solo sube la imagen,
+    y los errores de generación se registran (render_error y PostLog) horas
+    antes de la hora de publicación en lugar de en ese momento.
+    """
+
+    def __init__(self, horizon_minutes: Optional[int] = None, max_workers: Optional[int] = None):
+        """
+        Inicializar el servicio.
+
+        Args:
+            horizon_minutes: Minutos hacia adelante a revisar
+            max_workers: Número de imágenes a generar en paralelo
+        """
+        self.horizon_minutes = horizon_minutes or settings.SCHEDULER_PRERENDER_HORIZON_MINUTES
+        self.max_workers = max_workers or settings.BATCH_RENDER_WORKERS
+
+    def run(self) -> Dict[str, int]:
+        """
+        Revisar los posts que vencen dentro del horizonte y preparar sus imágenes.
+
+        Returns:
+            Diccionario con el número de posts revisados, generados y con error
+        """
+        until = datetime.utcnow() + timedelta(minutes=self.horizon_minutes)
+        post_ids = get_schedule_client().get_due_post_ids(until)
+
+        stats = {"checked": 0, "rendered": 0, "failed": 0}
+        for start in range(0, len(post_ids), QUERY_CHUNK_SIZE):
+            chunk_stats = self._prepare(post_ids[start:start + QUERY_CHUNK_SIZE])
+            for key, value in chunk_stats.items():
+                stats[key] += value
+
+        if stats["rendered"] or stats["failed"]:
+            logger.info(
+                f"Pre-generación de imágenes: {stats['checked']} posts revisados, "
+                f"{stats['rendered']} generados, {stats['failed']} con error"
+            )
+
+        return stats
+
+    def _prepare(self, post_ids: List[int]) -> Dict[str, int]:
+        """
+        Preparar las imágenes de un grupo de posts.
+
+        Args:
+            post_ids: IDs de los posts
+
+        Returns:
+            Diccionario con el número de posts revisados, generados y con error
+        """
+        db = SessionLocal()
+        try:
+            # Una consulta para los posts activos y sus plantillas
+            posts = db.query(Post).join(ScheduleSettings).options(
+                *post_load_options(with_image=True)
+            ).filter(
+                Post.post_id.in_(post_ids),
+                ScheduleSettings.is_active == True
+            ).all()
+
+            ready_ids: List[int] = []
+            to_render: List[Post] = []
+
+            for post in posts:
+                image_path = find_generated_image(post.post_id)
+                if image_path and (post.image_ready_at or verify_image(image_path)):
+                    if not post.image_ready_at:
+                        ready_ids.append(post.post_id)
+                else:
+                    to_render.append(post)
+
+            errors: Dict[int, str] = {}
+            if to_render:
+                generator = ImageGenerator()
+                with ThreadPoolExecutor(
+                    max_workers=min(self.max_workers, len(to_render)),
+                    thread_name_prefix="prerender"
+                ) as pool:
+                    futures = {pool.submit(generator.generate_post_image, post): post for post in to_render}
+
+                    for future in as_completed(futures):
+                        post = futures[future]
+                        try:
+                            image_path, _ = future.result()
+                            if not verify_image(image_path):
+                                raise ValueError(f"La imagen generada no es válida: {image_path}")
+                            ready_ids.append(post.post_id)
+                        except Exception as e:
+                            errors[post.post_id] = str(e)
+
+            self._save(db, posts, ready_ids, errors)
+
+            return {
+                "checked": len(posts),
+                "rendered": len(to_render) - len(errors),
+                "failed": len(errors)
+            }
+
+        finally:
+            db.close()
+
+    def _save(self, db: Session, posts: List[Post], ready_ids: List[int], errors: Dict[int, str]) -> None:
+        """
+        Guardar qué posts quedaron listos y cuáles fallaron.
+
+        Args:
+            db: Sesión de base de datos
+            posts: Posts revisados
+            ready_ids: IDs de los posts con imagen válida
+            errors: Mensaje de error por ID de post
+        """
+        now = datetime.utcnow()
+
+        if ready_ids:
+            db.execute(
+                update(Post)
+                .where(Post.post_id.in_(ready_ids))
+                .values(image_ready_at=now, render_error=None)
+            )
+
+        for post in posts:
+            error = errors.get(post.post_id)
+            if error is None:
+                continue
+
+            # Registrar el error solo la primera vez que falla, no en cada revisión
+            if not post.render_error:
+                logger.error(f"Error al pre-generar la imagen del post {post.post_id}: {error}")
+                db.add(PostLog(
+                    post_id=post.post_id,
+                    action="prerender",
+                    status="error",
+                    error_message=error,
+                    timestamp=now
+                ))
+
+            post.image_ready_at = None
+            post.render_error = error
+
+        db.commit()
@@ -0,0 +1,282 @@
+# app/services/publisher_backends.py
+import os
+import time
+import uuid
+import asyncio
+import random
+import logging
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from instagrapi import Client
+from instagrapi.exceptions import (
+    ClientError, ClientLoginRequired, LoginRequired,
+    ChallengeRequired, PleaseWaitFewMinutes
+)
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class PublisherBackend(ABC):
+    """
+    Interfaz de los clientes que realizan las llamadas a Instagram.
+
+    InstagramPublisher solo depende de estos métodos, por lo que se puede
+    sustituir el cliente real por uno local para pruebas y mediciones.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def login(self) -> bool:
+        """Iniciar sesión. Devuelve True si la sesión quedó activa."""
+
+    @abstractmethod
+    def load_session(self) -> bool:
+        """Restaurar una sesión guardada. Devuelve True si es válida."""
+
+    @abstractmethod
+    def is_session_valid(self) -> bool:
+        """Comprobar que la sesión actual sigue siendo válida."""
+
+    @abstractmethod
+    def photo_upload(self, image_path: str, caption: str) -> Any:
+        """Subir una imagen al feed. Devuelve un objeto con atributo `id`."""
+
+    @abstractmethod
+    def photo_upload_to_story(self, image_path: str) -> Any:
+        """Subir una imagen a historias. Devuelve un objeto con atributo `id`."""
+
+    @abstractmethod
+    def album_upload(self, image_paths: List[str], caption: str) -> Any:
+        """Subir un carrusel de imágenes. Devuelve un objeto con atributo `id`."""
+
+    async def photo_upload_async(self, image_path: str, caption: str) -> Any:
+        """
+        Versión para corrutinas de photo_upload.
+
+        Por defecto ejecuta la llamada bloqueante en el executor del bucle; los
+        backends con un cliente HTTP asíncrono la reemplazan.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.photo_upload, image_path, caption)
+
+class InstagrapiBackend(PublisherBackend):
+    """Cliente real basado en instagrapi."""
+
+    name = "instagrapi"
+
+    def __init__(self, session_file: str = "instagram_session.json"):
+        """
+        Inicializar el cliente de instagrapi.
+
+        Args:
+            session_file: Archivo donde se guarda la sesión entre ejecuciones
+        """
+        self.client = Client()
+        self.session_file = session_file
+
+    def login(self) -> bool:
+        logged_in = self.client.login(
+            settings.INSTAGRAM_USERNAME,
+            settings.INSTAGRAM_PASSWORD
+        )
+
+        if logged_in:
+            # Guardar sesión para futuros usos
+            self.client.dump_settings(self.session_file)
+
+        return logged_in
+
+    def load_session(self) -> bool:
+        if not os.path.exists(self.session_file):
+            return False
+
+        try:
+            self.client.load_settings(self.session_file)
+            self.client.get_timeline_feed()  # Verificar que la sesión es válida
+            return True
+        except (LoginRequired, ClientLoginRequired):
+            return False
+
+    def is_session_valid(self) -> bool:
+        try:
+            self.client.get_timeline_feed()
+            return True
+        except (ClientLoginRequired, LoginRequired):
+            return False
+
+    def photo_upload(self, image_path: str, caption: str) -> Any:
+        return self.client.photo_upload(image_path, caption=caption)
+
+    def photo_upload_to_story(self, image_path: str) -> Any:
+        return self.client.photo_upload_to_story(image_path)
+
+    def album_upload(self, image_paths: List[str], caption: str) -> Any:
+        return self.client.album_upload(image_paths, caption=caption)
+
+@dataclass
+class FakeMedia:
+    """Media mínima devuelta por el backend falso."""
+    id: str
+    image_path: str
+
+class FakeInstagramBackend(PublisherBackend):
+    """
+    Sustituto local de Instagram para pruebas de carga.
+
+    Simula latencia, errores, respuestas 429 y desafíos de inicio de sesión
+    lanzando las mismas excepciones que instagrapi. Las estadísticas se
+    acumulan a nivel de clase para poder compartirlas entre instancias.
+    """
+
+    name = "fake"
+
+    _stats_lock = threading.Lock()
+    _stats: Dict[str, Any] = {}
+
+    def __init__(
+        self,
+        latency_ms: Optional[float] = None,
+        latency_jitter_ms: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        rate_limit_rate: Optional[float] = None,
+        challenge_rate: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        Inicializar el backend falso.
+
+        Args:
+            latency_ms: Latencia media de cada subida en milisegundos
+            latency_jitter_ms: Variación aleatoria de la latencia
+            error_rate: Probabilidad de error genérico en una subida
+            rate_limit_rate: Probabilidad de respuesta 429 en una subida
+            challenge_rate: Probabilidad de desafío al iniciar sesión
+            seed: Semilla para reproducir una ejecución
+        """
+        self.latency_ms = settings.FAKE_INSTAGRAM_LATENCY_MS if latency_ms is None else latency_ms
+        self.latency_jitter_ms = (
+            self.latency_ms * 0.25 if latency_jitter_ms is None else latency_jitter_ms
+        )
+        self.error_rate = settings.FAKE_INSTAGRAM_ERROR_RATE if error_rate is None else error_rate
+        self.rate_limit_rate = (
+            settings.FAKE_INSTAGRAM_RATE_LIMIT_RATE if rate_limit_rate is None else rate_limit_rate
+        )
+        self.challenge_rate = (
+            settings.FAKE_INSTAGRAM_CHALLENGE_RATE if challenge_rate is None else challenge_rate
+        )
+        self.random = random.Random(seed)
+        self.logged_in = False
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        """Reiniciar las estadísticas acumuladas."""
+        with cls._stats_lock:
+            cls._stats = {
+                "logins": 0,
+                "challenges": 0,
+                "attempts": 0,
+                "successes": 0,
+                "errors": 0,
+                "rate_limited": 0,
+                "latencies_ms": [],
+            }
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """Obtener una copia de las estadísticas acumuladas."""
+        with cls._stats_lock:
+            stats = dict(cls._stats)
+            stats["latencies_ms"] = list(cls._stats.get("latencies_ms", []))
+            return stats
+
+    def _count(self, key: str, latency_ms: Optional[float] = None) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+            if latency_ms is not None:
+                self._stats["latencies_ms"].append(latency_ms)
+
+    def _simulate_call(self) -> None:
+        """Esperar la latencia simulada y aplicar los fallos configurados."""
+        started = time.perf_counter()
+        time.sleep(self._draw_latency_ms() / 1000)
+        self._apply_outcome(started)
+
+    async def _simulate_call_async(self) -> None:
+        """Versión para corrutinas de _simulate_call: la espera no ocupa un hilo."""
+        started = time.perf_counter()
+        await asyncio.sleep(self._draw_latency_ms() / 1000)
+        self._apply_outcome(started)
+
+    def _draw_latency_ms(self) -> float:
+        """Latencia simulada de una llamada."""
+        return max(0.0, self.random.gauss(self.latency_ms, self.latency_jitter_ms))
+
+    def _apply_outcome(self, started: float) -> None:
+        """Registrar el intento y lanzar el fallo simulado que corresponda."""
+        self._count("attempts", (time.perf_counter() - started) * 1000)
+
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            self._count("rate_limited")
+            raise PleaseWaitFewMinutes("Please wait a few minutes before you try again.")
+        if roll < self.rate_limit_rate + self.error_rate:
+            self._count("errors")
+            raise ClientError("Error simulado en la subida")
+
+        self._count("successes")
+
+    def login(self) -> bool:
+        self._count("logins")
+        if self.random.random() < self.challenge_rate:
+            self._count("challenges")
+            raise ChallengeRequired("Desafío de inicio de sesión simulado")
+
+        self.logged_in = True
+        return True
+
+    def load_session(self) -> bool:
+        return False
+
+    def is_session_valid(self) -> bool:
+        return self.logged_in
+
+    def photo_upload(self, image_path: str, caption: str) -> Any:
+        self._simulate_call()
+        return FakeMedia(id=f"fake_{uuid.uuid4().hex[:16]}", image_path=image_path)
+
+    async def photo_upload_async(self, image_path: str, caption: str) -> Any:
+        await self._simulate_call_async()
+        return FakeMedia(id=f"fake_{uuid.uuid4().hex[:16]}", image_path=image_path)
+
+    def photo_upload_to_story(self, image_path: str) -> Any:
+        self._simulate_call()
+        return FakeMedia(id=f"fake_story_{uuid.uuid4().hex[:16]}", image_path=image_path)
+
+    def album_upload(self, image_paths: List[str], caption: str) -> Any:
+        self._simulate_call()
+        return FakeMedia(id=f"fake_album_{uuid.uuid4().hex[:16]}", image_path=image_paths[0])
+
+FakeInstagramBackend.reset_stats()
+
+def create_publisher_backend(name: Optional[str] = None) -> PublisherBackend:
+    """
+    Crear el backend de publicación configurado.
+
+    Args:
+        name: Nombre del backend ('instagrapi' o 'fake'); por defecto INSTAGRAM_BACKEND
+
+    Returns:
+        Instancia del backend
+    """
+    name = name or settings.INSTAGRAM_BACKEND
+
+    if name == InstagrapiBackend.name:
+        return InstagrapiBackend()
+    if name == FakeInstagramBackend.name:
+        return FakeInstagramBackend()
+
+    raise ValueError(f"Backend de Instagram no válido: {name}")
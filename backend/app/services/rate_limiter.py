@@ -0,0 +1,279 @@
+# app/services/rate_limiter.py
+import time
+import math
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class RateLimitExceeded(Exception):
+    """No se obtuvo lugar en el limitador dentro del tiempo de espera."""
+
+    def __init__(self, retry_after: float):
+        """
+        Args:
+            retry_after: Segundos estimados hasta que haya lugar
+        """
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"Límite de tasa alcanzado, reintentar en {self.retry_after}s")
+
+class RateLimiter:
+    """
+    Limitador de tasa (token bucket) con límite de concurrencia.
+
+    Controla cuántas llamadas pueden hacerse en un periodo y cuántas pueden
+    estar en curso al mismo tiempo. Es seguro para usar desde varios hilos y
+    desde corrutinas (ver limit_async). El estado es de cada proceso: no se
+    comparte entre workers de uvicorn ni con el servicio del programador.
+    """
+
+    def __init__(self, max_calls: int, period_seconds: float, max_concurrent: int = 1):
+        """
+        Inicializar el limitador.
+
+        Args:
+            max_calls: Número máximo de llamadas por periodo
+            period_seconds: Duración del periodo en segundos
+            max_concurrent: Número máximo de llamadas simultáneas
+        """
+        self.capacity = float(max_calls)
+        self.refill_rate = max_calls / period_seconds
+        self.tokens = float(max_calls)
+        self.updated_at = time.monotonic()
+
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        # Las reservas de varios lugares (ver reserve) se hacen de a una, para
+        # que dos reservas a medias no se bloqueen entre sí
+        self._reserve_lock = threading.Lock()
+        # Semáforo de asyncio por bucle, para que las corrutinas esperen sin
+        # ocupar hilos; se descarta junto con el bucle (ver limit_async)
+        self._async_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _refill(self) -> None:
+        """Recargar tokens según el tiempo transcurrido (requiere el lock)."""
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.updated_at = now
+
+    def acquire(self, timeout: Optional[float] = None, tokens: int = 1) -> bool:
+        """
+        Consumir tokens, esperando si no hay disponibles.
+
+        Args:
+            timeout: Tiempo máximo de espera en segundos (None para esperar sin límite)
+            tokens: Tokens a consumir juntos
+
+        Returns:
+            True si se obtuvieron los tokens, False si se agotó el tiempo de espera
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait_seconds = (tokens - self.tokens) / self.refill_rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_seconds = min(wait_seconds, remaining)
+
+            time.sleep(wait_seconds)
+
+    def release(self, tokens: int = 1) -> None:
+        """Devolver tokens consumidos que finalmente no se usaron."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def retry_after(self, tokens: int = 1) -> float:
+        """Segundos hasta que haya los tokens indicados."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self.tokens) / self.refill_rate)
+
+    async def acquire_async(self) -> None:
+        """Consumir un token desde una corrutina, esperando sin bloquear el bucle."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.refill_rate
+
+            await asyncio.sleep(wait_seconds)
+
+    @contextmanager
+    def limit(self, timeout: Optional[float] = None, take_token: bool = True) -> Iterator[None]:
+        """
+        Context manager que respeta la tasa y la concurrencia máximas.
+
+        El token se obtiene antes que el lugar de concurrencia, para no ocupar
+        una subida simultánea mientras se espera a que se recargue el bucket.
+
+        Args:
+            timeout: Espera máxima en segundos (None para esperar sin límite)
+            take_token: False si el token ya se reservó con acquire(); se
+                devuelve igualmente si no se obtiene lugar
+
+        Raises:
+            RateLimitExceeded: Si no hubo lugar dentro de timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        if take_token and not self.acquire(timeout):
+            raise RateLimitExceeded(self.retry_after())
+
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not self._semaphore.acquire(timeout=remaining):
+            # El token (propio o reservado) no llegó a usarse
+            self.release()
+            raise RateLimitExceeded(1)
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    @contextmanager
+    def reserve(self, timeout: Optional[float] = None, tokens: int = 1, slots: int = 1) -> Iterator[int]:
+        """
+        Reservar juntos los tokens y los lugares de concurrencia de varias llamadas.
+
+        Las llamadas hechas dentro no vuelven a pasar por limit(): o se
+        obtiene todo dentro de timeout o no se reserva nada.
+
+        Args:
+            timeout: Espera máxima en segundos (None para esperar sin límite)
+            tokens: Tokens a consumir
+            slots: Lugares de concurrencia (como máximo max_concurrent)
+
+        Yields:
+            Número de lugares reservados, para dimensionar los hilos que los usan
+
+        Raises:
+            RateLimitExceeded: Si no hubo lugar dentro de timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        if not self.acquire(timeout, tokens):
+            raise RateLimitExceeded(self.retry_after(tokens))
+
+        held = 0
+        try:
+            if not self._reserve_lock.acquire(timeout=-1 if deadline is None else remaining()):
+                raise RateLimitExceeded(1)
+            try:
+                for _ in range(min(slots, self.max_concurrent)):
+                    if not self._semaphore.acquire(timeout=remaining()):
+                        raise RateLimitExceeded(1)
+                    held += 1
+            finally:
+                self._reserve_lock.release()
+        except RateLimitExceeded:
+            for _ in range(held):
+                self._semaphore.release()
+            self.release(tokens)
+            raise
+
+        try:
+            yield held
+        finally:
+            for _ in range(held):
+                self._semaphore.release()
+
+    @asynccontextmanager
+    async def limit_async(self) -> AsyncIterator[None]:
+        """
+        Versión para corrutinas de limit(); comparte la tasa y la concurrencia
+        con los hilos que usan el mismo limitador.
+
+        Como en limit(), el token se obtiene antes que el lugar de concurrencia.
+        Si el lugar está ocupado por un hilo, la espera se hace en el executor
+        del bucle (sin sondear); solo una corrutina por lugar espera así.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Un semáforo que ya hizo esperar guarda una referencia a su bucle,
+            # así que los bucles cerrados se descartan aquí
+            for closed_loop in [item for item in self._async_semaphores.keys() if item.is_closed()]:
+                del self._async_semaphores[closed_loop]
+            loop_semaphore = self._async_semaphores.get(loop)
+            if loop_semaphore is None:
+                loop_semaphore = asyncio.Semaphore(self.max_concurrent)
+                self._async_semaphores[loop] = loop_semaphore
+
+        await self.acquire_async()
+        try:
+            await loop_semaphore.acquire()
+        except BaseException:
+            self.release()
+            raise
+
+        try:
+            if not self._semaphore.acquire(blocking=False):
+                waiter = loop.run_in_executor(None, self._semaphore.acquire)
+                try:
+                    # shield: cancelar la corrutina no detiene el hilo que espera
+                    await asyncio.shield(waiter)
+                except BaseException:
+                    # El lugar se devuelve en cuanto el hilo lo obtenga
+                    waiter.add_done_callback(lambda _: self._semaphore.release())
+                    self.release()
+                    raise
+            try:
+                yield
+            finally:
+                self._semaphore.release()
+        finally:
+            loop_semaphore.release()
+
+_instagram_limiter: Optional[RateLimiter] = None
+_instagram_limiter_lock = threading.Lock()
+
+def get_instagram_rate_limiter() -> RateLimiter:
+    """
+    Obtener el limitador compartido para las subidas a Instagram.
+
+    El límite se aplica por proceso: cada worker de uvicorn y el servicio del
+    programador tienen su propio INSTAGRAM_UPLOADS_PER_HOUR para la misma
+    cuenta, por lo que debe configurarse dividido entre los procesos que
+    publican.
+
+    Returns:
+        Instancia única del limitador para este proceso
+    """
+    global _instagram_limiter
+
+    if _instagram_limiter is None:
+        with _instagram_limiter_lock:
+            if _instagram_limiter is None:
+                _instagram_limiter = RateLimiter(
+                    max_calls=settings.INSTAGRAM_UPLOADS_PER_HOUR,
+                    period_seconds=3600,
+                    max_concurrent=settings.INSTAGRAM_MAX_CONCURRENT_UPLOADS
+                )
+                logger.info(
+                    f"Limitador de Instagram: {settings.INSTAGRAM_UPLOADS_PER_HOUR} subidas/hora, "
+                    f"{settings.INSTAGRAM_MAX_CONCURRENT_UPLOADS} simultáneas"
+                )
+
+    return _instagram_limiter
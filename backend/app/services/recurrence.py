@@ -0,0 +1,497 @@
+# app/services/recurrence.py
+import json
+import logging
+from datetime import datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.cron import CronTrigger
+from dateutil.relativedelta import relativedelta
+from dateutil.rrule import rrule, rrulestr, DAILY, HOURLY, MINUTELY, MONTHLY, WEEKLY, YEARLY
+
+logger = logging.getLogger(__name__)
+
+# Frecuencias admitidas en ScheduleSettings.frequency
+FREQUENCIES = ("once", "daily", "weekly", "monthly", "custom")
+
+# Límite de ventanas de bloqueo encadenadas al posponer una ocurrencia
+MAX_BLACKOUT_DEFERRALS = 100
+
+_CRON_PREFIX = "cron:"
+_RRULE_PREFIX = "RRULE:"
+_CRON_WEEKDAYS = ("sun", "mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Frecuencias de RRULE en las que el periodo tiene longitud fija
+_FIXED_PERIODS = {
+    MINUTELY: timedelta(minutes=1),
+    HOURLY: timedelta(hours=1),
+    DAILY: timedelta(days=1),
+    WEEKLY: timedelta(weeks=1),
+}
+
+def get_zone(name: Optional[str]) -> ZoneInfo:
+    """
+    Obtener una zona horaria IANA.
+
+    Raises:
+        ValueError: Si la zona no existe
+    """
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Zona horaria no válida: {name}")
+
+def _to_utc(value: datetime) -> datetime:
+    """Interpretar una fecha sin zona como UTC (así se guardan en la base)."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    if value.tzinfo is timezone.utc:
+        return value
+    return value.astimezone(timezone.utc)
+
+def _localize(local: datetime, zone: ZoneInfo) -> datetime:
+    """
+    Convertir una hora local sin zona a UTC.
+
+    Con fold=0 las horas inexistentes por el cambio de horario se corren hacia
+    adelante y las ambiguas toman la primera aparición.
+    """
+    return local.replace(tzinfo=zone, fold=0).astimezone(timezone.utc)
+
+def _to_local(value: datetime, zone: ZoneInfo) -> datetime:
+    """Convertir una fecha UTC a hora local sin zona."""
+    return value.astimezone(zone).replace(tzinfo=None)
+
+def _convert_cron_weekdays(field: str) -> str:
+    """
+    Traducir el día de la semana de crontab (0 = domingo) a nombres.
+
+    APScheduler numera los días desde el lunes, por lo que un "1-5" de crontab
+    se interpretaría mal si se pasara tal cual.
+    """
+    def convert(token: str) -> str:
+        return _CRON_WEEKDAYS[int(token)] if token.isdigit() and int(token) <= 7 else token
+
+    items = []
+    for item in field.split(","):
+        base, slash, step = item.partition("/")
+        base = "-".join(convert(part) for part in base.split("-"))
+        items.append(f"{base}{slash}{step}")
+    return ",".join(items)
+
+@lru_cache(maxsize=1024)
+def _compile_cron(expr: str, timezone_name: str) -> CronTrigger:
+    """
+    Compilar una expresión cron de cinco campos en hora local.
+
+    El trigger no depende de la fecha de inicio, por lo que se comparte entre
+    todas las programaciones con la misma expresión y zona horaria.
+    """
+    fields = expr.split()
+    if len(fields) != 5:
+        raise ValueError(f"Expresión cron no válida: {expr}")
+
+    try:
+        return CronTrigger(
+            minute=fields[0],
+            hour=fields[1],
+            day=fields[2],
+            month=fields[3],
+            day_of_week=_convert_cron_weekdays(fields[4]),
+            timezone=get_zone(timezone_name)
+        )
+    except ValueError as e:
+        raise ValueError(f"Expresión cron no válida: {str(e)}")
+
+class BlackoutWindow:
+    """
+    Intervalo en el que no se publica.
+
+    Puede ser absoluto ({"start": "2026-12-24T00:00", "end": "2026-12-26T00:00"})
+    o diario ({"start": "22:00", "end": "07:00", "weekdays": [5, 6]}), siempre
+    en hora local. Las ocurrencias que caen dentro se publican al terminar la ventana. En las ventanas diarias que cruzan la medianoche los días
+    de la semana (0 = lunes) se refieren al día en que empieza la ventana.
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        try:
+            start, end = spec["start"], spec["end"]
+        except (KeyError, TypeError):
+            raise ValueError(f"Ventana de bloqueo sin inicio o fin: {spec}")
+
+        self.daily = len(start) <= 5 and len(end) <= 5
+        try:
+            if self.daily:
+                self.start_time = time.fromisoformat(start)
+                self.end_time = time.fromisoformat(end)
+                self.weekdays = frozenset(spec.get("weekdays") or range(7))
+            else:
+                self.start = datetime.fromisoformat(start)
+                self.end = datetime.fromisoformat(end)
+        except ValueError:
+            raise ValueError(f"Ventana de bloqueo no válida: {spec}")
+
+        if not self.daily and self.end <= self.start:
+            raise ValueError(f"La ventana de bloqueo termina antes de empezar: {spec}")
+
+    def end_if_inside(self, local: datetime) -> Optional[datetime]:
+        """
+        Indicar si una hora local cae dentro de la ventana.
+
+        Returns:
+            Fin de la ventana (hora local) o None si la hora está fuera
+        """
+        if not self.daily:
+            return self.end if self.start <= local < self.end else None
+
+        current = local.time()
+        if self.start_time <= self.end_time:
+            if self.start_time <= current < self.end_time and local.weekday() in self.weekdays:
+                return datetime.combine(local.date(), self.end_time)
+            return None
+
+        # La ventana cruza la medianoche
+        if current >= self.start_time and local.weekday() in self.weekdays:
+            return datetime.combine(local.date() + timedelta(days=1), self.end_time)
+        if current < self.end_time and (local - timedelta(days=1)).weekday() in self.weekdays:
+            return datetime.combine(local.date(), self.end_time)
+        return None
+
+def parse_blackout_windows(value: Optional[str]) -> Tuple[BlackoutWindow, ...]:
+    """
+    Leer las ventanas de bloqueo guardadas como JSON.
+
+    Raises:
+        ValueError: Si el JSON o alguna ventana no es válida
+    """
+    if not value:
+        return ()
+
+    try:
+        specs = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Ventanas de bloqueo no válidas: {str(e)}")
+
+    if not isinstance(specs, list):
+        raise ValueError("Las ventanas de bloqueo deben ser una lista")
+
+    return tuple(BlackoutWindow(spec) for spec in specs)
+
+class Recurrence:
+    """
+    Regla de recurrencia compilada de una programación.
+
+    Las ocurrencias se calculan en hora local de la zona indicada (una
+    publicación a las 9:00 sigue a las 9:00 después del cambio de horario) y
+    se devuelven en UTC. Cada ocurrencia se obtiene directamente a partir de
+    la anterior, sin generar la lista completa: las frecuencias simples se
+    resuelven con aritmética de fechas, las RRULE se reanclan al periodo
+    actual antes de iterar y las expresiones cron usan el cálculo por campos
+    de APScheduler.
+    """
+
+    def __init__(
+        self,
+        frequency: str,
+        start: datetime,
+        pattern: Optional[str] = None,
+        end_date: Optional[datetime] = None,
+        timezone_name: Optional[str] = None,
+        blackout_windows: Optional[str] = None
+    ):
+        """
+        Compilar una regla de recurrencia.
+
+        Args:
+            frequency: 'once', 'daily', 'weekly', 'monthly' o 'custom'
+            start: Primera publicación (UTC si no tiene zona)
+            pattern: RRULE ("RRULE:FREQ=WEEKLY;BYDAY=MO,WE") o cron ("cron:0 9 * * 1-5"),
+                en hora local; si se indica, reemplaza a la frecuencia
+            end_date: Última fecha posible de publicación (UTC si no tiene zona)
+            timezone_name: Zona horaria IANA de las horas locales
+            blackout_windows: Ventanas de bloqueo en JSON (ver BlackoutWindow)
+
+        Raises:
+            ValueError: Si algún parámetro no es válido
+        """
+        self.zone = get_zone(timezone_name)
+        self.start = _to_utc(start)
+        self.start_local = _to_local(self.start, self.zone)
+        self.end_date = _to_utc(end_date) if end_date else None
+        self.blackouts = parse_blackout_windows(blackout_windows)
+
+        self._rule = None
+        self._rule_period: Optional[timedelta] = None
+        self._rule_months: Optional[int] = None
+
+        # Último intervalo calculado: no hay ocurrencias entre ambos extremos
+        self._memo: Tuple[Optional[datetime], Optional[datetime]] = (None, None)
+        self._cron: Optional[CronTrigger] = None
+
+        pattern = (pattern or "").strip()
+        if pattern:
+            self.kind = self._compile_pattern(pattern)
+        elif frequency in ("once", "daily", "weekly", "monthly"):
+            self.kind = frequency
+        else:
+            raise ValueError(f"Frecuencia no válida: {frequency}")
+
+    def _compile_pattern(self, pattern: str) -> str:
+        """Compilar una RRULE o una expresión cron."""
+        if pattern.lower().startswith(_CRON_PREFIX) or len(pattern.split()) == 5:
+            expr = pattern[len(_CRON_PREFIX):] if pattern.lower().startswith(_CRON_PREFIX) else pattern
+            self._cron = _compile_cron(" ".join(expr.split()), self.zone.key)
+            return "cron"
+
+        rule_text = pattern if pattern.upper().startswith(_RRULE_PREFIX) else f"{_RRULE_PREFIX}{pattern}"
+        try:
+            self._rule = rrulestr(rule_text, dtstart=self.start_local)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"RRULE no válida: {str(e)}")
+
+        if not isinstance(self._rule, rrule):
+            raise ValueError("Solo se admite una única RRULE, sin EXDATE ni RDATE")
+
+        # Sin COUNT la regla se puede reanclar a cualquier múltiplo del periodo
+        # sin cambiar las ocurrencias posteriores. En las reglas mensuales y
+        # anuales solo si fijan el día: si no, dateutil toma el día de dtstart
+        params = dict(
+            part.split("=", 1) for part in rule_text[len(_RRULE_PREFIX):].upper().split(";") if "=" in part
+        )
+        interval = int(params.get("INTERVAL", 1))
+        fixes_day = any(key in params for key in ("BYMONTHDAY", "BYDAY", "BYYEARDAY", "BYWEEKNO"))
+        if "COUNT" not in params:
+            if self._rule._freq in _FIXED_PERIODS:
+                self._rule_period = _FIXED_PERIODS[self._rule._freq] * interval
+            elif self._rule._freq == MONTHLY and fixes_day:
+                self._rule_months = interval
+            elif self._rule._freq == YEARLY and fixes_day:
+                self._rule_months = 12 * interval
+
+        return "rrule"
+
+    def next_after(self, after: datetime) -> Optional[datetime]:
+        """
+        Obtener la primera ocurrencia posterior a una fecha.
+
+        Args:
+            after: Fecha de referencia (UTC si no tiene zona)
+
+        Returns:
+            Próxima ocurrencia en UTC o None si la recurrencia terminó
+        """
+        after = _to_utc(after)
+
+        # Las consultas repetidas (cada revisión del programador) se resuelven
+        # sin recalcular mientras no se alcance la ocurrencia ya calculada
+        memo_after, memo_next = self._memo
+        if memo_after is not None and memo_after <= after < memo_next:
+            return memo_next
+
+        next_run = self._next_with_blackouts(after)
+        if next_run is not None:
+            self._memo = (after, next_run)
+        return next_run
+
+    def _next_with_blackouts(self, after: datetime) -> Optional[datetime]:
+        """Próxima ocurrencia aplicando fin de la recurrencia y ventanas de bloqueo."""
+        candidate = self._next_candidate(after)
+
+        # Una ocurrencia dentro de una ventana de bloqueo se pospone al final
+        # de la ventana; las ocurrencias que caen en la misma ventana se agrupan
+        for _ in range(MAX_BLACKOUT_DEFERRALS):
+            if candidate is None or (self.end_date and candidate > self.end_date):
+                return None
+
+            blackout_end = self._blackout_end(candidate)
+            if blackout_end is None:
+                return candidate
+
+            candidate = blackout_end
+
+        logger.warning("Se alcanzó el límite de ventanas de bloqueo encadenadas")
+        return None
+
+    def iter_after(self, after: datetime, limit: int) -> Iterator[datetime]:
+        """
+        Generar las próximas ocurrencias de forma incremental.
+
+        Args:
+            after: Fecha de referencia
+            limit: Número máximo de ocurrencias
+
+        Yields:
+            Ocurrencias en UTC
+        """
+        for _ in range(limit):
+            occurrence = self.next_after(after)
+            if occurrence is None:
+                return
+            yield occurrence
+            after = occurrence
+
+    def _next_candidate(self, after: datetime) -> Optional[datetime]:
+        """Próxima ocurrencia posterior a `after`, sin aplicar bloqueos ni fin."""
+        if after < self.start:
+            after = self.start - timedelta(microseconds=1)
+
+        if self.kind == "once":
+            return self.start if self.start > after else None
+
+        if self.kind == "cron":
+            # CronTrigger devuelve la primera ocurrencia >= now, en la zona de la regla
+            fire_time = self._cron.get_next_fire_time(None, after + timedelta(microseconds=1))
+            return _to_utc(fire_time) if fire_time is not None else None
+
+        after_local = _to_local(after, self.zone)
+
+        if self.kind == "rrule":
+            rule = self._rule
+            if after_local > self.start_local:
+                # Reanclar un periodo antes de `after` para no iterar desde el inicio
+                if self._rule_period is not None:
+                    periods = (after_local - self.start_local) // self._rule_period
+                    if periods > 1:
+                        rule = rule.replace(dtstart=self.start_local + (periods - 1) * self._rule_period)
+                elif self._rule_months is not None:
+                    months = (after_local.year - self.start_local.year) * 12 + after_local.month - self.start_local.month
+                    periods = months // self._rule_months
+                    if periods > 1:
+                        rule = rule.replace(
+                            dtstart=self.start_local + relativedelta(months=(periods - 1) * self._rule_months)
+                        )
+            return self._first_after_utc(
+                lambda local: rule.after(local), after_local, after
+            )
+
+        if self.kind == "monthly":
+            return self._first_after_utc(self._next_monthly_local, after_local, after)
+
+        period = timedelta(days=1) if self.kind == "daily" else timedelta(weeks=1)
+        steps = max(0, (after_local - self.start_local) // period)
+        return self._first_after_utc(
+            lambda local: next(
+                (c for c in (self.start_local + (steps + offset) * period for offset in range(3)) if c > local),
+                None
+            ),
+            after_local, after
+        )
+
+    def _next_monthly_local(self, local: datetime) -> datetime:
+        """Próxima ocurrencia mensual (hora local) posterior a `local`."""
+        months = max(0, (local.year - self.start_local.year) * 12 + local.month - self.start_local.month)
+        # Siempre desde la fecha inicial: un día 31 vuelve a ser 31 después de febrero
+        candidate = self.start_local + relativedelta(months=months)
+        if candidate <= local:
+            candidate = self.start_local + relativedelta(months=months + 1)
+        return candidate
+
+    def _first_after_utc(self, next_local, after_local: datetime, after: datetime) -> Optional[datetime]:
+        """
+        Convertir la próxima ocurrencia local a UTC, garantizando que sea posterior
+        a `after` también en UTC (la hora local se repite al atrasar el reloj).
+        """
+        local = after_local
+        for _ in range(3):
+            candidate_local = next_local(local)
+            if candidate_local is None:
+                return None
+            candidate = _localize(candidate_local, self.zone)
+            if candidate > after:
+                return candidate
+            local = candidate_local
+        return None
+
+    def _blackout_end(self, candidate: datetime) -> Optional[datetime]:
+        """Fin (UTC) de la ventana de bloqueo que contiene una ocurrencia, si la hay."""
+        if not self.blackouts:
+            return None
+
+        local = _to_local(candidate, self.zone)
+        ends = [end for end in (window.end_if_inside(local) for window in self.blackouts) if end]
+        return _localize(max(ends), self.zone) if ends else None
+
+@lru_cache(maxsize=16384)
+def compile_recurrence(
+    frequency: str,
+    start: datetime,
+    pattern: Optional[str] = None,
+    end_date: Optional[datetime] = None,
+    timezone_name: Optional[str] = None,
+    blackout_windows: Optional[str] = None
+) -> Recurrence:
+    """
+    Compilar una regla de recurrencia, reutilizando las ya compiladas en el proceso.
+
+    Ver Recurrence para la descripción de los parámetros.
+    """
+    return Recurrence(frequency, start, pattern, end_date, timezone_name, blackout_windows)
+
+class RecurrenceTrigger(BaseTrigger):
+    """
+    Trigger de APScheduler basado en Recurrence.
+
+    Se guarda en el jobstore solo con los parámetros de la regla; la regla
+    compilada se reconstruye (y se comparte) al cargar el job.
+    """
+
+    __slots__ = ("params", "_recurrence")
+
+    def __init__(
+        self,
+        frequency: str,
+        start: datetime,
+        pattern: Optional[str] = None,
+        end_date: Optional[datetime] = None,
+        timezone_name: Optional[str] = None,
+        blackout_windows: Optional[str] = None
+    ):
+        self.params = (frequency, start, pattern, end_date, timezone_name, blackout_windows)
+        self._recurrence = compile_recurrence(*self.params)
+
+    @property
+    def recurrence(self) -> Recurrence:
+        """Regla compilada."""
+        return self._recurrence
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        if previous_fire_time is not None:
+            return self._recurrence.next_after(previous_fire_time)
+
+        # Primera ejecución: la primera ocurrencia que no haya pasado
+        return self._recurrence.next_after(now - timedelta(microseconds=1))
+
+    def __getstate__(self):
+        return {"version": 1, "params": self.params}
+
+    def __setstate__(self, state):
+        if state.get("version", 1) > 1:
+            raise ValueError(
+                f"Got serialized data for version {state['version']} of "
+                f"{self.__class__.__name__}, but only version 1 can be handled"
+            )
+        self.params = tuple(state["params"])
+        self._recurrence = compile_recurrence(*self.params)
+
+    def __str__(self):
+        frequency, start, pattern, end_date, timezone_name, _ = self.params
+        return f"recurrence[{pattern or frequency}, tz={timezone_name or 'UTC'}]"
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} ({self})>"
+
+def describe_next_runs(recurrence: Recurrence, after: datetime, limit: int = 5) -> List[datetime]:
+    """
+    Listar las próximas ejecuciones de una regla (vista previa para la API).
+
+    Args:
+        recurrence: Regla compilada
+        after: Fecha de referencia
+        limit: Número máximo de ejecuciones
+
+    Returns:
+        Fechas UTC sin zona, como se guardan en la base
+    """
+    return [occurrence.replace(tzinfo=None) for occurrence in recurrence.iter_after(after, limit)]
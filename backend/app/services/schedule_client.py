@@ -0,0 +1,619 @@
+# app/services/schedule_client.py
+import json
+import logging
+import pickle
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from apscheduler.job import Job
+from apscheduler.jobstores.base import ConflictingIdError, JobLookupError
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.util import datetime_to_utc_timestamp
+
+from app.core.config import settings
+from app.db.database import SessionLocal, engine
+from app.db.models import Post, ScheduleSettings, SchedulerState
+from app.db.repositories import PostRepository
+from app.services.post_stats import track_status_change
+from app.services.recurrence import FREQUENCIES, RecurrenceTrigger
+
+logger = logging.getLogger(__name__)
+
+# Referencia textual al punto de entrada de los jobs (ver app/services/scheduler.py)
+PUBLISH_JOB_FUNC = "app.services.scheduler:publish_scheduled_post"
+
+# Contador que se incrementa con cada cambio en el jobstore
+JOBS_VERSION_KEY = "jobs"
+
+# Máximo de IDs por consulta (SQL Server admite hasta 2100 parámetros)
+QUERY_CHUNK_SIZE = 1000
+
+# Error de una programación sin publicaciones futuras
+NO_NEXT_RUN_MESSAGE = "La programación no tiene publicaciones futuras"
+
+# Valores por defecto de APScheduler para los jobs
+JOB_DEFAULTS = {
+    "executor": "default",
+    "misfire_grace_time": settings.SCHEDULER_MISFIRE_GRACE_SECONDS,
+    "coalesce": True,
+    "max_instances": 1,
+}
+
+def get_job_id(post_id: int) -> str:
+    """ID del job de publicación de un post."""
+    return f"post_{post_id}"
+
+def serialize_blackout_windows(blackout_windows: Union[str, List[Dict[str, Any]], None]) -> Optional[str]:
+    """Guardar las ventanas de bloqueo como JSON (se aceptan ya serializadas)."""
+    if not blackout_windows:
+        return None
+    if isinstance(blackout_windows, str):
+        return blackout_windows
+    return json.dumps(blackout_windows, sort_keys=True)
+
+def build_trigger(
+    frequency: str,
+    scheduled_time: datetime,
+    recurrence_pattern: Optional[str] = None,
+    end_date: Optional[datetime] = None,
+    timezone_name: Optional[str] = None,
+    blackout_windows: Union[str, List[Dict[str, Any]], None] = None
+) -> BaseTrigger:
+    """
+    Crear el trigger de APScheduler para una programación.
+
+    Args:
+        frequency: Frecuencia ('once', 'daily', 'weekly', 'monthly', 'custom')
+        scheduled_time: Fecha y hora de la primera publicación (UTC)
+        recurrence_pattern: RRULE o expresión cron en hora local (ver Recurrence)
+        end_date: Última fecha posible de publicación (UTC)
+        timezone_name: Zona horaria IANA de las horas locales
+        blackout_windows: Ventanas sin publicación (lista o JSON)
+
+    Returns:
+        Trigger de APScheduler
+
+    Raises:
+        ValueError: Si la programación no es válida
+    """
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Frecuencia no válida: {frequency}")
+
+    if frequency == "once" and not recurrence_pattern and not blackout_windows:
+        return DateTrigger(run_date=scheduled_time, timezone=timezone.utc)
+
+    return RecurrenceTrigger(
+        frequency,
+        scheduled_time,
+        recurrence_pattern or None,
+        end_date,
+        timezone_name or None,
+        serialize_blackout_windows(blackout_windows)
+    )
+
+def get_first_run_time(trigger: BaseTrigger) -> datetime:
+    """
+    Obtener la primera ejecución futura de una programación nueva.
+
+    Args:
+        trigger: Trigger de la programación (ver build_trigger)
+
+    Returns:
+        Fecha de la primera publicación (UTC)
+
+    Raises:
+        ValueError: Si la programación no tiene publicaciones futuras (fecha
+            de fin pasada, o ventanas de bloqueo o UNTIL que las excluyen todas)
+    """
+    next_run_time = trigger.get_next_fire_time(None, datetime.now(timezone.utc))
+    if next_run_time is None:
+        raise ValueError(NO_NEXT_RUN_MESSAGE)
+    return next_run_time.astimezone(timezone.utc)
+
+def trigger_for_schedule(schedule: ScheduleSettings) -> BaseTrigger:
+    """
+    Crear el trigger de una programación guardada.
+
+    Args:
+        schedule: Configuración de programación
+
+    Returns:
+        Trigger de APScheduler
+
+    Raises:
+        ValueError: Si la programación no es válida
+    """
+    return build_trigger(
+        schedule.frequency,
+        schedule.scheduled_time,
+        schedule.recurrence_pattern,
+        schedule.end_date,
+        schedule.timezone,
+        schedule.blackout_windows
+    )
+
+def has_next_run(schedule: ScheduleSettings) -> bool:
+    """
+    Indicar si una programación tiene publicaciones pendientes a partir de ahora.
+
+    Args:
+        schedule: Configuración de programación
+
+    Returns:
+        True si el trigger tiene una próxima ejecución
+    """
+    try:
+        trigger = trigger_for_schedule(schedule)
+    except ValueError:
+        return False
+
+    return trigger.get_next_fire_time(None, datetime.now(timezone.utc)) is not None
+
+class ScheduleClient:
+    """
+    Cliente liviano para consultar y modificar las publicaciones programadas.
+
+    Escribe directamente en el jobstore compartido sin iniciar un
+    BackgroundScheduler: no crea hilos ni executors, por lo que es el que
+    deben usar los workers de la API. Después de cada cambio incrementa un
+    contador de versión en la base de datos para que el proceso que ejecuta
+    los jobs (ver PostScheduler) revise el jobstore sin esperar a su próximo job.
+    """
+
+    def __init__(self):
+        """Inicializar el cliente; el jobstore se prepara en el primer uso."""
+        self._jobstore: Optional[SQLAlchemyJobStore] = None
+        self._lock = threading.Lock()
+
+    @property
+    def jobstore(self) -> SQLAlchemyJobStore:
+        """Jobstore compartido, creado la primera vez que se usa."""
+        if self._jobstore is None:
+            with self._lock:
+                if self._jobstore is None:
+                    jobstore = SQLAlchemyJobStore(engine=engine)
+                    # Crea la tabla de jobs si no existe; no inicia ningún hilo
+                    jobstore.start(None, "default")
+                    self._jobstore = jobstore
+        return self._jobstore
+
+    def schedule_post(
+        self,
+        post_id: int,
+        scheduled_time: datetime,
+        frequency: str = "once",
+        recurrence_pattern: Optional[str] = None,
+        end_date: Optional[datetime] = None,
+        timezone_name: Optional[str] = None,
+        blackout_windows: Union[str, List[Dict[str, Any]], None] = None
+    ) -> bool:
+        """
+        Programar la publicación de un post.
+
+        Args:
+            post_id: ID del post a programar
+            scheduled_time: Fecha y hora programada
+            frequency: Frecuencia ('once', 'daily', 'weekly', 'monthly', 'custom')
+            recurrence_pattern: RRULE o expresión cron en hora local
+            end_date: Última fecha posible de publicación
+            timezone_name: Zona horaria IANA de las horas locales
+            blackout_windows: Ventanas sin publicación (lista o JSON)
+
+        Returns:
+            True si la programación fue exitosa, False en caso contrario
+        """
+        scheduled, errors = self.schedule_posts([{
+            "post_id": post_id,
+            "scheduled_time": scheduled_time,
+            "frequency": frequency,
+            "recurrence_pattern": recurrence_pattern,
+            "end_date": end_date,
+            "timezone_name": timezone_name,
+            "blackout_windows": blackout_windows
+        }])
+
+        if not scheduled:
+            logger.error(f"Error al programar post {post_id}: {errors.get(post_id)}")
+            return False
+
+        logger.info(f"Post {post_id} programado para {scheduled_time}")
+        return True
+
+    def schedule_posts(self, items: List[Dict[str, Any]]) -> Tuple[List[int], Dict[int, str]]:
+        """
+        Programar varios posts en una sola transacción.
+
+        Los posts, sus configuraciones de programación y sus jobs se leen con
+        una consulta por tabla y se escriben con una sentencia por tipo de
+        cambio (executemany), en lugar de varias idas y vueltas por post.
+
+        Args:
+            items: Diccionarios con los parámetros de schedule_post
+                (post_id, scheduled_time y opcionalmente frequency,
+                recurrence_pattern, end_date, timezone_name, blackout_windows);
+                si un post se repite, vale el último
+
+        Returns:
+            Tupla (IDs de los posts programados, mensaje de error por ID de post)
+        """
+        errors: Dict[int, str] = {}
+        prepared: Dict[int, Dict[str, Any]] = {}
+
+        for item in items:
+            post_id = item["post_id"]
+            values = {
+                "scheduled_time": item["scheduled_time"],
+                "frequency": item.get("frequency") or "once",
+                "recurrence_pattern": item.get("recurrence_pattern"),
+                "end_date": item.get("end_date"),
+                "timezone": item.get("timezone_name"),
+                "blackout_windows": serialize_blackout_windows(item.get("blackout_windows")),
+                "is_active": True
+            }
+            try:
+                trigger = build_trigger(
+                    values["frequency"],
+                    values["scheduled_time"],
+                    values["recurrence_pattern"],
+                    values["end_date"],
+                    values["timezone"],
+                    values["blackout_windows"]
+                )
+                # Sin próxima ejecución el job quedaría guardado sin fecha y
+                # el post marcado como programado sin publicarse nunca
+                job = self._build_job(post_id, trigger, get_first_run_time(trigger))
+            except ValueError as e:
+                errors[post_id] = str(e)
+                prepared.pop(post_id, None)
+                continue
+
+            errors.pop(post_id, None)
+            prepared[post_id] = {"values": values, "job": job}
+
+        if not prepared:
+            return [], errors
+
+        try:
+            try:
+                scheduled = self._write_schedules(prepared, errors)
+            except IntegrityError:
+                # Otro worker creó el job o la programación de alguno de los
+                # posts entre la lectura y la escritura: se reintenta una vez
+                scheduled = self._write_schedules(prepared, errors)
+
+        except Exception as e:
+            logger.error(f"Error al programar posts: {str(e)}")
+            for post_id in prepared:
+                errors[post_id] = str(e)
+            return [], errors
+
+        if scheduled:
+            self.notify()
+            if len(scheduled) > 1:
+                logger.info(f"{len(scheduled)} posts programados en lote")
+
+        return scheduled, errors
+
+    def _write_schedules(self, prepared: Dict[int, Dict[str, Any]], errors: Dict[int, str]) -> List[int]:
+        """
+        Guardar en una transacción los posts, sus programaciones y sus jobs.
+
+        Args:
+            prepared: Valores de la programación y job por ID de post
+            errors: Mensajes de error por ID de post (se agregan los no encontrados)
+
+        Returns:
+            IDs de los posts programados
+        """
+        jobs_t = self.jobstore.jobs_t
+        post_ids = list(prepared)
+
+        db = SessionLocal()
+        try:
+            schedule_ids: Dict[int, Optional[int]] = {}
+            existing_jobs = set()
+            for start in range(0, len(post_ids), QUERY_CHUNK_SIZE):
+                chunk = post_ids[start:start + QUERY_CHUNK_SIZE]
+                rows = db.execute(
+                    select(Post.post_id, ScheduleSettings.schedule_id)
+                    .outerjoin(ScheduleSettings, ScheduleSettings.post_id == Post.post_id)
+                    .where(Post.post_id.in_(chunk))
+                ).all()
+                schedule_ids.update((row.post_id, row.schedule_id) for row in rows)
+                existing_jobs.update(db.execute(
+                    select(jobs_t.c.id).where(jobs_t.c.id.in_([get_job_id(post_id) for post_id in chunk]))
+                ).scalars())
+
+            scheduled = [post_id for post_id in post_ids if post_id in schedule_ids]
+            for post_id in post_ids:
+                if post_id not in schedule_ids:
+                    errors[post_id] = f"No se encontró el post con ID {post_id}"
+            if not scheduled:
+                return []
+
+            track_status_change(db, scheduled, "scheduled")
+            db.execute(update(Post), [
+                {
+                    "post_id": post_id,
+                    "status": "scheduled",
+                    "scheduled_for": prepared[post_id]["values"]["scheduled_time"]
+                }
+                for post_id in scheduled
+            ])
+
+            schedule_updates = []
+            schedule_inserts = []
+            for post_id in scheduled:
+                values = prepared[post_id]["values"]
+                if schedule_ids[post_id] is None:
+                    schedule_inserts.append({"post_id": post_id, **values})
+                else:
+                    schedule_updates.append({"schedule_id": schedule_ids[post_id], **values})
+            if schedule_updates:
+                db.execute(update(ScheduleSettings), schedule_updates)
+            if schedule_inserts:
+                db.execute(insert(ScheduleSettings), schedule_inserts)
+
+            job_updates = []
+            job_inserts = []
+            for post_id in scheduled:
+                job = prepared[post_id]["job"]
+                row = {
+                    "next_run_time": datetime_to_utc_timestamp(job.next_run_time),
+                    "job_state": pickle.dumps(job.__getstate__(), self.jobstore.pickle_protocol)
+                }
+                if job.id in existing_jobs:
+                    job_updates.append({"job_id": job.id, "run_at": row["next_run_time"], "state": row["job_state"]})
+                else:
+                    job_inserts.append({"id": job.id, **row})
+            if job_updates:
+                db.execute(
+                    jobs_t.update()
+                    .where(jobs_t.c.id == bindparam("job_id"))
+                    .values(next_run_time=bindparam("run_at"), job_state=bindparam("state")),
+                    job_updates
+                )
+            if job_inserts:
+                db.execute(jobs_t.insert(), job_inserts)
+
+            db.commit()
+            return scheduled
+
+        except Exception:
+            db.rollback()
+            raise
+
+        finally:
+            db.close()
+
+    def cancel_scheduled_post(self, post_id: int) -> bool:
+        """
+        Cancelar una publicación programada.
+
+        Args:
+            post_id: ID del post a cancelar
+
+        Returns:
+            True si la cancelación fue exitosa, False en caso contrario
+        """
+        try:
+            db = SessionLocal()
+            try:
+                # Obtener el post
+                post = db.query(Post).filter(Post.post_id == post_id).first()
+
+                if not post:
+                    logger.error(f"No se encontró el post con ID {post_id}")
+                    return False
+
+                # Desactivar programación
+                schedule = db.query(ScheduleSettings).filter(
+                    ScheduleSettings.post_id == post_id
+                ).first()
+
+                if schedule:
+                    schedule.is_active = False
+
+                # Actualizar estado del post
+                post.status = "draft"
+                post.scheduled_for = None
+
+                # Guardar cambios
+                db.commit()
+
+            finally:
+                db.close()
+
+            # Eliminar job
+            if self.remove_job(post_id):
+                logger.info(f"Programación cancelada para post {post_id}")
+            else:
+                logger.warning(f"No se encontró job programado para post {post_id}")
+
+            return True  # Sin job que cancelar también se considera exitoso
+
+        except Exception as e:
+            logger.error(f"Error al cancelar programación: {str(e)}")
+            return False
+
+    def remove_job(self, post_id: int, notify: bool = True) -> bool:
+        """
+        Eliminar el job de un post del jobstore.
+
+        Args:
+            post_id: ID del post
+            notify: Avisar del cambio al proceso que ejecuta los jobs
+
+        Returns:
+            True si el job existía
+        """
+        try:
+            self.jobstore.remove_job(get_job_id(post_id))
+        except JobLookupError:
+            return False
+
+        if notify:
+            self.notify()
+        return True
+
+    def get_job_next_run_time(self, post_id: int) -> Optional[datetime]:
+        """
+        Obtener la próxima ejecución del job de un post.
+
+        Args:
+            post_id: ID del post
+
+        Returns:
+            Fecha de la próxima ejecución o None si no hay job
+        """
+        job = self.jobstore.lookup_job(get_job_id(post_id))
+        return job.next_run_time if job else None
+
+    def get_due_post_ids(self, until: datetime) -> List[int]:
+        """
+        Obtener los posts cuyo job se ejecuta antes de una fecha.
+
+        Solo lee la columna next_run_time del jobstore, sin reconstruir los jobs,
+        por lo que también cubre las próximas ejecuciones de los recurrentes.
+
+        Args:
+            until: Fecha límite (UTC)
+
+        Returns:
+            IDs de los posts, ordenados por próxima ejecución
+        """
+        if until.tzinfo is None:
+            until = until.replace(tzinfo=timezone.utc)
+
+        jobs_t = self.jobstore.jobs_t
+        query = (
+            select(jobs_t.c.id)
+            .where(jobs_t.c.next_run_time <= datetime_to_utc_timestamp(until))
+            .order_by(jobs_t.c.next_run_time)
+        )
+
+        with self.jobstore.engine.connect() as connection:
+            job_ids = connection.execute(query).scalars().all()
+
+        prefix = get_job_id(0)[:-1]
+        return [int(job_id[len(prefix):]) for job_id in job_ids if job_id.startswith(prefix)]
+
+    def get_pending_posts(self, hours: int = 24) -> List[Post]:
+        """
+        Obtener posts programados para las próximas X horas.
+
+        Args:
+            hours: Número de horas a considerar
+
+        Returns:
+            Lista de posts programados
+        """
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            end_time = now + timedelta(hours=hours)
+
+            posts = PostRepository(db).get_scheduled_between(now, end_time)
+
+            return posts
+
+        finally:
+            db.close()
+
+    def notify(self) -> None:
+        """Avisar al proceso que ejecuta los jobs de que el jobstore cambió."""
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                update(SchedulerState)
+                .where(SchedulerState.name == JOBS_VERSION_KEY)
+                .values(version=SchedulerState.version + 1, updated_at=datetime.utcnow())
+            )
+            if result.rowcount == 0:
+                db.add(SchedulerState(name=JOBS_VERSION_KEY, version=1, updated_at=datetime.utcnow()))
+            db.commit()
+
+        except IntegrityError:
+            # Otro proceso creó el contador al mismo tiempo
+            db.rollback()
+            self.notify()
+
+        except Exception as e:
+            # El programador igual revisa el jobstore periódicamente
+            db.rollback()
+            logger.warning(f"No se pudo notificar el cambio de jobs: {str(e)}")
+
+        finally:
+            db.close()
+
+    def put_job(self, post_id: int, trigger: BaseTrigger, next_run_time: Optional[datetime] = None) -> None:
+        """
+        Crear o reemplazar el job de publicación de un post.
+
+        Args:
+            post_id: ID del post
+            trigger: Trigger del job
+            next_run_time: Próxima ejecución (por defecto la primera del trigger)
+        """
+        job = self._build_job(post_id, trigger, next_run_time)
+
+        try:
+            self.jobstore.add_job(job)
+        except ConflictingIdError:
+            self.jobstore.update_job(job)
+
+    def _build_job(self, post_id: int, trigger: BaseTrigger, next_run_time: Optional[datetime] = None) -> Job:
+        """Crear el job de publicación de un post sin guardarlo."""
+        job = Job(
+            None,
+            id=get_job_id(post_id),
+            func=PUBLISH_JOB_FUNC,
+            args=[post_id],
+            kwargs={},
+            name="publish_scheduled_post",
+            trigger=trigger,
+            **JOB_DEFAULTS
+        )
+        # Se asigna directamente: Job solo consulta el programador para
+        # convertir zonas horarias. Los triggers devuelven la fecha en su zona
+        # (la de la regla en las expresiones cron), así que se pasa a UTC
+        if next_run_time is None:
+            next_run_time = trigger.get_next_fire_time(None, datetime.now(timezone.utc))
+        job.next_run_time = next_run_time.astimezone(timezone.utc) if next_run_time else None
+        return job
+
+def get_jobs_version() -> int:
+    """
+    Leer el contador de cambios del jobstore.
+
+    Returns:
+        Versión actual (0 si nunca hubo cambios)
+    """
+    db = SessionLocal()
+    try:
+        state = db.get(SchedulerState, JOBS_VERSION_KEY)
+        return state.version if state else 0
+    finally:
+        db.close()
+
+_client: Optional[ScheduleClient] = None
+_client_lock = threading.Lock()
+
+def get_schedule_client() -> ScheduleClient:
+    """
+    Obtener el cliente de programación compartido por el proceso.
+
+    Returns:
+        Instancia de ScheduleClient
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ScheduleClient()
+    return _client
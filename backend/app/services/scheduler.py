@@ -1,21 +1,50 @@
 # app/services/scheduler.py
+import time
 import logging
-from datetime import datetime, timedelta
-from typing import List, Optional
-from sqlalchemy import and_
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.executors.pool import ThreadPoolExecutor
 
 from app.core.config import settings
-from app.db.database import SessionLocal, engine
-from app.db.models import Post, ScheduleSettings
+from app.db.database import SessionLocal, engine, get_pool_stats
+from app.db.models import Post
+from app.db.repositories import PostRepository
+from app.services.audit_log import get_audit_log
+from app.services.async_publisher import AsyncPublisher
+from app.services.catchup import CatchupService
+from app.services.dispatcher import BucketDispatcher
 from app.services.instagram_publisher import InstagramPublisher
+from app.services.leader_election import LeaderElector
+from app.services.prerender import PrerenderService
+from app.services.schedule_client import get_jobs_version, get_schedule_client, has_next_run
 
 logger = logging.getLogger(__name__)
 
+# Hilos del executor de APScheduler cuando las publicaciones corren en asyncio
+ASYNC_MODE_EXECUTOR_WORKERS = 4
+
 class PostScheduler:
-    """Servicio para programar publicaciones en Instagram."""
+    """
+    Proceso que ejecuta las publicaciones programadas.
+    
+    Los jobs se guardan en un jobstore compartido y los crean o modifican los
+    workers de la API mediante ScheduleClient. Puede haber varias instancias
+    de este servicio (ver scripts/scheduler_service.py), pero solo la elegida
+    líder ejecuta jobs; las demás quedan en pausa como reemplazo.
+    
+    Con SCHEDULER_DISPATCH_MODE="bucket" los jobs no publican directamente:
+    encolan el post en el BucketDispatcher, que publica juntos los posts que
+    vencen en la misma franja de tiempo.
+    
+    Con SCHEDULER_EXECUTION_MODE="asyncio" las publicaciones corren como
+    corrutinas en el AsyncPublisher y los jobs solo se las entregan, por lo que
+    el executor de APScheduler se reduce a unos pocos hilos.
+    """
     
     _instance = None
     
@@ -29,16 +58,43 @@ class PostScheduler:
     def __init__(self):
         """Inicializar el programador de tareas."""
         if not self._initialized:
-            # Configurar jobstore para guardar tareas en la base de datos
+            self.client = get_schedule_client()
+            
+            # Publicaciones como corrutinas en lugar de un hilo por publicación
+            self.async_publisher = None
+            if settings.SCHEDULER_EXECUTION_MODE == "asyncio":
+                self.async_publisher = AsyncPublisher()
+                self.async_publisher.start()
+            
+            # Despacho por franjas de los jobs que vencen juntos
+            self.dispatcher = None
+            if settings.SCHEDULER_DISPATCH_MODE == "bucket":
+                self.dispatcher = BucketDispatcher(async_publisher=self.async_publisher)
+                self.dispatcher.start()
+            
+            # Configurar jobstore para guardar tareas en la base de datos; usa
+            # el engine compartido en lugar de abrir un segundo pool
+            self.jobstore = SQLAlchemyJobStore(engine=engine)
             jobstores = {
-                'default': SQLAlchemyJobStore(url=str(engine.url))
+                'default': self.jobstore,
+                # Tareas internas del proceso, que no se comparten
+                'internal': MemoryJobStore()
             }
             
-            # Configurar executors
+            # Configurar executors; en modo asyncio los jobs solo entregan el
+            # post y terminan enseguida
+            self.executor_workers = (
+                ASYNC_MODE_EXECUTOR_WORKERS if self.async_publisher else settings.SCHEDULER_EXECUTOR_WORKERS
+            )
             executors = {
-                'default': ThreadPoolExecutor(20)
+                'default': ThreadPoolExecutor(self.executor_workers)
             }
             
+            # Jobs de publicación en curso (para el drenaje y la salud del servicio)
+            self._in_flight = 0
+            self._in_flight_condition = threading.Condition()
+            self._draining = False
+            
             # Configurar programador
             self.scheduler = BackgroundScheduler(
                 jobstores=jobstores,
@@ -46,195 +102,168 @@ class PostScheduler:
                 timezone='UTC'
             )
             
-            # Iniciar el programador
-            self.scheduler.start()
+            # Iniciar en pausa: los jobs solo se ejecutan cuando este proceso
+            # es elegido líder
+            self.scheduler.start(paused=True)
+            
+            # Recuperar las publicaciones vencidas antes de reanudar los jobs
+            self.catchup = CatchupService(client=self.client)
+            self._leader_lock = threading.Lock()
+            
+            # Generar con anticipación las imágenes de los próximos posts; la
+            # primera revisión se hace al ser elegido líder
+            self.prerender = PrerenderService()
+            self.scheduler.add_job(
+                self.prerender.run,
+                'interval',
+                seconds=settings.SCHEDULER_PRERENDER_INTERVAL_SECONDS,
+                id='prerender',
+                jobstore='internal',
+                next_run_time=datetime.now(timezone.utc),
+                misfire_grace_time=None,
+                coalesce=True,
+                max_instances=1
+            )
+            
+            self.elector = LeaderElector(
+                name="scheduler",
+                on_elected=self._on_elected,
+                on_revoked=self._on_revoked,
+                on_tick=self.scheduler.wakeup
+            )
+            self.elector.start()
+            
+            # Revisar el jobstore cuando otro proceso lo modifica
+            self._stop_event = threading.Event()
+            self._jobs_version = get_jobs_version()
+            self._watcher = threading.Thread(
+                target=self._watch_jobs_version,
+                name="scheduler-jobs-watcher",
+                daemon=True
+            )
+            self._watcher.start()
             
             logger.info("Programador de tareas iniciado")
             self._initialized = True
     
-    def schedule_post(self, post_id: int, scheduled_time: datetime, frequency: str = "once") -> bool:
+    @property
+    def is_leader(self) -> bool:
+        """Indica si este proceso ejecuta los jobs."""
+        return self.elector.is_leader
+    
+    @contextmanager
+    def track_job(self) -> Iterator[None]:
+        """Contar un job de publicación mientras se ejecuta."""
+        with self._in_flight_condition:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._in_flight_condition:
+                self._in_flight -= 1
+                self._in_flight_condition.notify_all()
+    
+    def get_health(self) -> Dict[str, Any]:
         """
-        Programar la publicación de un post.
+        Obtener el estado del servicio para las sondas de salud.
         
-        Args:
-            post_id: ID del post a programar
-            scheduled_time: Fecha y hora programada
-            frequency: Frecuencia ('once', 'daily', 'weekly', 'monthly')
-            
         Returns:
-            True si la programación fue exitosa, False en caso contrario
+            Diccionario con el estado, el liderazgo, la ocupación de los
+            executors y la próxima ejecución programada
         """
+        workers = self.executor_workers
+        health: Dict[str, Any] = {
+            "status": "draining" if self._draining else "ok",
+            "is_leader": self.is_leader,
+            "holder_id": self.elector.holder_id,
+            "scheduler_running": self.scheduler.running,
+            "executor": {
+                "max_workers": workers,
+                "in_flight": self._in_flight,
+                "saturation": round(min(self._in_flight, workers) / workers, 2)
+            },
+            "dispatcher": self.dispatcher.get_stats() if self.dispatcher else None,
+            "async_publisher": self.async_publisher.get_stats() if self.async_publisher else None,
+            "next_fire_time": None,
+            "database": "ok",
+            "database_pool": get_pool_stats(),
+            "audit_log": get_audit_log().get_status()
+        }
+        
         try:
-            db = SessionLocal()
-            try:
-                # Obtener el post
-                post = db.query(Post).filter(Post.post_id == post_id).first()
-                
-                if not post:
-                    logger.error(f"No se encontró el post con ID {post_id}")
-                    return False
-                
-                # Actualizar estado del post
-                post.status = "scheduled"
-                post.scheduled_for = scheduled_time
-                
-                # Crear o actualizar configuración de programación
-                schedule = db.query(ScheduleSettings).filter(
-                    ScheduleSettings.post_id == post_id
-                ).first()
-                
-                if not schedule:
-                    schedule = ScheduleSettings(
-                        post_id=post_id,
-                        scheduled_time=scheduled_time,
-                        frequency=frequency,
-                        is_active=True
-                    )
-                    db.add(schedule)
-                else:
-                    schedule.scheduled_time = scheduled_time
-                    schedule.frequency = frequency
-                    schedule.is_active = True
-                
-                # Guardar cambios
-                db.commit()
-                
-                # Programar la tarea
-                job_id = f"post_{post_id}"
-                
-                # Eliminar job existente si lo hay
-                if self.scheduler.get_job(job_id):
-                    self.scheduler.remove_job(job_id)
-                
-                # Programar según frecuencia
-                if frequency == "once":
-                    self.scheduler.add_job(
-                        self._publish_post,
-                        'date',
-                        run_date=scheduled_time,
-                        id=job_id,
-                        args=[post_id]
-                    )
-                elif frequency == "daily":
-                    self.scheduler.add_job(
-                        self._publish_post,
-                        'interval',
-                        days=1,
-                        start_date=scheduled_time,
-                        id=job_id,
-                        args=[post_id]
-                    )
-                elif frequency == "weekly":
-                    self.scheduler.add_job(
-                        self._publish_post,
-                        'interval',
-                        weeks=1,
-                        start_date=scheduled_time,
-                        id=job_id,
-                        args=[post_id]
-                    )
-                elif frequency == "monthly":
-                    self.scheduler.add_job(
-                        self._publish_post,
-                        'interval',
-                        months=1,
-                        start_date=scheduled_time,
-                        id=job_id,
-                        args=[post_id]
-                    )
-                else:
-                    logger.error(f"Frecuencia no válida: {frequency}")
-                    return False
-                
-                logger.info(f"Post {post_id} programado para {scheduled_time}")
-                return True
-                
-            finally:
-                db.close()
-                
+            next_fire_time = self.jobstore.get_next_run_time()
+            health["next_fire_time"] = next_fire_time.isoformat() if next_fire_time else None
         except Exception as e:
-            logger.error(f"Error al programar post: {str(e)}")
-            return False
+            logger.warning(f"No se pudo consultar la próxima ejecución: {str(e)}")
+            health["database"] = "error"
+        
+        health["ready"] = (
+            health["status"] == "ok"
+            and health["scheduler_running"]
+            and health["database"] == "ok"
+        )
+        return health
     
-    def cancel_scheduled_post(self, post_id: int) -> bool:
-        """
-        Cancelar una publicación programada.
+    def _on_elected(self) -> None:
+        """Empezar a ejecutar jobs al ser elegido líder."""
+        # La recuperación puede tardar: se hace fuera del hilo que renueva el lease
+        threading.Thread(
+            target=self._catch_up_and_resume,
+            name="scheduler-catchup",
+            daemon=True
+        ).start()
+    
+    def _catch_up_and_resume(self) -> None:
+        """Recuperar las publicaciones vencidas y reanudar los jobs."""
+        try:
+            self.catchup.run(should_continue=lambda: self.is_leader)
+        except Exception as e:
+            logger.error(f"Error al recuperar las publicaciones vencidas: {str(e)}")
         
-        Args:
-            post_id: ID del post a cancelar
+        with self._leader_lock:
+            if self.is_leader and not self._draining:
+                self.scheduler.resume()
+                logger.info("Programador activo: este proceso ejecuta los jobs")
+    
+    def _on_revoked(self) -> None:
+        """Dejar de ejecutar jobs al perder el liderazgo."""
+        with self._leader_lock:
+            self.scheduler.pause()
+        logger.warning("Programador en pausa: otro proceso ejecuta los jobs")
+    
+    def _watch_jobs_version(self) -> None:
+        """Despertar al programador cuando cambia el contador de jobs."""
+        while not self._stop_event.wait(settings.SCHEDULER_NOTIFY_POLL_SECONDS):
+            if not self.is_leader:
+                continue
             
-        Returns:
-            True si la cancelación fue exitosa, False en caso contrario
-        """
-        try:
-            db = SessionLocal()
             try:
-                # Obtener el post
-                post = db.query(Post).filter(Post.post_id == post_id).first()
-                
-                if not post:
-                    logger.error(f"No se encontró el post con ID {post_id}")
-                    return False
-                
-                # Desactivar programación
-                schedule = db.query(ScheduleSettings).filter(
-                    ScheduleSettings.post_id == post_id
-                ).first()
-                
-                if schedule:
-                    schedule.is_active = False
-                
-                # Actualizar estado del post
-                post.status = "draft"
-                post.scheduled_for = None
-                
-                # Guardar cambios
-                db.commit()
-                
-                # Eliminar job
-                job_id = f"post_{post_id}"
-                if self.scheduler.get_job(job_id):
-                    self.scheduler.remove_job(job_id)
-                    logger.info(f"Programación cancelada para post {post_id}")
-                    return True
-                else:
-                    logger.warning(f"No se encontró job programado para post {post_id}")
-                    return True  # Consideramos exitoso ya que no hay job que cancelar
-                
-            finally:
-                db.close()
-                
-        except Exception as e:
-            logger.error(f"Error al cancelar programación: {str(e)}")
-            return False
+                version = get_jobs_version()
+            except Exception as e:
+                logger.warning(f"No se pudo leer la versión de los jobs: {str(e)}")
+                continue
+            
+            if version != self._jobs_version:
+                self._jobs_version = version
+                self.scheduler.wakeup()
+    
+    def schedule_post(self, post_id: int, scheduled_time: datetime, frequency: str = "once", **recurrence) -> bool:
+        """
+        Programar la publicación de un post (ver ScheduleClient.schedule_post).
+        """
+        return self.client.schedule_post(post_id, scheduled_time, frequency, **recurrence)
+    
+    def cancel_scheduled_post(self, post_id: int) -> bool:
+        """
+        Cancelar una publicación programada (ver ScheduleClient.cancel_scheduled_post).
+        """
+        return self.client.cancel_scheduled_post(post_id)
     
     def get_pending_posts(self, hours: int = 24) -> List[Post]:
         """
-        Obtener posts programados para las próximas X horas.
-        
-        Args:
-            hours: Número de horas a considerar
-            
-        Returns:
-            Lista de posts programados
+        Obtener posts programados para las próximas X horas (ver ScheduleClient.get_pending_posts).
         """
-        db = SessionLocal()
-        try:
-            now = datetime.utcnow()
-            end_time = now + timedelta(hours=hours)
-            
-            posts = db.query(Post).filter(
-                and_(
-                    Post.status == "scheduled",
-                    Post.scheduled_for >= now,
-                    Post.scheduled_for <= end_time
-                )
-            ).all()
-            
-            return posts
-            
-        finally:
-            db.close()
+        return self.client.get_pending_posts(hours)
     
     def _publish_post(self, post_id: int) -> None:
         """
@@ -245,17 +274,15 @@ class PostScheduler:
         """
         db = SessionLocal()
         try:
-            # Obtener el post
-            post = db.query(Post).filter(Post.post_id == post_id).first()
+            # Obtener el post con su programación y su plantilla
+            post = PostRepository(db).get(post_id, with_image=True, with_schedule=True)
             
             if not post:
                 logger.error(f"No se encontró el post con ID {post_id}")
                 return
             
             # Verificar si está activo y programado
-            schedule = db.query(ScheduleSettings).filter(
-                ScheduleSettings.post_id == post_id
-            ).first()
+            schedule = post.schedule
             
             if not schedule or not schedule.is_active:
                 logger.info(f"Programación inactiva para post {post_id}")
@@ -263,13 +290,13 @@ class PostScheduler:
             
             # Publicar en Instagram
             publisher = InstagramPublisher()
-            success, post_id, error = publisher.publish_post(post, db)
+            success, instagram_post_id, error = publisher.publish_post(post, db)
             
             if success:
                 logger.info(f"Post {post_id} publicado exitosamente")
                 
-                # Si la frecuencia es "once", desactivar la programación
-                if schedule.frequency == "once":
+                # Desactivar la programación si no quedan más publicaciones
+                if schedule.frequency == "once" or not has_next_run(schedule):
                     schedule.is_active = False
                     db.commit()
             else:
@@ -285,8 +312,74 @@ class PostScheduler:
         finally:
             db.close()
     
-    def shutdown(self):
-        """Detener el programador de tareas."""
-        if hasattr(self, 'scheduler'):
-            self.scheduler.shutdown()
-            logger.info("Programador de tareas detenido")
\ No newline at end of file
+    def shutdown(self, drain_timeout: Optional[float] = None) -> bool:
+        """
+        Detener el programador de tareas de forma ordenada.
+        
+        Deja de tomar jobs nuevos, espera a que terminen las publicaciones en
+        curso y las franjas ya encoladas, y recién entonces libera el lease para
+        que otro proceso tome el relevo. Las publicaciones que no terminen a
+        tiempo se interrumpen; sus posts quedan en "scheduled" y el siguiente
+        líder los recupera (ver CatchupService).
+        
+        Args:
+            drain_timeout: Tiempo máximo de espera en segundos
+                (por defecto SCHEDULER_DRAIN_TIMEOUT_SECONDS)
+            
+        Returns:
+            True si todas las publicaciones en curso terminaron a tiempo
+        """
+        if not getattr(self, '_initialized', False):
+            return True
+        
+        if drain_timeout is None:
+            drain_timeout = settings.SCHEDULER_DRAIN_TIMEOUT_SECONDS
+        deadline = time.monotonic() + drain_timeout
+        
+        # Dejar de tomar jobs nuevos
+        self._draining = True
+        self._stop_event.set()
+        with self._leader_lock:
+            self.scheduler.pause()
+        logger.info(f"Drenando publicaciones en curso (hasta {drain_timeout}s)...")
+        
+        # Esperar los jobs en ejecución y luego las franjas encoladas
+        drained = True
+        with self._in_flight_condition:
+            while self._in_flight and time.monotonic() < deadline:
+                self._in_flight_condition.wait(deadline - time.monotonic())
+            if self._in_flight:
+                logger.warning(f"{self._in_flight} publicaciones no terminaron dentro del tiempo de espera")
+                drained = False
+        
+        if self.dispatcher:
+            drained = self.dispatcher.stop(timeout=max(0.0, deadline - time.monotonic())) and drained
+        
+        if self.async_publisher:
+            drained = self.async_publisher.stop(timeout=max(0.0, deadline - time.monotonic())) and drained
+        
+        # Liberar el lease para que otro proceso tome el relevo
+        self.elector.stop(release=True)
+        
+        self.scheduler.shutdown(wait=False)
+        logger.info("Programador de tareas detenido")
+        return drained
+
+def publish_scheduled_post(post_id: int) -> None:
+    """
+    Punto de entrada de los jobs de publicación programada.
+    
+    APScheduler guarda en el jobstore una referencia textual a esta función;
+    un método ligado a la instancia no se puede reconstruir al recargar el job.
+    
+    Args:
+        post_id: ID del post a publicar
+    """
+    scheduler = PostScheduler()
+    with scheduler.track_job():
+        if scheduler.dispatcher:
+            scheduler.dispatcher.submit(post_id)
+        elif scheduler.async_publisher:
+            scheduler.async_publisher.submit(post_id)
+        else:
+            scheduler._publish_post(post_id)
@@ -0,0 +1,185 @@
+# app/services/user_cache.py
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.db.models import User
+
+logger = logging.getLogger(__name__)
+
+class UserCache:
+    """
+    Caché de los usuarios autenticados, por token.
+
+    Evita consultar la tabla de usuarios en cada petición autenticada. Cada
+    entrada dura USER_CACHE_TTL_SECONDS (nunca más que el token) y al superar
+    USER_CACHE_MAX_SIZE se descarta la usada hace más tiempo. Los usuarios se
+    guardan desvinculados de su sesión: solo deben leerse sus columnas.
+
+    La clave es solo el token (el user_id ya va dentro de él); un índice
+    inverso user_id -> tokens permite borrar todas las entradas de un
+    usuario. Las modificaciones de un usuario hechas con el ORM en este
+    proceso las borran (ver invalidate); las de otros procesos se ven al
+    vencer el TTL.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_size: Optional[int] = None):
+        """
+        Inicializar la caché.
+
+        Args:
+            ttl_seconds: Duración de cada entrada (0 desactiva la caché)
+            max_size: Número máximo de entradas
+        """
+        self.ttl_seconds = settings.USER_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_size = settings.USER_CACHE_MAX_SIZE if max_size is None else max_size
+
+        # token -> (usuario, vencimiento en time.monotonic)
+        self._entries: OrderedDict[str, Tuple[User, float]] = OrderedDict()
+        # user_id -> tokens en caché, para invalidar por usuario
+        self._tokens: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """Indicar si la caché está activa."""
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def get(self, token: str) -> Optional[User]:
+        """
+        Obtener el usuario de un token si está en caché y no venció.
+
+        Args:
+            token: Token JWT de la petición
+
+        Returns:
+            Usuario desvinculado o None
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+
+            user, expires_at = entry
+            if time.monotonic() >= expires_at:
+                self._remove(token)
+                self._counters["misses"] += 1
+                return None
+
+            self._entries.move_to_end(token)
+            self._counters["hits"] += 1
+            return user
+
+    def put(self, token: str, user: User, token_expires_at: Optional[float] = None) -> None:
+        """
+        Guardar el usuario de un token.
+
+        Args:
+            token: Token JWT de la petición
+            user: Usuario activo, ya desvinculado de la sesión
+            token_expires_at: Vencimiento del token (timestamp Unix, campo exp)
+        """
+        if not self.enabled:
+            return
+
+        ttl = self.ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (user, time.monotonic() + ttl)
+            self._tokens.setdefault(user.user_id, set()).add(token)
+
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Borrar las entradas de un usuario (al desactivarlo o modificarlo).
+
+        Args:
+            user_id: ID del usuario
+        """
+        with self._lock:
+            tokens = self._tokens.pop(user_id, set())
+            for token in tokens:
+                self._entries.pop(token, None)
+            if tokens:
+                self._counters["invalidations"] += 1
+
+    def clear(self) -> None:
+        """Vaciar la caché."""
+        with self._lock:
+            self._entries.clear()
+            self._tokens.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtener las métricas de la caché.
+
+        Returns:
+            Diccionario con el tamaño, los aciertos, los fallos, la tasa de
+            aciertos, los descartes y las invalidaciones
+        """
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else None,
+                **self._counters
+            }
+
+    def _remove(self, token: str) -> None:
+        """Borrar una entrada (requiere el lock)."""
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        user_id = entry[0].user_id
+        tokens = self._tokens.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens[user_id]
+
+_user_cache: Optional[UserCache] = None
+_user_cache_lock = threading.Lock()
+
+def get_user_cache() -> UserCache:
+    """
+    Obtener la caché de usuarios compartida por el proceso.
+
+    Returns:
+        Instancia única de la caché para este proceso
+    """
+    global _user_cache
+
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                _user_cache = UserCache()
+
+    return _user_cache
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User) -> None:
+    """Borrar de la caché un usuario modificado o eliminado con el ORM."""
+    get_user_cache().invalidate(target.user_id)
@@ -1,14 +1,19 @@
 # app/utils/image_utils.py
 import os
 import io
-from typing import Tuple, Union, Optional
-from PIL import Image, ImageDraw, ImageFont
+import glob
+from typing import Any, List, Tuple, Union, Optional
+from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import logging
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Tamaños óptimos para cada superficie de Instagram
+FEED_SIZE = (1080, 1080)
+STORY_SIZE = (1080, 1920)  # 9:16
+
 def get_font(font_name: str = "arial.ttf", size: int = 20) -> ImageFont.FreeTypeFont:
     """
     Obtener una fuente para dibujar en imágenes.
@@ -207,4 +212,94 @@ def get_image_url(image_path: str) -> str:
             return f"/media/{path}"
     else:
         # Si no está en el directorio de medios, devolver la ruta completa
-        return f"/media/{os.path.basename(image_path)}"
\ No newline at end of file
+        return f"/media/{os.path.basename(image_path)}"
+
+def find_generated_image(post_id: int) -> Optional[str]:
+    """
+    Buscar la imagen generada más reciente de un post.
+    
+    Args:
+        post_id: ID del post
+        
+    Returns:
+        Ruta de la imagen o None si no existe
+    """
+    image_files = glob.glob(os.path.join(settings.GENERATED_DIR, f"post_{post_id}_*.png"))
+    if not image_files:
+        return None
+    
+    # El nombre incluye un timestamp, por lo que el mayor es el más reciente
+    return max(image_files)
+
+def attach_image_urls(posts: List[Any]) -> None:
+    """
+    Agregar a cada post la URL de su imagen generada (o None si no tiene).
+    
+    Args:
+        posts: Posts de la respuesta
+    """
+    for post in posts:
+        image_path = find_generated_image(post.post_id)
+        post.image_url = get_image_url(image_path) if image_path else None
+
+def prepare_feed_image(image: Image.Image) -> Image.Image:
+    """
+    Adaptar una imagen al formato óptimo del feed (1080x1080, RGB).
+    
+    Args:
+        image: Imagen original
+        
+    Returns:
+        Imagen cuadrada lista para subir al feed
+    """
+    img = image.convert("RGB")
+    
+    if img.size == FEED_SIZE:
+        return img
+    
+    # Recortar al centro para obtener un cuadrado y luego escalar
+    side = min(img.width, img.height)
+    left = (img.width - side) // 2
+    top = (img.height - side) // 2
+    img = img.crop((left, top, left + side, top + side))
+    
+    return img.resize(FEED_SIZE, Image.LANCZOS)
+
+def prepare_story_image(image: Image.Image) -> Image.Image:
+    """
+    Encuadrar una imagen en formato historia (1080x1920, 9:16).
+    
+    La imagen se centra sobre un fondo formado por la misma imagen ampliada
+    y desenfocada, en lugar de estirarla o dejar bandas vacías.
+    
+    Args:
+        image: Imagen original
+        
+    Returns:
+        Imagen vertical lista para subir a historias
+    """
+    img = image.convert("RGB")
+    story_width, story_height = STORY_SIZE
+    
+    # Fondo: imagen escalada para cubrir todo el lienzo y desenfocada
+    scale = max(story_width / img.width, story_height / img.height)
+    background = img.resize(
+        (int(img.width * scale) + 1, int(img.height * scale) + 1), Image.BILINEAR
+    )
+    left = (background.width - story_width) // 2
+    top = (background.height - story_height) // 2
+    background = background.crop((left, top, left + story_width, top + story_height))
+    background = background.filter(ImageFilter.GaussianBlur(radius=30))
+    
+    # Primer plano: imagen completa ajustada al ancho de la historia
+    foreground = resize_image(img, width=story_width)
+    if foreground.height > story_height:
+        foreground = resize_image(img, height=story_height)
+    
+    position = (
+        (story_width - foreground.width) // 2,
+        (story_height - foreground.height) // 2
+    )
+    background.paste(foreground, position)
+    
+    return background
@@ -0,0 +1,145 @@
+# app/utils/pagination.py
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple, Union
+
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.orm import InstrumentedAttribute, Query
+
+# Cabeceras de las respuestas paginadas (el cuerpo sigue siendo la lista)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """
+    Crear el cursor opaco que apunta después de un elemento.
+
+    Args:
+        created_at: Fecha de creación del último elemento de la página
+        item_id: ID del último elemento de la página
+
+    Returns:
+        Cursor en base64 apto para URLs
+    """
+    payload = json.dumps([created_at.isoformat(), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Leer un cursor creado con encode_cursor.
+
+    Args:
+        cursor: Cursor recibido del cliente
+
+    Returns:
+        Tupla (fecha de creación, ID) del último elemento de la página anterior
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as e:
+        raise ValueError("Cursor de paginación no válido") from e
+
+def keyset_statement(
+    statement: Union[Query, Select],
+    created_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0
+) -> Union[Query, Select]:
+    """
+    Aplicar a una consulta el filtro, el orden y el límite de una página.
+
+    Sirve para Query (sesión síncrona) y para select() (sesión asíncrona); los
+    resultados se pasan luego a split_page.
+
+    Args:
+        statement: Consulta ya filtrada
+        created_column: Columna de fecha de creación
+        id_column: Clave primaria (desempate)
+        limit: Tamaño de la página
+        cursor: Cursor devuelto con la página anterior (None para la primera)
+        offset: Filas a saltar desde el cursor (compatibilidad con `skip`)
+
+    Returns:
+        Consulta de la página, con una fila de más para saber si hay otra
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        statement = statement.filter(or_(
+            created_column < created_at,
+            and_(created_column == created_at, id_column < item_id)
+        ))
+
+    statement = statement.order_by(created_column.desc(), id_column.desc())
+    if offset:
+        statement = statement.offset(offset)
+    return statement.limit(limit + 1)
+
+def split_page(
+    items: List[Any],
+    limit: int,
+    created_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Separar la fila de más de una página y crear el cursor de la siguiente.
+
+    Args:
+        items: Resultados de la consulta de keyset_statement
+        limit: Tamaño de la página
+        created_column: Columna de fecha de creación
+        id_column: Clave primaria
+
+    Returns:
+        Tupla (elementos de la página, cursor de la siguiente o None si es la última)
+    """
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+
+def keyset_paginate(
+    query: Query,
+    created_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Obtener una página ordenada de la más reciente a la más antigua.
+
+    El orden (fecha de creación, ID) es estable aunque varias filas tengan la
+    misma fecha, y cada página continúa después de la última fila de la
+    anterior en lugar de saltar filas con OFFSET: con un índice sobre esas
+    columnas una página profunda cuesta lo mismo que la primera.
+
+    Args:
+        query: Consulta ya filtrada
+        created_column: Columna de fecha de creación
+        id_column: Clave primaria (desempate)
+        limit: Tamaño de la página
+        cursor: Cursor devuelto con la página anterior (None para la primera)
+        offset: Filas a saltar desde el cursor (compatibilidad con `skip`)
+
+    Returns:
+        Tupla (elementos de la página, cursor de la siguiente o None si es la última)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    items = keyset_statement(query, created_column, id_column, limit, cursor, offset).all()
+    return split_page(items, limit, created_column, id_column)
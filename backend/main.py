@@ -30,12 +30,9 @@ def main():
     os.makedirs("media/templates", exist_ok=True)
     os.makedirs("media/generated", exist_ok=True)
     
-    # Iniciar programador de tareas (solo para servidor de producción)
-    # En desarrollo, esto puede causar problemas con el reinicio automático
-    if os.getenv("ENVIRONMENT", "development") == "production":
-        from app.services.scheduler import PostScheduler
-        scheduler = PostScheduler()
-        logger.info("Programador de tareas iniciado")
+    # El servidor web no ejecuta publicaciones programadas: solo crea y
+    # modifica jobs (ver app/services/schedule_client.py). Las ejecuta el
+    # servicio aparte scripts/scheduler_service.py
     
     # Iniciar servidor web
     host = os.getenv("HOST", "0.0.0.0")
@@ -0,0 +1,190 @@
+# scripts/benchmark_async_reads.py
+"""
+Medición de los endpoints de lectura con acceso síncrono y asíncrono.
+
+Ejecuta las consultas de GET /posts, GET /posts/{id}, GET /scheduler/calendar
+y GET /scheduler/upcoming con muchas peticiones simultáneas, como las
+ejecuta la API en cada modo:
+
+- sync: cada petición ocupa un hilo del threadpool de Starlette (40 por
+  defecto) con una sesión síncrona mientras espera a la base de datos;
+- async: cada petición es una corrutina con una sesión de SQLAlchemy asyncio
+  (DB_ASYNC_READS).
+
+Con --latency-ms se agrega a cada consulta una espera que simula la ida y
+vuelta a un servidor remoto; con SQLite local casi no hay espera de red y el
+modo asíncrono solo suma el costo de su hilo por conexión (aiosqlite). Los
+datos se reutilizan entre ejecuciones (ver scripts/benchmark_post_queries.py).
+
+Uso:
+    DATABASE_URL=sqlite:///benchmark.db python -m scripts.benchmark_async_reads --concurrency 200 --latency-ms 5
+"""
+import time
+import random
+import asyncio
+import argparse
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+
+from sqlalchemy import select
+
+from app.db.async_database import dispose_async_engine, get_async_db, get_async_engine
+from app.db.database import Base, SessionLocal, engine
+from app.db.models import Post
+from app.db.repositories import AsyncPostRepository, PostRepository
+from app.utils.pagination import keyset_paginate, keyset_statement, split_page
+from scripts.benchmark_post_queries import seed
+
+def parse_args() -> argparse.Namespace:
+    """
+    Leer los parámetros de la medición desde la línea de comandos.
+    """
+    parser = argparse.ArgumentParser(description="Medición de lecturas síncronas y asíncronas")
+    parser.add_argument("--posts", type=int, default=20000, help="Número de posts sintéticos")
+    parser.add_argument("--users", type=int, default=50, help="Número de usuarios sintéticos")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los datos sintéticos")
+    parser.add_argument("--requests", type=int, default=2000, help="Peticiones por modo")
+    parser.add_argument("--concurrency", type=int, default=200, help="Peticiones simultáneas")
+    parser.add_argument("--threads", type=int, default=40, help="Hilos del threadpool en modo sync")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Espera simulada por consulta")
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both", help="Modos a medir")
+    return parser.parse_args()
+
+def sync_requests(post_ids: List[int], now: datetime, latency: float) -> List[Callable[[], None]]:
+    """Peticiones con sesión síncrona, como los endpoints def."""
+
+    def with_session(query: Callable) -> Callable[[], None]:
+        def request() -> None:
+            db = SessionLocal()
+            try:
+                query(db)
+                if latency:
+                    time.sleep(latency)
+            finally:
+                db.close()
+        return request
+
+    return [
+        with_session(lambda db: keyset_paginate(db.query(Post).filter(Post.status == "failed"), Post.created_at, Post.post_id, 50)),
+        with_session(lambda db: PostRepository(db).get(random.choice(post_ids))),
+        with_session(lambda db: PostRepository(db).get_scheduled_between(now, now + timedelta(days=7))),
+        with_session(lambda db: PostRepository(db).get_scheduled_between(now, now + timedelta(hours=24))),
+    ]
+
+def async_requests(post_ids: List[int], now: datetime, latency: float) -> List[Callable[[], Awaitable[None]]]:
+    """Peticiones con sesión asíncrona, como los endpoints async def."""
+
+    async def list_posts(db) -> None:
+        statement = keyset_statement(select(Post).where(Post.status == "failed"), Post.created_at, Post.post_id, 50)
+        split_page(list(await db.scalars(statement)), 50, Post.created_at, Post.post_id)
+
+    def with_session(query: Callable) -> Callable[[], Awaitable[None]]:
+        async def request() -> None:
+            sessions = get_async_db()
+            db = await sessions.__anext__()
+            try:
+                await query(db)
+                if latency:
+                    await asyncio.sleep(latency)
+            finally:
+                await sessions.aclose()
+        return request
+
+    return [
+        with_session(list_posts),
+        with_session(lambda db: AsyncPostRepository(db).get(random.choice(post_ids))),
+        with_session(lambda db: AsyncPostRepository(db).get_scheduled_between(now, now + timedelta(days=7))),
+        with_session(lambda db: AsyncPostRepository(db).get_scheduled_between(now, now + timedelta(hours=24))),
+    ]
+
+async def run(args: argparse.Namespace, mode: str, post_ids: List[int], now: datetime) -> Dict[str, float]:
+    """
+    Ejecutar las peticiones de un modo con la concurrencia indicada.
+
+    Returns:
+        Diccionario con la duración, el rendimiento, las latencias y el pico de hilos
+    """
+    latency = args.latency_ms / 1000
+    semaphore = asyncio.Semaphore(args.concurrency)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=args.threads, thread_name_prefix="anyio-worker")
+    sync_calls = sync_requests(post_ids, now, latency)
+    async_calls = async_requests(post_ids, now, latency)
+
+    latencies: List[float] = []
+    peak_threads = threading.active_count()
+
+    async def one(index: int) -> None:
+        nonlocal peak_threads
+        async with semaphore:
+            started = time.perf_counter()
+            if mode == "sync":
+                await loop.run_in_executor(executor, sync_calls[index % len(sync_calls)])
+            else:
+                await async_calls[index % len(async_calls)]()
+            latencies.append((time.perf_counter() - started) * 1000)
+            peak_threads = max(peak_threads, threading.active_count())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "throughput": args.requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "threads": peak_threads,
+    }
+
+async def measure(args: argparse.Namespace, post_ids: List[int], now: datetime) -> None:
+    """Medir los modos pedidos y mostrar el resumen."""
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    try:
+        for mode in modes:
+            # Calentar el pool y las cachés de sentencias del modo
+            warmup = argparse.Namespace(**{**vars(args), "requests": min(args.requests, 100)})
+            await run(warmup, mode, post_ids, now)
+
+            result = await run(args, mode, post_ids, now)
+            if mode == "async":
+                print(f"Pool async: {get_async_engine().pool.status()}")
+            print(
+                f"{mode:6s} {result['throughput']:8.0f} pet/s   "
+                f"p50 {result['p50']:7.1f}ms   p95 {result['p95']:7.1f}ms   p99 {result['p99']:7.1f}ms   "
+                f"hilos {result['threads']}"
+            )
+    finally:
+        await dispose_async_engine()
+
+def main() -> None:
+    """
+    Punto de entrada principal.
+    """
+    args = parse_args()
+    Base.metadata.create_all(bind=engine)
+
+    print(f"Preparando {args.posts} posts sintéticos...")
+    _, now = seed(argparse.Namespace(posts=args.posts, users=args.users, seed=args.seed, logs_per_post=0))
+
+    db = SessionLocal()
+    try:
+        post_ids = [post_id for post_id, in db.query(Post.post_id).limit(10000)]
+    finally:
+        db.close()
+
+    print(
+        f"\n{args.requests} peticiones, {args.concurrency} simultáneas, "
+        f"{args.threads} hilos en modo sync, espera simulada {args.latency_ms}ms"
+    )
+    print(f"Pool sync: {engine.pool.status()}")
+    asyncio.run(measure(args, post_ids, now))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+# scripts/benchmark_post_queries.py
+"""
+Medición de las consultas frecuentes sobre posts y sus planes de ejecución.
+
+Carga posts sintéticos (un millón por defecto) con sus registros de
+PostLog y mide las consultas de los endpoints más usados: posts pendientes,
+calendario, listado por estado (página profunda con OFFSET y con cursor),
+posts de un usuario e historial de un post.
+Con --compare mide primero sin los índices compuestos de los modelos y
+después con ellos. Muestra también el plan de cada consulta (EXPLAIN QUERY
+PLAN en SQLite, SHOWPLAN_TEXT en SQL Server).
+
+Los datos se reutilizan entre ejecuciones (usuarios "bench*"); usar una base
+de pruebas, no la de producción.
+
+Uso:
+    DATABASE_URL=sqlite:///benchmark.db python -m scripts.benchmark_post_queries --posts 1000000 --compare
+"""
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import Index, and_, delete, func, insert, inspect, or_, select
+from sqlalchemy.engine import Connection
+
+from app.db.database import Base, engine
+from app.db.models import Post, PostLog, Template, User
+
+BENCH_USER_PREFIX = "bench"
+INSERT_BATCH_SIZE = 10000
+DEEP_PAGE_OFFSET = 20000
+STATUSES = [("published", 70), ("draft", 10), ("scheduled", 15), ("failed", 5)]
+
+def parse_args() -> argparse.Namespace:
+    """
+    Leer los parámetros de la medición desde la línea de comandos.
+    """
+    parser = argparse.ArgumentParser(description="Medición de las consultas de posts")
+    parser.add_argument("--posts", type=int, default=1_000_000, help="Número de posts sintéticos")
+    parser.add_argument("--users", type=int, default=200, help="Número de usuarios sintéticos")
+    parser.add_argument("--logs-per-post", type=int, default=1, help="Registros de PostLog por post")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones de cada consulta")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los datos sintéticos")
+    parser.add_argument("--compare", action="store_true", help="Medir también sin los índices compuestos")
+    parser.add_argument("--no-plans", action="store_true", help="No mostrar los planes de ejecución")
+    parser.add_argument("--cleanup", action="store_true", help="Borrar los datos sintéticos al terminar")
+    return parser.parse_args()
+
+def composite_indexes() -> List[Index]:
+    """Índices compuestos declarados en los modelos de posts y registros."""
+    return [
+        index
+        for table in (Post.__table__, PostLog.__table__)
+        for index in table.indexes
+        if len(index.columns) > 1
+    ]
+
+def seed(args: argparse.Namespace) -> Tuple[List[int], datetime]:
+    """
+    Crear los datos sintéticos si no existen.
+
+    Returns:
+        Tupla (IDs de los usuarios sintéticos, fecha de referencia de los datos)
+    """
+    rng = random.Random(args.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    with engine.begin() as connection:
+        user_ids = connection.execute(
+            select(User.user_id).where(User.username.like(f"{BENCH_USER_PREFIX}%")).order_by(User.user_id)
+        ).scalars().all()
+
+        existing = 0
+        if user_ids:
+            existing = connection.execute(
+                select(func.count()).select_from(Post).where(Post.user_id.in_(user_ids))
+            ).scalar()
+        if existing >= args.posts:
+            print(f"Reutilizando {existing} posts sintéticos")
+            return user_ids, now
+
+        if not user_ids:
+            connection.execute(insert(User), [
+                {
+                    "username": f"{BENCH_USER_PREFIX}{i}",
+                    "email": f"{BENCH_USER_PREFIX}{i}@example.com",
+                    "full_name": f"Benchmark {i}"
+                }
+                for i in range(args.users)
+            ])
+            user_ids = connection.execute(
+                select(User.user_id).where(User.username.like(f"{BENCH_USER_PREFIX}%")).order_by(User.user_id)
+            ).scalars().all()
+
+        template_id = connection.execute(
+            insert(Template).values(name="Benchmark", background_color="#FFFFFF", text_color="#000000")
+        ).inserted_primary_key[0]
+
+    statuses = [status for status, _ in STATUSES]
+    weights = [weight for _, weight in STATUSES]
+    started = time.perf_counter()
+
+    for start in range(existing, args.posts, INSERT_BATCH_SIZE):
+        count = min(INSERT_BATCH_SIZE, args.posts - start)
+        rows = []
+        for i in range(start, start + count):
+            status = rng.choices(statuses, weights)[0]
+            created_at = now - timedelta(minutes=rng.randint(0, 2 * 365 * 1440))
+            scheduled_for = None
+            published_at = None
+            if status == "scheduled":
+                scheduled_for = now + timedelta(minutes=rng.randint(0, 60 * 1440))
+            elif status in ("published", "failed"):
+                scheduled_for = created_at + timedelta(minutes=rng.randint(0, 7 * 1440))
+                published_at = scheduled_for if status == "published" else None
+
+            rows.append({
+                "user_id": rng.choice(user_ids),
+                "template_id": template_id,
+                "job_title": f"Puesto {i}",
+                "location": "Buenos Aires",
+                "email": "cv@example.com",
+                "requirements": "Requisito",
+                "status": status,
+                "created_at": created_at,
+                "scheduled_for": scheduled_for,
+                "published_at": published_at
+            })
+
+        with engine.begin() as connection:
+            connection.execute(insert(Post), rows)
+            if args.logs_per_post:
+                post_ids = connection.execute(
+                    select(Post.post_id).where(Post.template_id == template_id).order_by(Post.post_id.desc()).limit(count)
+                ).scalars().all()
+                connection.execute(insert(PostLog), [
+                    {
+                        "post_id": post_id,
+                        "action": "publish",
+                        "status": "success",
+                        "timestamp": now - timedelta(minutes=rng.randint(0, 2 * 365 * 1440))
+                    }
+                    for post_id in post_ids
+                    for _ in range(args.logs_per_post)
+                ])
+
+        done = start + count
+        if done % 100_000 < INSERT_BATCH_SIZE or done == args.posts:
+            print(f"  {done} posts cargados ({time.perf_counter() - started:.0f}s)")
+
+    return user_ids, now
+
+def hot_queries(user_ids: List[int], now: datetime) -> Dict[str, object]:
+    """Consultas de los endpoints más usados, con los mismos filtros que la API."""
+    # Última fila de la página anterior a la página profunda (su cursor)
+    with engine.connect() as connection:
+        cursor_row = connection.execute(
+            select(Post.created_at, Post.post_id).where(Post.status == "failed")
+            .order_by(Post.created_at.desc(), Post.post_id.desc())
+            .offset(DEEP_PAGE_OFFSET - 1).limit(1)
+        ).one()
+
+    return {
+        # ScheduleClient.get_pending_posts
+        "pendientes 24h": select(Post).where(
+            Post.status == "scheduled",
+            Post.scheduled_for >= now,
+            Post.scheduled_for <= now + timedelta(hours=24)
+        ),
+        # GET /scheduler/calendar
+        "calendario 30 días": select(Post).where(
+            Post.status == "scheduled",
+            Post.scheduled_for >= now + timedelta(days=10),
+            Post.scheduled_for <= now + timedelta(days=40)
+        ),
+        # GET /posts?status=failed, página profunda con OFFSET y con cursor
+        "listado (OFFSET)": select(Post).where(Post.status == "failed")
+            .order_by(Post.created_at.desc(), Post.post_id.desc()).offset(DEEP_PAGE_OFFSET).limit(100),
+        "listado (cursor)": select(Post).where(
+            Post.status == "failed",
+            or_(
+                Post.created_at < cursor_row.created_at,
+                and_(Post.created_at == cursor_row.created_at, Post.post_id < cursor_row.post_id)
+            )
+        ).order_by(Post.created_at.desc(), Post.post_id.desc()).limit(100),
+        # Posts recientes de un usuario
+        "posts de un usuario": select(Post).where(Post.user_id == user_ids[len(user_ids) // 2])
+            .order_by(Post.created_at.desc()).limit(50),
+        # Historial de un post
+        "historial de un post": select(PostLog).where(
+            PostLog.post_id == select(func.max(Post.post_id)).scalar_subquery()
+        ).order_by(PostLog.timestamp),
+    }
+
+def explain(connection: Connection, statement) -> List[str]:
+    """
+    Obtener el plan de ejecución de una consulta.
+
+    Returns:
+        Líneas del plan
+    """
+    compiled = statement.compile(dialect=connection.dialect)
+    positiontup = compiled.positiontup or []
+    params = [compiled.params[name] for name in positiontup]
+    cursor = connection.connection.cursor()
+    try:
+        if connection.dialect.name == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {compiled}", params)
+            return [row[3] for row in cursor.fetchall()]
+
+        if connection.dialect.name == "mssql":
+            cursor.execute("SET SHOWPLAN_TEXT ON")
+            try:
+                cursor.execute(str(compiled), params)
+                lines = []
+                # El primer resultado repite la consulta; el segundo es el plan
+                while True:
+                    lines.extend(str(row[0]).strip() for row in cursor.fetchall())
+                    if not cursor.nextset():
+                        break
+                return lines[1:]
+            finally:
+                cursor.execute("SET SHOWPLAN_TEXT OFF")
+
+        return [f"Plan no disponible para {connection.dialect.name}"]
+    finally:
+        cursor.close()
+
+def measure(queries: Dict[str, object], repeat: int, show_plans: bool) -> Dict[str, float]:
+    """
+    Medir la mediana de cada consulta.
+
+    Returns:
+        Milisegundos por consulta
+    """
+    results: Dict[str, float] = {}
+    with engine.connect() as connection:
+        for name, statement in queries.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                connection.execute(statement).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+
+            if show_plans:
+                print(f"\n[{name}] {results[name]:.1f}ms")
+                for line in explain(connection, statement):
+                    print(f"    {line}")
+    return results
+
+def set_indexes(present: bool) -> None:
+    """Crear o eliminar los índices compuestos de los modelos."""
+    inspector = inspect(engine)
+    for index in composite_indexes():
+        existing = {item["name"] for item in inspector.get_indexes(index.table.name)}
+        if present and index.name not in existing:
+            index.create(engine)
+        elif not present and index.name in existing:
+            index.drop(engine)
+
+def cleanup(user_ids: List[int]) -> None:
+    """Borrar los datos sintéticos."""
+    with engine.begin() as connection:
+        post_ids = select(Post.post_id).where(Post.user_id.in_(user_ids))
+        connection.execute(delete(PostLog).where(PostLog.post_id.in_(post_ids)))
+        connection.execute(delete(Post).where(Post.user_id.in_(user_ids)))
+        connection.execute(delete(Template).where(Template.name == "Benchmark"))
+        connection.execute(delete(User).where(User.user_id.in_(user_ids)))
+
+def main() -> None:
+    """
+    Punto de entrada principal.
+    """
+    args = parse_args()
+    Base.metadata.create_all(bind=engine)
+
+    print(f"Preparando {args.posts} posts sintéticos...")
+    user_ids, now = seed(args)
+    queries = hot_queries(user_ids, now)
+
+    before = None
+    if args.compare:
+        print("\n=== Sin índices compuestos ===")
+        set_indexes(False)
+        before = measure(queries, args.repeat, not args.no_plans)
+
+    print("\n=== Con índices compuestos ===")
+    set_indexes(True)
+    after = measure(queries, args.repeat, not args.no_plans)
+
+    print("\n=== Resumen (mediana) ===")
+    for name, elapsed in after.items():
+        line = f"{name:24s} {elapsed:10.1f}ms"
+        if before:
+            line += f"   (sin índices: {before[name]:.1f}ms, {before[name] / max(elapsed, 1e-3):.0f}x)"
+        print(line)
+
+    if args.cleanup:
+        cleanup(user_ids)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# scripts/benchmark_recurrence.py
+"""
+Medición del cálculo de próximas ejecuciones del motor de recurrencia.
+
+Genera programaciones recurrentes sintéticas (frecuencias simples, RRULE y
+cron, con zonas horarias y ventanas de bloqueo) y mide cuánto tarda compilar
+las reglas y obtener la próxima ejecución de todas ellas.
+
+Uso:
+    python -m scripts.benchmark_recurrence --schedules 10000
+"""
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from app.services.recurrence import Recurrence
+
+ZONES = ["UTC", "America/Argentina/Buenos_Aires", "America/New_York", "Europe/Madrid"]
+PATTERNS = [
+    (None, "daily"),
+    (None, "weekly"),
+    (None, "monthly"),
+    ("RRULE:FREQ=WEEKLY;BYDAY=MO,WE,FR;BYHOUR=9;BYMINUTE=30", "custom"),
+    ("RRULE:FREQ=DAILY;INTERVAL=2;BYHOUR=10,18", "custom"),
+    ("RRULE:FREQ=MONTHLY;BYDAY=1MO", "custom"),
+    ("cron:0 9 * * 1-5", "custom"),
+    ("cron:30 12 1,15 * *", "custom"),
+]
+BLACKOUTS = [
+    None,
+    '[{"start": "22:00", "end": "07:00"}]',
+    '[{"start": "00:00", "end": "23:59", "weekdays": [5, 6]}]',
+]
+
+def parse_args() -> argparse.Namespace:
+    """
+    Leer los parámetros de la medición desde la línea de comandos.
+    """
+    parser = argparse.ArgumentParser(description="Medición del motor de recurrencia")
+    parser.add_argument("--schedules", type=int, default=10000, help="Número de programaciones")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los datos sintéticos")
+    return parser.parse_args()
+
+def main() -> None:
+    """
+    Punto de entrada principal.
+    """
+    args = parse_args()
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+
+    specs = []
+    for _ in range(args.schedules):
+        pattern, frequency = rng.choice(PATTERNS)
+        start = now - timedelta(days=rng.randint(0, 3 * 365), minutes=rng.randint(0, 1440))
+        specs.append((frequency, start, pattern, None, rng.choice(ZONES), rng.choice(BLACKOUTS)))
+
+    started = time.perf_counter()
+    recurrences = [Recurrence(*spec) for spec in specs]
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    next_runs = [recurrence.next_after(now) for recurrence in recurrences]
+    next_ms = (time.perf_counter() - started) * 1000
+
+    # Revisión siguiente del programador: mismas reglas, un minuto después
+    started = time.perf_counter()
+    for recurrence in recurrences:
+        recurrence.next_after(now + timedelta(minutes=1))
+    recheck_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for recurrence, next_run in zip(recurrences, next_runs):
+        if next_run:
+            recurrence.next_after(next_run)
+    following_ms = (time.perf_counter() - started) * 1000
+
+    print(f"Programaciones:            {args.schedules}")
+    print(f"Compilación:               {compile_ms:.1f}ms")
+    print(f"Próxima ejecución:         {next_ms:.1f}ms ({next_ms * 1000 / args.schedules:.1f}µs por regla)")
+    print(f"Nueva revisión (+1 min):   {recheck_ms:.1f}ms")
+    print(f"Ejecución siguiente:       {following_ms:.1f}ms")
+    print(f"Sin próximas ejecuciones:  {sum(1 for run in next_runs if run is None)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# scripts/check_query_counts.py
+"""
+Verificación del número de consultas de los caminos de carga de posts.
+
+Crea posts sintéticos con plantillas (con imagen base), programaciones y
+registros, y cuenta las sentencias SQL de cada consulta de app/db/repositories.py
+usando los objetos como lo hacen la generación de imágenes y la publicación
+(plantilla, imagen base y programación). Termina con error si alguna supera
+el máximo esperado, que no depende del número de posts: una carga perezosa
+por post (N+1) o una imagen leída en un listado aparece como regresión.
+
+Los datos se borran al terminar; usar una base de pruebas.
+
+Uso:
+    DATABASE_URL=sqlite:///check.db python -m scripts.check_query_counts --posts 200
+"""
+import sys
+import secrets
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, event
+
+from app.core.security import get_password_hash
+from app.db.database import Base, SessionLocal, engine
+from app.db.models import Post, PostLog, ScheduleSettings, Template, User
+from app.db.repositories import (
+    PostLogRepository, PostRepository, ScheduleRepository, TemplateRepository
+)
+from app.utils.pagination import keyset_paginate
+
+CHECK_USERNAME = "querycheck"
+TEMPLATE_IMAGE_SIZE = 256 * 1024
+
+def parse_args() -> argparse.Namespace:
+    """
+    Leer los parámetros de la verificación desde la línea de comandos.
+    """
+    parser = argparse.ArgumentParser(description="Verificación del número de consultas")
+    parser.add_argument("--posts", type=int, default=200, help="Número de posts sintéticos")
+    parser.add_argument("--templates", type=int, default=5, help="Número de plantillas sintéticas")
+    return parser.parse_args()
+
+@contextmanager
+def count_queries() -> Iterator[List[str]]:
+    """Registrar las sentencias SQL ejecutadas dentro del bloque."""
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+def seed(args: argparse.Namespace) -> Tuple[int, List[int]]:
+    """
+    Crear los datos sintéticos.
+
+    Returns:
+        Tupla (ID del usuario, IDs de los posts)
+    """
+    now = datetime.utcnow().replace(microsecond=0)
+    db = SessionLocal()
+    try:
+        # Contraseña aleatoria: el usuario no puede iniciar sesión
+        user = User(
+            username=CHECK_USERNAME,
+            email=f"{CHECK_USERNAME}@example.com",
+            full_name="Query check",
+            hashed_password=get_password_hash(secrets.token_urlsafe(16))
+        )
+        templates = [
+            Template(name=f"Query check {i}", template_image=bytes(TEMPLATE_IMAGE_SIZE))
+            for i in range(args.templates)
+        ]
+        db.add(user)
+        db.add_all(templates)
+        db.flush()
+
+        posts = [
+            Post(
+                user_id=user.user_id,
+                template_id=templates[i % len(templates)].template_id,
+                job_title=f"Puesto {i}",
+                location="Buenos Aires",
+                email="cv@example.com",
+                status="scheduled",
+                created_at=now - timedelta(minutes=i),
+                scheduled_for=now + timedelta(hours=1, minutes=i)
+            )
+            for i in range(args.posts)
+        ]
+        db.add_all(posts)
+        db.flush()
+
+        db.add_all(
+            ScheduleSettings(post_id=post.post_id, scheduled_time=post.scheduled_for, frequency="once")
+            for post in posts
+        )
+        db.add_all(
+            PostLog(post_id=posts[0].post_id, action="generate", status="success", timestamp=now - timedelta(minutes=i))
+            for i in range(10)
+        )
+        db.commit()
+        return user.user_id, [post.post_id for post in posts]
+
+    finally:
+        db.close()
+
+def cleanup() -> None:
+    """Borrar los datos sintéticos."""
+    db = SessionLocal()
+    try:
+        user_ids = db.query(User.user_id).filter(User.username == CHECK_USERNAME).scalar_subquery()
+        post_ids = db.query(Post.post_id).filter(Post.user_id.in_(user_ids)).scalar_subquery()
+        db.execute(delete(PostLog).where(PostLog.post_id.in_(post_ids)))
+        db.execute(delete(ScheduleSettings).where(ScheduleSettings.post_id.in_(post_ids)))
+        db.execute(delete(Post).where(Post.user_id.in_(user_ids)))
+        db.execute(delete(Template).where(Template.name.like("Query check%")))
+        db.execute(delete(User).where(User.username == CHECK_USERNAME))
+        db.commit()
+    finally:
+        db.close()
+
+def use_for_render(posts: List[Post]) -> None:
+    """Acceder a los datos que usan la generación de imágenes y la publicación."""
+    for post in posts:
+        post.template.template_image
+        post.template.caption_format
+
+def build_checks(post_ids: List[int]) -> List[Tuple[str, Optional[int], Optional[str], Callable]]:
+    """
+    Casos a verificar.
+
+    Returns:
+        Lista de tuplas (nombre, máximo de consultas o None si solo se informa,
+        columna que no debe leerse, función que recibe la sesión)
+    """
+    first_id = post_ids[0]
+    now = datetime.utcnow()
+
+    def render_batch(db):
+        posts = PostRepository(db).get_many(post_ids, with_image=True, with_schedule=True)
+        use_for_render(posts)
+        [post.schedule.is_active for post in posts]
+
+    def render_one(db):
+        post = PostRepository(db).get(first_id, with_image=True, with_schedule=True)
+        use_for_render([post])
+        post.schedule.is_active
+
+    def reload_after_commit(db):
+        # Como create_post: el objeto queda expirado tras el commit
+        post = PostRepository(db).get(first_id)
+        post.job_title = post.job_title
+        db.commit()
+        post = PostRepository(db).get(first_id, with_image=True)
+        use_for_render([post])
+
+    def list_posts(db):
+        posts, _ = keyset_paginate(db.query(Post), Post.created_at, Post.post_id, 100)
+        [post.job_title for post in posts]
+
+    def list_templates(db):
+        [template.name for template in TemplateRepository(db).query().all()]
+
+    def calendar(db):
+        posts = PostRepository(db).get_scheduled_between(now, now + timedelta(days=30))
+        [post.job_title for post in posts]
+
+    def post_logs(db):
+        PostLogRepository(db).get_for_post(first_id, limit=5)
+
+    def schedules(db):
+        ScheduleRepository(db).get_for_posts(post_ids)
+
+    def lazy_reference(db):
+        posts = db.query(Post).filter(Post.post_id.in_(post_ids[:100])).all()
+        use_for_render(posts)
+
+    return [
+        ("lote para generar/publicar", 2, None, render_batch),
+        ("un post para publicar", 2, None, render_one),
+        ("recarga tras commit", 3, None, reload_after_commit),
+        ("listado de posts", 1, "generated_image", list_posts),
+        ("listado de plantillas", 1, "template_image", list_templates),
+        ("calendario", 1, "generated_image", calendar),
+        ("historial de un post", 1, None, post_logs),
+        ("programaciones de un lote", 1, None, schedules),
+        ("sin opciones de carga (referencia)", None, None, lazy_reference),
+    ]
+
+def main() -> None:
+    """
+    Punto de entrada principal.
+    """
+    args = parse_args()
+    Base.metadata.create_all(bind=engine)
+
+    cleanup()
+    _, post_ids = seed(args)
+
+    failures = 0
+    try:
+        print(f"{'caso':38s} {'consultas':>9s} {'máximo':>7s}")
+        for name, expected, forbidden, check in build_checks(post_ids):
+            db = SessionLocal()
+            try:
+                with count_queries() as statements:
+                    check(db)
+            finally:
+                db.close()
+
+            problems = []
+            if expected is not None and len(statements) > expected:
+                problems.append("demasiadas consultas")
+            if forbidden and any(forbidden in statement for statement in statements):
+                problems.append(f"lee {forbidden}")
+            failures += bool(problems)
+
+            limit = "-" if expected is None else str(expected)
+            result = f"ERROR: {', '.join(problems)}" if problems else ""
+            print(f"{name:38s} {len(statements):9d} {limit:>7s}  {result}")
+
+    finally:
+        cleanup()
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# scripts/check_replica_routing.py
+"""
+Verificación del enrutamiento de lecturas a la réplica con dos bases SQLite.
+
+La replicación se simula copiando el primario sobre la réplica con la API de
+copia de SQLite. Se comprueba que get_read_db use la réplica cuando está al
+día, que vuelva al primario cuando el retraso supera la tolerancia, cuando
+una consulta en la réplica falla (la consulta se repite en el primario) y
+cuando la réplica deja de responder, y que vuelva a la réplica al
+recuperarse. Termina con error si algún caso falla.
+
+La réplica se sobrescribe; usar bases de prueba.
+
+Uso:
+    DATABASE_URL=sqlite:///primary.db DATABASE_REPLICA_URL=sqlite:///replica.db \\
+        python -m scripts.check_replica_routing
+"""
+import os
+import sys
+import time
+import sqlite3
+from typing import Callable, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+
+from app.api import deps
+from app.db import replica
+from app.db.database import SQLALCHEMY_DATABASE_URL, SQLALCHEMY_REPLICA_URL, Base, engine, replica_engine
+from app.db.models import SchedulerState
+from app.db.replica import ReplicaRouter
+
+MAX_LAG_SECONDS = 1.0
+CHECK_INTERVAL_SECONDS = 0.2
+
+def sqlite_path(url: str) -> str:
+    """Obtener la ruta del archivo de una URL de SQLite."""
+    parsed = make_url(url)
+    if not parsed.drivername.startswith("sqlite") or parsed.database in (None, "", ":memory:"):
+        sys.exit(f"Se necesita una base SQLite en archivo: {url}")
+    return parsed.database
+
+def replicate() -> None:
+    """Copiar el primario sobre la réplica."""
+    source = sqlite3.connect(sqlite_path(SQLALCHEMY_DATABASE_URL))
+    target = sqlite3.connect(sqlite_path(SQLALCHEMY_REPLICA_URL))
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+def break_replica() -> None:
+    """Dejar la réplica sin una base válida."""
+    replica_engine.dispose()
+    with open(sqlite_path(SQLALCHEMY_REPLICA_URL), "wb") as replica_file:
+        replica_file.write(b"no es una base de datos" * 100)
+
+def restore_replica() -> None:
+    """Volver a crear la réplica desde el primario."""
+    replica_engine.dispose()
+    os.remove(sqlite_path(SQLALCHEMY_REPLICA_URL))
+    replicate()
+
+def read_target() -> str:
+    """Indicar a qué base va una lectura de get_read_db."""
+    sessions = deps.get_read_db()
+    db = next(sessions)
+    try:
+        return "réplica" if db.get_bind() is replica_engine else "primario"
+    finally:
+        sessions.close()
+
+def failed_query() -> None:
+    """Romper la réplica antes de la comprobación y leer por todas las vías de la sesión."""
+    break_replica()
+    sessions = deps.get_read_db()
+    db = next(sessions)
+    try:
+        if db.get_bind() is not replica_engine:
+            sys.exit("La lectura no empezó en la réplica")
+        # Cada lectura tiene que responder desde el primario
+        db.scalars(select(SchedulerState.name)).all()
+        db.scalar(select(SchedulerState.version))
+        db.get(SchedulerState, replica.HEARTBEAT_KEY)
+        db.query(SchedulerState).count()
+    finally:
+        sessions.close()
+
+def check(router: ReplicaRouter, replicate_first: bool = True) -> None:
+    """Esperar el intervalo y comprobar la réplica (replicando antes si se pide)."""
+    if replicate_first:
+        replicate()
+    time.sleep(CHECK_INTERVAL_SECONDS)
+    router.refresh()
+
+def fall_behind(router: ReplicaRouter) -> None:
+    """Seguir comprobando sin replicar hasta superar la tolerancia."""
+    # Sin comprobaciones no se escriben latidos: el tiempo sin más no cuenta como retraso
+    for _ in range(int(MAX_LAG_SECONDS / CHECK_INTERVAL_SECONDS) + 2):
+        check(router, False)
+
+def main() -> None:
+    """
+    Punto de entrada principal.
+    """
+    if not SQLALCHEMY_REPLICA_URL:
+        sys.exit("Falta DATABASE_REPLICA_URL")
+
+    Base.metadata.create_all(bind=engine)
+    replicate()
+
+    router = ReplicaRouter(engine, replica_engine, MAX_LAG_SECONDS, CHECK_INTERVAL_SECONDS)
+    replica._router = router
+
+    # El primer latido se escribe en la primera comprobación
+    router.check()
+
+    steps: List[Tuple[str, str, Callable[[], None]]] = [
+        ("réplica al día", "réplica", lambda: check(router)),
+        ("réplica sin replicar dentro de la tolerancia", "réplica", lambda: check(router, False)),
+        ("retraso mayor que la tolerancia", "primario", lambda: fall_behind(router)),
+        ("réplica recuperada", "réplica", lambda: (check(router), check(router))),
+        ("error en una consulta de la réplica", "primario", failed_query),
+        ("réplica recuperada tras el error", "réplica", lambda: (restore_replica(), check(router), check(router))),
+        ("réplica sin responder", "primario", lambda: (break_replica(), check(router, False))),
+        ("réplica restaurada", "réplica", lambda: (restore_replica(), check(router))),
+    ]
+
+    failures = 0
+    print(f"{'caso':46s} {'esperado':>9s} {'lectura':>9s}  retraso")
+    for name, expected, step in steps:
+        step()
+        target = read_target()
+        status = router.get_status()
+        failures += target != expected
+        result = "" if target == expected else f"ERROR: {status['error'] or ''}"
+        print(f"{name:46s} {expected:>9s} {target:>9s}  {status['lag_seconds']}  {result}")
+
+    print(f"\nLecturas en la réplica: {router.get_status()['replica_reads']}, "
+          f"en el primario: {router.get_status()['primary_fallbacks']}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ from app.core.config import settings
 from app.core.security import get_password_hash
 from app.db.database import Base
 from app.db.models import User, Template, Post
+from app.services.post_stats import rebuild_counters
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -122,6 +123,9 @@ def main() -> None:
     
     db = Session(engine)
     init_db(db)
+    
+    logger.info("Calculando contadores de estadísticas...")
+    rebuild_counters(db)
     db.close()
     
     logger.info("Base de datos inicializada exitosamente.")
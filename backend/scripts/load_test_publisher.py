@@ -0,0 +1,285 @@
+# scripts/load_test_publisher.py
+"""
+Prueba de carga del programador y del publicador contra el backend falso de Instagram.
+
+Crea posts sintéticos, los programa con PostScheduler para el mismo instante
+y mide rendimiento, latencia de publicación y reintentos.
+
+Uso:
+    DATABASE_URL=sqlite:///loadtest.db python -m scripts.load_test_publisher --posts 2000
+    DATABASE_URL=sqlite:///loadtest.db python -m scripts.load_test_publisher --posts 2000 --execution-mode asyncio
+"""
+import os
+import sys
+import time
+import shutil
+import secrets
+import logging
+import argparse
+import resource
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Sequence
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger("load_test_publisher")
+logger.setLevel(logging.INFO)
+logging.getLogger("apscheduler").setLevel(logging.ERROR)
+
+def parse_args() -> argparse.Namespace:
+    """
+    Leer los parámetros de la prueba desde la línea de comandos.
+    """
+    parser = argparse.ArgumentParser(description="Prueba de carga del publicador de Instagram")
+    parser.add_argument("--posts", type=int, default=1000, help="Número de posts a programar")
+    parser.add_argument("--lead-seconds", type=float, default=10, help="Segundos hasta el disparo")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Latencia media de cada subida")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidad de error genérico")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probabilidad de 429")
+    parser.add_argument("--challenge-rate", type=float, default=0.0, help="Probabilidad de desafío de login")
+    parser.add_argument("--uploads-per-hour", type=int, default=1_000_000, help="Límite del rate limiter")
+    parser.add_argument("--max-concurrent", type=int, default=20, help="Subidas simultáneas permitidas")
+    parser.add_argument("--retry-backoff", type=float, default=0.1, help="Espera base entre reintentos")
+    parser.add_argument("--timeout", type=float, default=900, help="Tiempo máximo de espera en segundos")
+    parser.add_argument("--idle-timeout", type=float, default=30, help="Segundos sin progreso antes de terminar")
+    parser.add_argument("--execution-mode", choices=("threads", "asyncio"), default=None,
+                        help="Ejecución de las publicaciones (por defecto SCHEDULER_EXECUTION_MODE)")
+    parser.add_argument("--dispatch-mode", choices=("bucket", "per_job"), default=None,
+                        help="Despacho de los jobs (por defecto SCHEDULER_DISPATCH_MODE)")
+    parser.add_argument("--render", action="store_true", help="Generar las imágenes con Pillow al publicar")
+    parser.add_argument("--keep-data", action="store_true", help="No borrar los datos sintéticos")
+    return parser.parse_args()
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """
+    Configurar el entorno antes de importar la aplicación (la configuración se lee al importar).
+    """
+    os.environ.setdefault("DATABASE_URL", "sqlite:///loadtest.db")
+    for key in ("DB_SERVER", "DB_NAME", "DB_USERNAME", "DB_PASSWORD",
+                "INSTAGRAM_USERNAME", "INSTAGRAM_PASSWORD"):
+        os.environ.setdefault(key, "loadtest")
+
+    os.environ["INSTAGRAM_BACKEND"] = "fake"
+    os.environ["FAKE_INSTAGRAM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_INSTAGRAM_ERROR_RATE"] = str(args.error_rate)
+    os.environ["FAKE_INSTAGRAM_RATE_LIMIT_RATE"] = str(args.rate_limit_rate)
+    os.environ["FAKE_INSTAGRAM_CHALLENGE_RATE"] = str(args.challenge_rate)
+    os.environ["INSTAGRAM_UPLOADS_PER_HOUR"] = str(args.uploads_per_hour)
+    os.environ["INSTAGRAM_MAX_CONCURRENT_UPLOADS"] = str(args.max_concurrent)
+    os.environ["INSTAGRAM_RETRY_BACKOFF_SECONDS"] = str(args.retry_backoff)
+    if args.execution_mode:
+        os.environ["SCHEDULER_EXECUTION_MODE"] = args.execution_mode
+    if args.dispatch_mode:
+        os.environ["SCHEDULER_DISPATCH_MODE"] = args.dispatch_mode
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    Calcular un percentil por el método del rango más cercano.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def seed_posts(db, count: int, render: bool) -> List[int]:
+    """
+    Crear el usuario, la plantilla y los posts sintéticos de la prueba.
+    """
+    from PIL import Image
+    from app.core.config import settings
+    from app.core.security import get_password_hash
+    from app.db.models import User, Template, Post
+
+    user = db.query(User).filter(User.username == "loadtest").first()
+    if not user:
+        # Contraseña aleatoria: el usuario no puede iniciar sesión
+        user = User(
+            username="loadtest",
+            email="loadtest@example.com",
+            full_name="Load Test",
+            hashed_password=get_password_hash(secrets.token_urlsafe(16))
+        )
+        db.add(user)
+
+    template = Template(name="Load Test", background_color="#FFFFFF", text_color="#000000")
+    db.add(template)
+    db.commit()
+
+    posts = [
+        Post(
+            user_id=user.user_id,
+            template_id=template.template_id,
+            job_title=f"Puesto de prueba {i}",
+            location="Buenos Aires",
+            email="cv@example.com",
+            requirements="Requisito 1\nRequisito 2",
+            status="draft"
+        )
+        for i in range(count)
+    ]
+    db.add_all(posts)
+    db.commit()
+    post_ids = [post.post_id for post in posts]
+
+    if not render:
+        # Imagen ya generada para medir solo la subida
+        os.makedirs(settings.GENERATED_DIR, exist_ok=True)
+        placeholder = os.path.join(settings.GENERATED_DIR, "loadtest_placeholder.png")
+        Image.new("RGB", (1080, 1080), color="#0066cc").save(placeholder)
+        for post_id in post_ids:
+            shutil.copyfile(placeholder, os.path.join(settings.GENERATED_DIR, f"post_{post_id}_loadtest.png"))
+        os.remove(placeholder)
+
+    return post_ids
+
+def cleanup(db, post_ids: List[int]) -> None:
+    """
+    Borrar los datos sintéticos y sus imágenes.
+    """
+    import glob
+    from app.core.config import settings
+    from app.db.models import Post, PostLog, ScheduleSettings
+
+    for start in range(0, len(post_ids), 500):
+        chunk = post_ids[start:start + 500]
+        db.query(PostLog).filter(PostLog.post_id.in_(chunk)).delete(synchronize_session=False)
+        db.query(ScheduleSettings).filter(ScheduleSettings.post_id.in_(chunk)).delete(synchronize_session=False)
+        db.query(Post).filter(Post.post_id.in_(chunk)).delete(synchronize_session=False)
+    db.commit()
+
+    for post_id in post_ids:
+        for image_file in glob.glob(os.path.join(settings.GENERATED_DIR, f"post_{post_id}_*.png")):
+            os.remove(image_file)
+
+def main() -> None:
+    """
+    Punto de entrada principal.
+    """
+    args = parse_args()
+    configure_environment(args)
+
+    from apscheduler.events import EVENT_JOB_MISSED
+    from sqlalchemy import func
+    from app.core.config import settings
+    from app.db.database import Base, SessionLocal, engine
+    from app.db.models import Post, PostLog
+    from app.services.audit_log import get_audit_log
+    from app.services.publisher_backends import FakeInstagramBackend
+    from app.services.scheduler import PostScheduler
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+
+    logger.info(f"Creando {args.posts} posts sintéticos...")
+    post_ids = seed_posts(db, args.posts, args.render)
+
+    scheduler = PostScheduler()
+    FakeInstagramBackend.reset_stats()
+
+    # Esperar el liderazgo: puede quedar el lease de una ejecución anterior
+    lease_deadline = time.monotonic() + settings.SCHEDULER_LEASE_TTL_SECONDS + settings.SCHEDULER_LEASE_RENEW_SECONDS + 5
+    while not scheduler.is_leader and time.monotonic() < lease_deadline:
+        time.sleep(0.1)
+    if not scheduler.is_leader:
+        logger.error("No se obtuvo el liderazgo del programador; ¿hay otro scheduler_service en ejecución?")
+        scheduler.shutdown()
+        sys.exit(1)
+
+    # Contar los jobs descartados por APScheduler por superar el margen de misfire
+    missed_jobs = Counter()
+    scheduler.scheduler.add_listener(lambda event: missed_jobs.update(["missed"]), EVENT_JOB_MISSED)
+
+    fire_time = datetime.utcnow() + timedelta(seconds=args.lead_seconds)
+    started = time.perf_counter()
+    for post_id in post_ids:
+        scheduler.schedule_post(post_id, fire_time, "once")
+    schedule_seconds = time.perf_counter() - started
+    logger.info(f"{len(post_ids)} posts programados en {schedule_seconds:.1f}s para {fire_time}")
+
+    # Esperar a que todos los posts salgan del estado "scheduled", registrando
+    # los picos de hilos y de conexiones en uso
+    peak_threads = threading.active_count()
+    peak_connections = 0
+    deadline = time.monotonic() + args.lead_seconds + args.timeout
+    idle_deadline = time.monotonic() + args.lead_seconds + args.idle_timeout
+    pending = len(post_ids)
+    while pending and time.monotonic() < min(deadline, idle_deadline):
+        for _ in range(10):
+            time.sleep(0.1)
+            peak_threads = max(peak_threads, threading.active_count())
+            checkedout = getattr(engine.pool, "checkedout", None)
+            if checkedout:
+                peak_connections = max(peak_connections, checkedout())
+        db.expire_all()
+        still_pending = db.query(func.count(Post.post_id)).filter(
+            Post.post_id.between(min(post_ids), max(post_ids)),
+            Post.status == "scheduled"
+        ).scalar()
+        # Devolver la conexión al pool para no contarla en el pico
+        db.rollback()
+        if still_pending != pending:
+            idle_deadline = time.monotonic() + args.idle_timeout
+        pending = still_pending
+
+    scheduler.shutdown()
+    # Insertar los PostLog que quedan en memoria antes de leerlos
+    get_audit_log().flush()
+
+    # Recoger resultados
+    db.expire_all()
+    rows = db.query(Post.status, Post.scheduled_for, Post.published_at).filter(
+        Post.post_id.between(min(post_ids), max(post_ids))
+    ).all()
+    statuses = Counter(row.status for row in rows)
+    publish_latencies = [
+        (row.published_at - row.scheduled_for).total_seconds()
+        for row in rows if row.status == "published" and row.published_at
+    ]
+    errors = Counter(
+        (message or "")[:80] for (message,) in db.query(PostLog.error_message).filter(
+            PostLog.post_id.between(min(post_ids), max(post_ids)),
+            PostLog.status == "error"
+        )
+    )
+
+    stats = FakeInstagramBackend.get_stats()
+    last_publish = max((row.published_at for row in rows if row.published_at), default=fire_time)
+    elapsed = max((last_publish - fire_time).total_seconds(), 1e-6)
+
+    print("\n=== Resultado de la prueba de carga ===")
+    print(f"Modo de ejecución:        {settings.SCHEDULER_EXECUTION_MODE} "
+          f"(despacho: {settings.SCHEDULER_DISPATCH_MODE})")
+    print(f"Posts programados:        {len(post_ids)} (pendientes al terminar: {pending})")
+    print(f"Jobs perdidos (misfire):  {missed_jobs['missed']}")
+    print(f"Estados finales:          {dict(statuses)}")
+    print(f"Rendimiento:              {statuses.get('published', 0) / elapsed:.2f} publicaciones/s")
+    print(f"Latencia p50/p99:         {percentile(publish_latencies, 50):.2f}s / "
+          f"{percentile(publish_latencies, 99):.2f}s (desde la hora programada)")
+    print(f"Subida p50/p99:           {percentile(stats['latencies_ms'], 50):.0f}ms / "
+          f"{percentile(stats['latencies_ms'], 99):.0f}ms")
+    print(f"Intentos de subida:       {stats['attempts']} "
+          f"(429: {stats['rate_limited']}, errores: {stats['errors']})")
+    attempted = statuses.get("published", 0) + statuses.get("failed", 0)
+    print(f"Intentos por publicación: {stats['attempts'] / max(attempted, 1):.2f} "
+          f"({max(stats['attempts'] - attempted, 0)} reintentos)")
+    print(f"Inicios de sesión:        {stats['logins']} (desafíos: {stats['challenges']})")
+    print(f"Pico de hilos:            {peak_threads}")
+    print(f"Pico de conexiones:       {peak_connections}")
+    # ru_maxrss está en KB en Linux
+    print(f"Memoria máxima (RSS):     {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    for message, count in errors.most_common(5):
+        print(f"  {count:6d} x {message}")
+
+    if not args.keep_data:
+        cleanup(db, post_ids)
+    db.close()
+
+    sys.exit(0 if not pending else 1)
+
+if __name__ == "__main__":
+    main()
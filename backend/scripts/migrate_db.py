@@ -0,0 +1,212 @@
+# scripts/migrate_db.py
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+from app.db.database import Base, engine
+from app.db import models  # noqa: F401 - registrar los modelos en Base.metadata
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def add_missing_columns(bind: Engine) -> int:
+    """
+    Agregar a las tablas existentes las columnas nuevas de los modelos.
+
+    create_all solo crea tablas nuevas; las columnas agregadas a tablas que ya
+    existen se crean aquí con ALTER TABLE. Solo se agregan columnas opcionales.
+
+    Args:
+        bind: Engine de la base de datos
+
+    Returns:
+        Número de columnas agregadas
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    added = 0
+
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+
+                if not column.nullable and column.server_default is None:
+                    logger.warning(
+                        f"Columna obligatoria {table.name}.{column.name} sin valor por defecto; "
+                        "se debe agregar manualmente"
+                    )
+                    continue
+
+                column_sql = CreateColumn(column).compile(dialect=bind.dialect)
+                keyword = "ADD" if bind.dialect.name == "mssql" else "ADD COLUMN"
+                connection.execute(text(f"ALTER TABLE {table.name} {keyword} {column_sql}"))
+                logger.info(f"Columna agregada: {table.name}.{column.name}")
+                added += 1
+
+    return added
+
+def widen_string_columns(bind: Engine) -> int:
+    """
+    Ampliar las columnas de texto cuyo largo creció en los modelos.
+
+    SQLite no limita el largo de las columnas, por lo que allí no hace falta.
+
+    Args:
+        bind: Engine de la base de datos
+
+    Returns:
+        Número de columnas ampliadas
+    """
+    if bind.dialect.name == "sqlite":
+        return 0
+
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    widened = 0
+
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {column["name"]: column for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                model_length = getattr(column.type, "length", None)
+                existing = existing_columns.get(column.name)
+                existing_length = getattr(existing["type"], "length", None) if existing else None
+
+                if not model_length or not existing_length or existing_length >= model_length:
+                    continue
+
+                column_type = column.type.compile(dialect=bind.dialect)
+                nullability = "NULL" if column.nullable else "NOT NULL"
+                connection.execute(text(
+                    f"ALTER TABLE {table.name} ALTER COLUMN {column.name} {column_type} {nullability}"
+                ))
+                logger.info(f"Columna ampliada: {table.name}.{column.name} ({existing_length} -> {model_length})")
+                widened += 1
+
+    return widened
+
+def require_created_at(bind: Engine) -> int:
+    """
+    Completar created_at en posts y plantillas y volverla obligatoria.
+
+    La paginación por cursor ordena y filtra por (created_at, ID): una fila
+    sin fecha no se alcanzaría nunca desde un cursor. Las filas sin fecha
+    reciben la fecha actual. En SQL Server la columna pasa a NOT NULL, para
+    lo que hay que borrar antes los índices que la usan (add_missing_indexes
+    los vuelve a crear); SQLite no permite cambiarla y solo se completa.
+
+    Args:
+        bind: Engine de la base de datos
+
+    Returns:
+        Número de filas completadas
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    backfilled = 0
+
+    with bind.begin() as connection:
+        for table in (models.Post.__table__, models.Template.__table__):
+            if table.name not in existing_tables:
+                continue
+
+            result = connection.execute(text(
+                f"UPDATE {table.name} SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL"
+            ))
+            if result.rowcount:
+                logger.info(f"Fecha de creación completada en {result.rowcount} filas de {table.name}")
+                backfilled += result.rowcount
+
+            existing = {column["name"]: column for column in inspector.get_columns(table.name)}
+            if bind.dialect.name != "mssql" or not existing["created_at"]["nullable"]:
+                continue
+
+            for index in inspector.get_indexes(table.name):
+                if "created_at" in index["column_names"]:
+                    connection.execute(text(f"DROP INDEX {index['name']} ON {table.name}"))
+                    logger.info(f"Índice borrado para cambiar created_at: {index['name']} en {table.name}")
+
+            column_type = table.c.created_at.type.compile(dialect=bind.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN created_at {column_type} NOT NULL"))
+            logger.info(f"Columna obligatoria: {table.name}.created_at")
+
+    return backfilled
+
+def add_missing_indexes(bind: Engine) -> int:
+    """
+    Crear los índices de los modelos y del jobstore que falten.
+
+    create_all no agrega índices nuevos a tablas que ya existen. También se
+    revisa la tabla de jobs de APScheduler, cuyo índice sobre next_run_time
+    usan el programador y las consultas de jobs vencidos.
+
+    Args:
+        bind: Engine de la base de datos
+
+    Returns:
+        Número de índices creados
+    """
+    from app.services.schedule_client import get_schedule_client
+
+    # Crea la tabla de jobs si todavía no existe
+    jobs_table = get_schedule_client().jobstore.jobs_t
+
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    created = 0
+
+    for table in list(Base.metadata.sorted_tables) + [jobs_table]:
+        if table.name not in existing_tables:
+            continue
+
+        existing_indexes = {
+            tuple(index["column_names"]) for index in inspector.get_indexes(table.name)
+        }
+        for index in table.indexes:
+            columns = tuple(column.name for column in index.columns)
+            if columns in existing_indexes:
+                continue
+
+            index.create(bind)
+            logger.info(f"Índice creado: {index.name} en {table.name} ({', '.join(columns)})")
+            created += 1
+
+    return created
+
+def main() -> None:
+    """
+    Punto de entrada principal.
+    """
+    logger.info("Creando tablas nuevas...")
+    Base.metadata.create_all(bind=engine)
+
+    logger.info("Agregando columnas nuevas...")
+    added = add_missing_columns(engine)
+
+    logger.info("Ampliando columnas de texto...")
+    widened = widen_string_columns(engine)
+
+    logger.info("Completando fechas de creación...")
+    backfilled = require_created_at(engine)
+
+    logger.info("Creando índices faltantes...")
+    indexed = add_missing_indexes(engine)
+
+    logger.info(
+        f"Migración finalizada ({added} columnas agregadas, {widened} ampliadas, "
+        f"{backfilled} fechas de creación completadas, {indexed} índices creados)."
+    )
+
+if __name__ == "__main__":
+    main()
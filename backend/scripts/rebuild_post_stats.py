@@ -0,0 +1,29 @@
+# scripts/rebuild_post_stats.py
+import logging
+
+from app.db.database import SessionLocal
+from app.services.post_stats import rebuild_counters
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main() -> None:
+    """
+    Punto de entrada principal.
+
+    Recalcula los contadores de /stats desde posts y post_logs. Necesario
+    una vez al desplegarlos (hasta entonces /stats responde 503) y después
+    de borrar posts o registros con sentencias masivas, o de modificarlos
+    fuera de la aplicación.
+    """
+    db = SessionLocal()
+    try:
+        logger.info("Recalculando contadores de estadísticas...")
+        rebuild_counters(db)
+    finally:
+        db.close()
+
+    logger.info("Contadores recalculados.")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 # scripts/scheduler_service.py
-import time
 import logging
 import signal
 import sys
+import threading
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -20,40 +20,63 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Se activa al recibir una señal de salida
+stop_event = threading.Event()
+
 def handle_exit(signum, frame):
     """
     Manejador de señales para salir limpiamente.
+
+    Solo marca la salida: el drenaje se hace en el hilo principal, fuera del
+    manejador de señales.
     """
-    logger.info("Recibida señal de salida. Deteniendo programador...")
-    if 'scheduler' in globals():
-        scheduler.shutdown()
-    sys.exit(0)
+    if stop_event.is_set():
+        logger.warning("Segunda señal de salida recibida; el drenaje sigue en curso")
+        return
+
+    logger.info(f"Recibida señal de salida ({signal.Signals(signum).name}). Deteniendo programador...")
+    stop_event.set()
 
 def main():
     """
     Función principal para iniciar el servicio de programación.
     """
     logger.info("Iniciando servicio de programación de Instagram Job Poster...")
-    
+
     # Registrar manejadores de señales
     signal.signal(signal.SIGINT, handle_exit)
     signal.signal(signal.SIGTERM, handle_exit)
-    
-    # Iniciar programador
+
+    # Iniciar programador; solo el proceso elegido líder ejecuta los jobs
+    from app.core.config import settings
+    from app.services.health_server import HealthServer
     from app.services.scheduler import PostScheduler
-    global scheduler
+
     scheduler = PostScheduler()
-    
-    logger.info("Programador de tareas iniciado. Esperando trabajos programados...")
-    
-    # Mantener el proceso en ejecución
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        logger.info("Interrumpido por el usuario. Deteniendo programador...")
-        scheduler.shutdown()
-        sys.exit(0)
+
+    health_server = None
+    if settings.SCHEDULER_HEALTH_PORT:
+        health_server = HealthServer(
+            scheduler.get_health,
+            settings.SCHEDULER_HEALTH_HOST,
+            settings.SCHEDULER_HEALTH_PORT
+        )
+        health_server.start()
+
+    logger.info("Programador de tareas iniciado. Esperando liderazgo y trabajos programados...")
+
+    # Bloquear sin consumir CPU hasta recibir una señal de salida
+    stop_event.wait()
+
+    # Drenar las publicaciones en curso; las sondas siguen respondiendo
+    # ("draining") hasta que el programador se detiene
+    drained = scheduler.shutdown(drain_timeout=settings.SCHEDULER_DRAIN_TIMEOUT_SECONDS)
+
+    if health_server:
+        health_server.stop()
+
+    logger.info("Servicio de programación detenido")
+    sys.exit(0 if drained else 1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()